@@ -10,7 +10,11 @@ from .models import (
     ScheduleRequest,
     Payment,
     HorseTrainerRelation,
-    Resource
+    Resource,
+    PriceStatistics,
+    HorseStatistics,
+    DailyIncome,
+    DailyLessons
 )
 from reportlab.pdfgen import canvas
 from django.http import HttpResponse
@@ -51,10 +55,27 @@ class HorseAdmin(admin.ModelAdmin):
     """
     Админка для модели Horse.
     """
-    list_display = ("name", "gender", "birth_date", "stable")
+    list_display = ("name", "gender", "birth_date", "stable", "lessons_30d", "last_lesson_date")
     list_filter = ("gender", "stable")
-    search_fields = ("name", "gender", "stable__name", "trainers__profile__user__username")
+    search_fields = ("name", "gender", "stable__name", "trainers__last_name")
     raw_id_fields = ("stable",)
+    list_select_related = ("stable", "statistics")
+
+    @admin.display(description="Занятий за 30 дней", ordering="statistics__lessons_30d")
+    def lessons_30d(self, obj: Horse) -> Any:
+        """
+        Возвращает количество занятий лошади за 30 дней из статистики.
+        """
+        statistics = getattr(obj, 'statistics', None)
+        return statistics.lessons_30d if statistics else None
+
+    @admin.display(description="Последнее занятие", ordering="statistics__last_lesson_date")
+    def last_lesson_date(self, obj: Horse) -> Any:
+        """
+        Возвращает дату последнего занятия лошади из статистики.
+        """
+        statistics = getattr(obj, 'statistics', None)
+        return statistics.last_lesson_date if statistics else None
 
 
 @admin.register(Trainer)
@@ -99,6 +120,7 @@ class LessonAdmin(admin.ModelAdmin):
         "horse__name"
     )
     raw_id_fields = ("student", "trainer", "horse")
+    list_select_related = ("student__user", "trainer", "horse")
     date_hierarchy = "date"
 
     @admin.display(description="Ученик")
@@ -124,6 +146,8 @@ class PaymentAdmin(admin.ModelAdmin):
         "purpose"
     )
     raw_id_fields = ("lesson", "user")
+    # lesson допускает NULL и не попадает в select_related() по умолчанию
+    list_select_related = ("user", "lesson__student__user")
     date_hierarchy = "timestamp"
 
     @admin.display(description="Пользователь")
@@ -180,6 +204,7 @@ class ScheduleRequestAdmin(admin.ModelAdmin):
         "trainer__last_name",
     )
     raw_id_fields = ("user", "horse", "trainer")
+    list_select_related = ("user__user", "horse", "trainer")
     date_hierarchy = "preferred_time"
 
 
@@ -203,4 +228,51 @@ class ResourceAdmin(admin.ModelAdmin):
     """
     Админка для модели Resource.
     """
-    list_display = ("title", "link")
\ No newline at end of file
+    list_display = ("title", "link")
+
+
+@admin.register(PriceStatistics)
+class PriceStatisticsAdmin(admin.ModelAdmin):
+    """
+    Админка для статистики цен занятий.
+    """
+    list_display = ("scope", "object_id", "lessons_count", "total_price")
+    list_filter = ("scope",)
+    readonly_fields = ("scope", "object_id", "lessons_count", "total_price")
+
+
+@admin.register(HorseStatistics)
+class HorseStatisticsAdmin(admin.ModelAdmin):
+    """
+    Админка для статистики лошадей.
+    """
+    list_display = (
+        "horse", "lessons_7d", "lessons_30d", "lessons_365d", "lessons_total",
+        "average_price", "total_price", "last_lesson_date", "updated_at"
+    )
+    list_select_related = ("horse",)
+    search_fields = ("horse__name",)
+    readonly_fields = list_display
+
+
+@admin.register(DailyIncome)
+class DailyIncomeAdmin(admin.ModelAdmin):
+    """
+    Админка для дневных итогов платежей.
+    """
+    list_display = ("day", "status", "payments_count", "amount")
+    list_filter = ("status",)
+    date_hierarchy = "day"
+    readonly_fields = list_display
+
+
+@admin.register(DailyLessons)
+class DailyLessonsAdmin(admin.ModelAdmin):
+    """
+    Админка для дневных итогов занятий.
+    """
+    list_display = ("day", "trainer", "horse", "status", "lessons_count", "total_price")
+    list_filter = ("status",)
+    list_select_related = ("trainer", "horse")
+    date_hierarchy = "day"
+    readonly_fields = list_display
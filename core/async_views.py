@@ -0,0 +1,150 @@
+"""
+Асинхронные представления API только для чтения (``/api/async/...``).
+
+Рассчитаны на запуск под ASGI-сервером (uvicorn) рядом с WSGI
+(gunicorn): пока запрос ждёт базу данных, воркер обслуживает других
+клиентов, и медленные клиенты не занимают поток целиком.
+
+Фильтрация, поиск, сортировка, выбор полей (``fields``/``omit``)
+и сериализаторы берутся из соответствующих ViewSet'ов, поэтому ответ
+совпадает с ответом синхронного API. Поддерживается постраничная
+пагинация (``page``, ``page_size``); курсорный режим и кэш ответов
+остаются в синхронном API.
+"""
+
+from collections import OrderedDict
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.viewsets import GenericViewSet
+
+from .mixins import ValuesListMixin
+from .renderers import ORJSONRenderer
+from .views import HorseViewSet, LessonViewSet, NewsPostViewSet, TrainerViewSet
+
+
+class AsyncReadOnlyView(View):
+    """
+    Асинхронный список и детальный просмотр на основе ViewSet'а.
+
+    Подготовка запроса (права, фильтры, контекст сериализатора) выполняется
+    одним переходом в синхронный поток, чтение строк — асинхронным ORM.
+    """
+    viewset_class: type[GenericViewSet]
+    renderer = ORJSONRenderer()
+
+    def build_viewset(self, request: HttpRequest, action: str, **kwargs: Any) -> GenericViewSet:
+        """
+        Создаёт экземпляр ViewSet'а для чтения его настроек.
+        """
+        viewset = self.viewset_class(action=action, args=(), kwargs=kwargs, format_kwarg=None)
+        viewset.request = Request(request, authenticators=viewset.get_authenticators())
+        return viewset
+
+    @staticmethod
+    def prepare(viewset: GenericViewSet) -> tuple[Any, dict[str, Any]]:
+        """
+        Проверяет права и возвращает отфильтрованный QuerySet и контекст сериализатора.
+        """
+        viewset.check_permissions(viewset.request)
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        return queryset, viewset.get_serializer_context()
+
+    async def get(self, request: HttpRequest, pk: Optional[int] = None) -> HttpResponse:
+        try:
+            if pk is None:
+                data = await self.list(self.build_viewset(request, 'list'))
+            else:
+                data = await self.retrieve(self.build_viewset(request, 'retrieve', pk=pk), pk)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return self.render(detail, exc.status_code)
+        return self.render(data)
+
+    def render(self, data: Any, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+        return HttpResponse(self.renderer.render(data), status=status_code, content_type='application/json')
+
+    async def list(self, viewset: GenericViewSet) -> Any:
+        queryset, context = await sync_to_async(self.prepare)(viewset)
+        serializer = viewset.get_serializer_class()(context=context)
+        fast = isinstance(viewset, ValuesListMixin) and viewset.use_values_fast_path(viewset.request)
+        if fast:
+            queryset = serializer.values_queryset(queryset, viewset.values_extra_lookups())
+
+        paginator = viewset.paginator
+        page_size = paginator.get_page_size(viewset.request) if paginator is not None else None
+        if page_size:
+            count = await queryset.acount()
+            number = self.page_number(paginator, viewset.request, count, page_size)
+            offset = (number - 1) * page_size
+            queryset = queryset[offset:offset + page_size]
+        items = [item async for item in queryset]
+
+        if fast:
+            results = [serializer.row_to_representation(row) for row in items]
+        else:
+            results = viewset.get_serializer_class()(items, many=True, context=context).data
+        if not page_size:
+            return results
+        return OrderedDict([
+            ('count', count),
+            ('next', self.page_link(paginator, viewset.request, number + 1) if offset + page_size < count else None),
+            ('previous', self.page_link(paginator, viewset.request, number - 1) if number > 1 else None),
+            ('results', results),
+        ])
+
+    async def retrieve(self, viewset: GenericViewSet, pk: int) -> Any:
+        queryset, context = await sync_to_async(self.prepare)(viewset)
+        try:
+            obj = await queryset.aget(pk=pk)
+        except queryset.model.DoesNotExist:
+            raise NotFound()
+        return viewset.get_serializer_class()(obj, context=context).data
+
+    @staticmethod
+    def page_number(paginator: Any, request: Request, count: int, page_size: int) -> int:
+        """
+        Возвращает номер страницы из запроса (как Django Paginator).
+
+        Raises:
+            NotFound: Если номер некорректен или страницы нет.
+        """
+        value = request.query_params.get(paginator.page_query_param, 1)
+        if value in paginator.last_page_strings:
+            value = max(1, -(-count // page_size))
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise NotFound(paginator.invalid_page_message.format(page_number=value, message='Неверный номер страницы.'))
+        if number < 1 or (number > 1 and (number - 1) * page_size >= count):
+            raise NotFound(paginator.invalid_page_message.format(page_number=value, message='Страница не найдена.'))
+        return number
+
+    @staticmethod
+    def page_link(paginator: Any, request: Request, number: int) -> str:
+        url = request.build_absolute_uri()
+        if number == 1:
+            return remove_query_param(url, paginator.page_query_param)
+        return replace_query_param(url, paginator.page_query_param, number)
+
+
+class NewsPostAsyncView(AsyncReadOnlyView):
+    viewset_class = NewsPostViewSet
+
+
+class TrainerAsyncView(AsyncReadOnlyView):
+    viewset_class = TrainerViewSet
+
+
+class HorseAsyncView(AsyncReadOnlyView):
+    viewset_class = HorseViewSet
+
+
+class LessonAsyncView(AsyncReadOnlyView):
+    viewset_class = LessonViewSet
@@ -0,0 +1,392 @@
+"""
+Автодополнение имён лошадей и тренеров.
+
+Каждый процесс (воркер gunicorn) держит в памяти префиксный индекс:
+отсортированный список нормализованных слов и полных имён (русских
+и английских) для поиска двоичным поиском, а также триграммы для
+нечёткого поиска при опечатках.
+
+Воркеры синхронизируются через общий кэш (Redis): сигналы после коммита
+записывают изменённые объекты в журнал изменений с порядковым номером.
+Перед ответом воркер сверяет номер с последним применённым и догружает
+только изменённые объекты; при отставании больше ``JOURNAL_SIZE``
+или потере журнала индекс пересобирается целиком.
+
+Номер изменения выделяется (``incr``) раньше, чем записывается само
+изменение, поэтому читатель может увидеть номер без записи. Такой пропуск
+не считается потерей журнала сразу: применяются изменения до пропуска,
+остальные догружаются при следующем запросе, и только если запись так и не
+появилась за ``JOURNAL_GAP_GRACE`` секунд, индекс пересобирается.
+
+Без общего кэша (``settings.SHARED_CACHE``) журнал был бы у каждого
+процесса свой и изменения из других процессов терялись бы. Тогда индекс
+процесса пересобирается целиком, когда меняются версии моделей
+(``core.caching``), а изменения из других процессов, которые версии этого
+процесса не затрагивают, подхватываются не позже чем через
+``LOCAL_INDEX_MAX_AGE`` секунд.
+
+Запись в журнал не должна ломать сохранение моделей: при недоступном кэше
+ошибка записывается в журнал приложения, а отставшие воркеры пересоберут
+индекс по пропуску в журнале.
+"""
+
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db import models
+
+from .caching import cache_errors, get_versions, shared_cache
+from .models import Horse, Trainer
+
+logger = logging.getLogger(__name__)
+
+HORSE = 'horse'
+TRAINER = 'trainer'
+KINDS = (HORSE, TRAINER)
+
+SEQUENCE_KEY = 'autocomplete:sequence'
+CHANGE_KEY_PREFIX = 'autocomplete:change'
+
+# Сколько изменений хранится в журнале (и догружается без пересборки)
+JOURNAL_SIZE = 500
+JOURNAL_TIMEOUT = 24 * 60 * 60
+# Сколько секунд ждать запись изменения, номер которого уже выделен
+JOURNAL_GAP_GRACE = 5.0
+# Наибольший возраст индекса процесса без общего кэша, секунд
+LOCAL_INDEX_MAX_AGE = 60.0
+
+# Минимальное сходство по триграммам для нечёткого поиска
+TRIGRAM_THRESHOLD = 0.3
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Приводит текст к виду для сравнения: нижний регистр, «ё» → «е», одиночные пробелы.
+    """
+    return _SPACE_RE.sub(' ', (text or '').lower().replace('ё', 'е')).strip()
+
+
+def trigrams(text: str) -> set[str]:
+    """
+    Возвращает триграммы слов текста (с пробелами по краям, как в pg_trgm).
+    """
+    result = set()
+    for word in text.split():
+        padded = f"  {word} "
+        result.update(padded[index:index + 3] for index in range(len(padded) - 2))
+    return result
+
+
+@dataclass(frozen=True)
+class Entry:
+    """
+    Элемент автодополнения.
+    """
+    kind: str
+    object_id: int
+    label: str
+    label_en: str
+
+    @property
+    def key(self) -> tuple[str, int]:
+        return (self.kind, self.object_id)
+
+    def terms(self) -> set[str]:
+        """
+        Возвращает строки, по префиксу которых находится элемент:
+        полные имена и отдельные слова.
+        """
+        result = set()
+        for label in (self.label, self.label_en):
+            label = normalize(label)
+            if label:
+                result.add(label)
+                result.update(label.split())
+        return result
+
+
+def horse_entry(horse: Horse) -> Entry:
+    return Entry(HORSE, horse.pk, horse.name, horse.name_en or '')
+
+
+def trainer_entry(trainer: Trainer) -> Entry:
+    return Entry(
+        TRAINER,
+        trainer.pk,
+        f"{trainer.first_name} {trainer.last_name}",
+        f"{trainer.first_name_en} {trainer.last_name_en}".strip(),
+    )
+
+
+# Индексируемые модели: вид элемента, поля и построение элемента
+SOURCES: dict[str, tuple[type[models.Model], tuple[str, ...], object]] = {
+    HORSE: (Horse, ('id', 'name', 'name_en'), horse_entry),
+    TRAINER: (Trainer, ('id', 'first_name', 'last_name', 'first_name_en', 'last_name_en'), trainer_entry),
+}
+MODEL_KINDS = {model: kind for kind, (model, _fields, _build) in SOURCES.items()}
+
+
+class PrefixIndex:
+    """
+    Префиксный и триграммный индекс элементов автодополнения.
+    """
+
+    def __init__(self, entries: Iterable[Entry] = ()) -> None:
+        self.entries: dict[tuple[str, int], Entry] = {}
+        self.terms: list[tuple[str, str, int]] = []
+        self.trigrams: dict[str, set[tuple[str, int]]] = {}
+        self.word_trigrams: dict[tuple[str, int], list[set[str]]] = {}
+        self.labels: dict[tuple[str, int], tuple[str, str]] = {}
+        for entry in entries:
+            self._add(entry, sort=False)
+        self.terms.sort()
+
+    def _add(self, entry: Entry, sort: bool = True) -> None:
+        self.entries[entry.key] = entry
+        self.labels[entry.key] = (normalize(entry.label), normalize(entry.label_en))
+        for term in entry.terms():
+            item = (term, entry.kind, entry.object_id)
+            if sort:
+                insort(self.terms, item)
+            else:
+                self.terms.append(item)
+        words = {word for term in entry.terms() for word in term.split()}
+        self.word_trigrams[entry.key] = [trigrams(word) for word in words]
+        for trigram in set().union(*self.word_trigrams[entry.key]):
+            self.trigrams.setdefault(trigram, set()).add(entry.key)
+
+    def add(self, entry: Entry) -> None:
+        """
+        Добавляет или заменяет элемент.
+        """
+        self.remove(entry.kind, entry.object_id)
+        self._add(entry)
+
+    def remove(self, kind: str, object_id: int) -> None:
+        """
+        Удаляет элемент, если он есть в индексе.
+        """
+        entry = self.entries.pop((kind, object_id), None)
+        if entry is None:
+            return
+        del self.labels[entry.key]
+        for term in entry.terms():
+            position = bisect_left(self.terms, (term, kind, object_id))
+            if position < len(self.terms) and self.terms[position] == (term, kind, object_id):
+                del self.terms[position]
+        for trigram in set().union(*self.word_trigrams.pop(entry.key)):
+            keys = self.trigrams.get(trigram)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self.trigrams[trigram]
+
+    def complete(self, query: str, kinds: Iterable[str], limit: int) -> list[Entry]:
+        """
+        Возвращает элементы, имя или слово имени которых начинается с запроса.
+
+        Совпадения с началом полного имени идут первыми, затем по алфавиту.
+        """
+        prefix = normalize(query)
+        kinds = set(kinds)
+        found: dict[tuple[str, int], bool] = {}
+        position = bisect_left(self.terms, (prefix,))
+        while position < len(self.terms) and self.terms[position][0].startswith(prefix):
+            term, kind, object_id = self.terms[position]
+            position += 1
+            if kind not in kinds:
+                continue
+            key = (kind, object_id)
+            found[key] = found.get(key, False) or term in self.labels[key]
+        ordered = sorted(found, key=lambda key: (not found[key], self.labels[key][0], key))
+        return [self.entries[key] for key in ordered[:limit]]
+
+    def fuzzy(self, query: str, kinds: Iterable[str], limit: int) -> list[Entry]:
+        """
+        Возвращает элементы, похожие на запрос по триграммам (для опечаток).
+        """
+        query_trigrams = trigrams(normalize(query))
+        if not query_trigrams:
+            return []
+        kinds = set(kinds)
+        shared: Counter = Counter()
+        for trigram in query_trigrams:
+            for key in self.trigrams.get(trigram, ()):
+                if key[0] in kinds:
+                    shared[key] += 1
+        scored = []
+        for key, count in shared.items():
+            # Сходство не выше count / |триграммы запроса|: отсекаем заведомо далёкие
+            if count < TRIGRAM_THRESHOLD * len(query_trigrams):
+                continue
+            # Сходство считается с лучшим словом имени: запрос обычно короче полного имени
+            best = max(
+                len(query_trigrams & word) / len(query_trigrams | word) for word in self.word_trigrams[key]
+            )
+            if best >= TRIGRAM_THRESHOLD:
+                scored.append((-best, self.labels[key][0], key))
+        return [self.entries[key] for _score, _label, key in sorted(scored)[:limit]]
+
+
+def load_entries(kind: str, ids: Optional[Iterable[int]] = None) -> list[Entry]:
+    """
+    Загружает элементы вида из базы данных (все или только указанные ID).
+    """
+    model, fields, build = SOURCES[kind]
+    queryset = model.objects.only(*fields).order_by()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=list(ids))
+    return [build(obj) for obj in queryset]
+
+
+class AutocompleteState:
+    """
+    Индекс процесса и номер последнего применённого изменения журнала.
+    """
+
+    def __init__(self) -> None:
+        self.index: Optional[PrefixIndex] = None
+        self.sequence = 0
+        self.lock = threading.Lock()
+        # Номер первой отсутствующей записи журнала и когда пропуск замечен
+        self.gap: Optional[tuple[int, float]] = None
+        # Без общего кэша: версии моделей, по которым построен индекс, и когда он построен
+        self.versions: Optional[dict[str, int]] = None
+        self.built_at = 0.0
+
+    def rebuild(self, sequence: int) -> None:
+        self.index = build_index()
+        self.sequence = sequence
+        self.gap = None
+        self.built_at = time.monotonic()
+
+    def catch_up(self, sequence: int) -> None:
+        """
+        Применяет изменения журнала с номерами после последнего применённого.
+        """
+        keys = [f"{CHANGE_KEY_PREFIX}:{number}" for number in range(self.sequence + 1, sequence + 1)]
+        changes = cache.get_many(keys)
+        applied = []
+        for key in keys:
+            if key not in changes:
+                break
+            applied.append(changes[key])
+        if len(applied) < len(keys):
+            missing = self.sequence + len(applied) + 1
+            if self.gap is None or self.gap[0] != missing:
+                self.gap = (missing, time.monotonic())
+            elif time.monotonic() - self.gap[1] > JOURNAL_GAP_GRACE:
+                # Запись так и не появилась: журнал вытеснен из кэша, изменения неизвестны
+                self.rebuild(sequence)
+                return
+            sequence = missing - 1
+        else:
+            self.gap = None
+        changed: dict[str, set[int]] = {}
+        for kind, object_id in applied:
+            changed.setdefault(kind, set()).add(object_id)
+        for kind, ids in changed.items():
+            entries = {entry.object_id: entry for entry in load_entries(kind, ids)}
+            for object_id in ids:
+                if object_id in entries:
+                    self.index.add(entries[object_id])
+                else:
+                    self.index.remove(kind, object_id)
+        self.sequence = sequence
+
+    def get_index(self) -> PrefixIndex:
+        """
+        Возвращает индекс, синхронизированный с журналом изменений.
+        """
+        sequence = current_sequence()
+        if self.index is not None and sequence == self.sequence:
+            return self.index
+        with self.lock:
+            if self.index is None or sequence < self.sequence or sequence - self.sequence > JOURNAL_SIZE:
+                self.rebuild(sequence)
+            elif sequence > self.sequence:
+                self.catch_up(sequence)
+            return self.index
+
+    def get_local_index(self) -> PrefixIndex:
+        """
+        Возвращает индекс без общего кэша: пересобирает его при изменении
+        версий моделей или по истечении ``LOCAL_INDEX_MAX_AGE``.
+        """
+        versions = get_versions(MODEL_KINDS)
+        with self.lock:
+            if (
+                self.index is None
+                or versions != self.versions
+                or time.monotonic() - self.built_at > LOCAL_INDEX_MAX_AGE
+            ):
+                self.rebuild(0)
+                self.versions = versions
+            return self.index
+
+
+_state = AutocompleteState()
+
+
+def build_index() -> PrefixIndex:
+    """
+    Строит индекс всех элементов по базе данных.
+    """
+    return PrefixIndex(entry for kind in KINDS for entry in load_entries(kind))
+
+
+def current_sequence() -> int:
+    """
+    Возвращает номер последнего изменения в журнале.
+    """
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        cache.add(SEQUENCE_KEY, 0, timeout=None)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+    return sequence
+
+
+def publish_change(kind: str, object_id: int) -> None:
+    """
+    Записывает изменение объекта в журнал, общий для всех воркеров
+    (ошибка недоступного кэша только записывается в журнал приложения).
+    """
+    try:
+        current_sequence()
+        sequence = cache.incr(SEQUENCE_KEY)
+        cache.set(f"{CHANGE_KEY_PREFIX}:{sequence}", (kind, object_id), JOURNAL_TIMEOUT)
+    except cache_errors() as e:
+        logger.warning(f"Не удалось записать изменение автодополнения ({kind} {object_id}): {e}")
+
+
+def suggest(query: str, kinds: Optional[Iterable[str]] = None, limit: int = 10) -> tuple[list[Entry], bool]:
+    """
+    Возвращает подсказки для запроса и признак нечёткого поиска.
+
+    Если префиксных совпадений нет, используется поиск по триграммам.
+    """
+    kinds = list(kinds or KINDS)
+    if not normalize(query):
+        return [], False
+    index = _state.get_index() if shared_cache() else _state.get_local_index()
+    entries = index.complete(query, kinds, limit)
+    if entries:
+        return entries, False
+    return index.fuzzy(query, kinds, limit), True
+
+
+def reset() -> None:
+    """
+    Сбрасывает индекс процесса (он будет построен при следующем запросе).
+    """
+    global _state
+    _state = AutocompleteState()
@@ -0,0 +1,90 @@
+"""
+Версии моделей для HTTP-кэширования.
+
+Каждая отслеживаемая модель имеет метку версии в общем кэше (Redis),
+которая меняется при сохранении и удалении её записей. По версиям
+зависимостей представление вычисляет ETag и Last-Modified, не обращаясь
+к базе данных.
+
+Версии имеют смысл только в кэше, общем для всех процессов
+(``settings.SHARED_CACHE``): в памяти процесса у каждого worker'а своя
+версия, и изменение, сделанное в одном процессе, не видно в другом.
+Без общего кэша условные GET и кэш ответов отключаются.
+
+Запись версий не должна ломать сохранение моделей: при недоступном кэше
+ошибка записывается в журнал, а сохранение продолжается.
+"""
+
+import logging
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY_PREFIX = 'model-version'
+
+
+def cache_errors() -> tuple[type[Exception], ...]:
+    """
+    Возвращает исключения, при которых кэш считается недоступным.
+    """
+    try:
+        import redis
+    except ImportError:
+        return (OSError,)
+    return (redis.RedisError, OSError)
+
+
+def shared_cache() -> bool:
+    """
+    Проверяет, общий ли кэш для всех процессов (Redis), а не память процесса.
+    """
+    return getattr(settings, 'SHARED_CACHE', False)
+
+
+def version_key(model: type[models.Model]) -> str:
+    """
+    Возвращает ключ кэша с версией модели.
+    """
+    return f"{VERSION_KEY_PREFIX}:{model._meta.label_lower}"
+
+
+def new_version() -> int:
+    """
+    Возвращает новую метку версии (время в микросекундах).
+    """
+    return time.time_ns() // 1000
+
+
+def bump_versions(*model_classes: type[models.Model]) -> None:
+    """
+    Обновляет версии моделей (ошибка недоступного кэша только записывается в журнал).
+    """
+    version = new_version()
+    try:
+        cache.set_many({version_key(model): version for model in model_classes}, timeout=None)
+    except cache_errors() as e:
+        labels = ', '.join(model._meta.label for model in model_classes)
+        logger.warning(f"Не удалось обновить версии моделей ({labels}): {e}")
+
+
+def get_versions(model_classes: Iterable[type[models.Model]]) -> dict[str, int]:
+    """
+    Возвращает версии моделей одним обращением к кэшу.
+
+    Отсутствующие версии (холодный кэш, вытеснение) инициализируются
+    текущим временем, чтобы все процессы получили одинаковое значение.
+    """
+    keys = [version_key(model) for model in model_classes]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        version = new_version()
+        for key in missing:
+            cache.add(key, version, timeout=None)
+        versions.update(cache.get_many(missing))
+    return versions
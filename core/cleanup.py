@@ -0,0 +1,168 @@
+"""
+Очистка старых данных и неиспользуемых медиафайлов.
+
+``delete_in_batches`` удаляет строки пакетами по списку первичных ключей: каждый
+пакет — отдельная короткая транзакция, между пакетами делается пауза,
+поэтому блокировки не удерживаются надолго и параллельные запросы
+успевают выполниться.
+
+``sweep_orphaned_media`` обходит каталоги загрузок (``os.scandir``,
+без построения полного списка файлов) и удаляет файлы, на которые
+не ссылается ни одна строка. Свежие файлы не трогаются: файл
+сохраняется в хранилище раньше, чем строка с ссылкой на него. Файлы,
+подходящие под шаблоны ``settings.MEDIA_SWEEP_KEEP``, не удаляются никогда.
+"""
+
+import logging
+import os
+import time
+from fnmatch import fnmatchcase
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+
+from .models import Horse, NewsPost, Trainer
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_BATCH_SIZE = 500
+# Пауза между пакетами удаления, секунд
+CLEANUP_PAUSE = 0.2
+
+# Поля с файлами; каталог загрузки берётся из upload_to поля
+MEDIA_FIELDS: tuple[tuple[type[models.Model], str], ...] = (
+    (NewsPost, 'image'),
+    (NewsPost, 'attachment'),
+    (Horse, 'photo'),
+    (Trainer, 'photo'),
+)
+
+# Файлы моложе этого возраста не удаляются (загрузка ещё не сохранена в БД)
+MEDIA_MIN_AGE = timedelta(hours=1)
+
+
+def delete_in_batches(
+    queryset: models.QuerySet,
+    batch_size: int = CLEANUP_BATCH_SIZE,
+    pause: float = CLEANUP_PAUSE,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Удаляет строки QuerySet пакетами по первичному ключу.
+
+    Args:
+        queryset: Удаляемые строки.
+        batch_size: Строк в пакете (одна транзакция).
+        pause: Пауза между пакетами в секундах.
+        progress: Вызывается после каждого пакета с числом удалённых строк.
+
+    Returns:
+        Количество удалённых строк модели QuerySet (без каскадных).
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        # Без сортировки: план остаётся на индексе условия, удалённые строки в следующий пакет не попадают
+        pks = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic():
+            _total, per_model = model.objects.filter(pk__in=pks).delete()
+        deleted += per_model.get(model._meta.label, 0)
+        if progress:
+            progress(deleted)
+        if len(pks) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+@dataclass
+class SweepReport:
+    """
+    Итог очистки медиафайлов: просмотрено файлов, удалено файлов и байт.
+    """
+    scanned: int = 0
+    removed: int = 0
+    removed_bytes: int = 0
+
+
+def media_directories() -> list[str]:
+    """
+    Возвращает каталоги загрузок полей MEDIA_FIELDS (относительно MEDIA_ROOT).
+    """
+    return sorted({model._meta.get_field(name).upload_to.rstrip('/') for model, name in MEDIA_FIELDS})
+
+
+def referenced_files() -> set[str]:
+    """
+    Возвращает имена файлов, на которые ссылаются строки.
+    """
+    names = set()
+    for model, name in MEDIA_FIELDS:
+        values = model.objects.exclude(**{f'{name}__isnull': True}).exclude(**{name: ''})
+        names.update(values.values_list(name, flat=True).iterator(chunk_size=2000))
+    return names
+
+
+def walk_files(path: str) -> Iterator[os.DirEntry]:
+    """
+    Обходит файлы каталога рекурсивно, не загружая список целиком.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def sweep_orphaned_media(
+    dry_run: bool = False,
+    min_age: timedelta = MEDIA_MIN_AGE,
+    progress: Optional[Callable[[SweepReport], None]] = None,
+    progress_every: int = 1000,
+) -> SweepReport:
+    """
+    Удаляет файлы каталогов загрузок, на которые не ссылается ни одна строка
+    и которые не подходят под шаблоны ``settings.MEDIA_SWEEP_KEEP``.
+
+    Args:
+        dry_run: Только посчитать файлы, не удаляя.
+        min_age: Файлы моложе этого возраста пропускаются.
+        progress: Вызывается каждые ``progress_every`` просмотренных файлов.
+
+    Returns:
+        Отчёт об очистке.
+    """
+    report = SweepReport()
+    directories = [
+        default_storage.path(directory) for directory in media_directories() if default_storage.exists(directory)
+    ]
+    if not directories:
+        return report
+    referenced = referenced_files()
+    keep = list(getattr(settings, 'MEDIA_SWEEP_KEEP', ()))
+    root = default_storage.path('')
+    newest = time.time() - min_age.total_seconds()
+    for path in directories:
+        for entry in walk_files(path):
+            report.scanned += 1
+            if progress and report.scanned % progress_every == 0:
+                progress(report)
+            name = os.path.relpath(entry.path, root).replace(os.sep, '/')
+            if name in referenced or any(fnmatchcase(name, pattern) for pattern in keep):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > newest:
+                continue
+            report.removed += 1
+            report.removed_bytes += stat.st_size
+            if not dry_run:
+                default_storage.delete(name)
+                logger.info(f"Удалён файл без ссылок: {name} ({stat.st_size} байт)")
+    return report
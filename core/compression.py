@@ -0,0 +1,218 @@
+"""
+Сжатие HTTP-ответов (brotli и gzip).
+
+Используется CompressionMiddleware для обычных и потоковых ответов;
+сжатые варианты ответов из кэша API (ResponseCacheMixin) хранятся рядом
+с ответом и сжимаются один раз. Brotli — необязательная зависимость: без пакета ``brotli``
+ответы сжимаются только gzip.
+
+Ответы с CSRF-токеном (страницы с формами) уязвимы для BREACH: по длине
+сжатого ответа можно подобрать токен. Такие ответы сжимаются только gzip
+со случайным дополнением длины, как в GZipMiddleware Django
+(``django.utils.text.compress_string``), а потоковые не сжимаются вовсе.
+"""
+
+import gzip
+import zlib
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponseBase
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli необязателен
+    brotli = None
+
+# Кодировки в порядке предпочтения
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Более короткие ответы не сжимаются: выигрыш меньше накладных расходов
+MIN_LENGTH = 200
+
+# Уровни сжатия: на лету — быстрый, для кэша (сжимается один раз) — плотнее
+BROTLI_QUALITY = 5
+BROTLI_CACHED_QUALITY = 9
+GZIP_LEVEL = 6
+
+# Максимум случайных байт, добавляемых к сжатому ответу с секретом (защита от BREACH)
+BREACH_MAX_RANDOM_BYTES = 100
+
+# Типы содержимого, которые имеет смысл сжимать (изображения, архивы и т. п. уже сжаты)
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'application/msgpack',
+    'image/svg+xml',
+)
+
+_ACCEPT_ENCODING_RE = _lazy_re_compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?\s*$')
+
+
+def choose_encoding(accept_encoding: str, encodings: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """
+    Выбирает кодировку по заголовку Accept-Encoding (с учётом q-значений).
+
+    Args:
+        accept_encoding: Значение заголовка Accept-Encoding.
+        encodings: Допустимые кодировки в порядке предпочтения.
+
+    Returns:
+        'br', 'gzip' или None, если клиент не принимает поддерживаемые кодировки.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        match = _ACCEPT_ENCODING_RE.match(part)
+        if not match:
+            continue
+        try:
+            weights[match[1].lower()] = float(match[2]) if match[2] else 1.0
+        except ValueError:
+            continue
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(response: HttpResponseBase) -> bool:
+    """
+    Проверяет, можно ли сжать ответ: тип содержимого сжимаемый и ответ ещё не сжат.
+    """
+    if response.has_header('Content-Encoding'):
+        return False
+    if 'no-transform' in response.get('Cache-Control', ''):
+        return False
+    content_type = response.get('Content-Type', '').lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def has_csrf_token(request: HttpRequest, response: HttpResponseBase) -> bool:
+    """
+    Проверяет, попал ли в ответ CSRF-токен.
+
+    CsrfViewMiddleware (внутри CompressionMiddleware) к этому моменту уже
+    сбросил флаг ``CSRF_COOKIE_NEEDS_UPDATE`` в False, но сам ключ остаётся
+    в META только после get_token/rotate_token. Установленная cookie
+    с токеном — второй признак.
+    """
+    return 'CSRF_COOKIE_NEEDS_UPDATE' in request.META or settings.CSRF_COOKIE_NAME in response.cookies
+
+
+def compress_padded(data: bytes) -> bytes:
+    """
+    Сжимает тело gzip со случайным дополнением длины (защита от BREACH).
+    """
+    return compress_string(data, max_random_bytes=BREACH_MAX_RANDOM_BYTES)
+
+
+def compress(data: bytes, encoding: str, cached: bool = False) -> bytes:
+    """
+    Сжимает тело ответа целиком.
+
+    Args:
+        data: Исходное тело.
+        encoding: 'br' или 'gzip'.
+        cached: Результат будет сохранён в кэше (используется более плотное сжатие).
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_CACHED_QUALITY if cached else BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class StreamCompressor:
+    """
+    Потоковый компрессор: каждый фрагмент сжимается и сразу отдаётся клиенту.
+    """
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, data: bytes) -> bytes:
+        """
+        Сжимает фрагмент и сбрасывает буфер, чтобы клиент получил его без задержки.
+        """
+        if not data:
+            return b''
+        if self.encoding == 'br':
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """
+        Завершает поток.
+        """
+        if self.encoding == 'br':
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Сжимает поток фрагментов.
+    """
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        data = compressor.chunk(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks: AsyncIterator[bytes], encoding: str) -> AsyncIterator[bytes]:
+    """
+    Сжимает асинхронный поток фрагментов.
+    """
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.chunk(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressedVariants:
+    """
+    Сжатые варианты закэшированного ответа.
+
+    Хранятся в той же записи кэша, что и ответ: недостающий вариант
+    сжимается при первом запросе и дописывается в запись.
+    """
+
+    def __init__(self, key: str, entry: dict, timeout: int) -> None:
+        self.key = key
+        self.entry = entry
+        self.timeout = timeout
+
+    def get(self, encoding: str) -> bytes:
+        encoded = self.entry.setdefault('encoded', {})
+        if encoding not in encoded:
+            encoded[encoding] = compress(self.entry['content'], encoding, cached=True)
+            cache.set(self.key, self.entry, self.timeout)
+        return encoded[encoding]
+
+
+def mark_encoded(response: HttpResponseBase, encoding: str) -> None:
+    """
+    Проставляет заголовки сжатого ответа.
+
+    Сильный ETag становится слабым: сжатое представление отличается побайтно.
+    """
+    response['Content-Encoding'] = encoding
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = f"W/{etag}"
+    patch_vary_headers(response, ('Accept-Encoding',))
@@ -0,0 +1,139 @@
+"""
+Счётчики объектов для блока статистики главной страницы.
+
+Значения хранятся в кэше (Redis) без срока жизни. Сигналы моделей после
+коммита транзакции прибавляют или вычитают единицу, поэтому в обычном
+режиме чтение счётчиков не обращается к базе данных. Отсутствующий
+(вытесненный) счётчик пересчитывается через ``COUNT(*)`` при чтении,
+а задача ``reconcile_home_counters`` периодически сверяет все значения
+с базой (изменения через ``QuerySet.update``/``bulk_create`` обходят сигналы).
+
+Без общего кэша (``settings.SHARED_CACHE``) у каждого процесса были бы свои
+счётчики, и изменения из других процессов в них не попадали бы, поэтому
+значения всегда считаются по базе данных. Так же счётчики читаются при
+недоступном кэше, а изменения после коммита в этом случае только записываются
+в журнал: сохранение моделей от кэша не зависит.
+"""
+
+import logging
+from typing import Any, Optional
+
+from django.core.cache import cache
+from django.db import models
+
+from .caching import cache_errors, shared_cache
+from .models import Horse, Lesson, NewsPost, Payment, Trainer
+
+logger = logging.getLogger(__name__)
+
+# Имя счётчика: модель и условие, которому должен удовлетворять объект
+COUNTERS: dict[str, tuple[type[models.Model], dict[str, Any]]] = {
+    'horses': (Horse, {}),
+    'trainers': (Trainer, {}),
+    'news': (NewsPost, {'is_active': True}),
+    'lessons': (Lesson, {}),
+    'payments': (Payment, {}),
+}
+
+# Счётчики каждой модели
+MODEL_COUNTERS: dict[type[models.Model], list[str]] = {}
+for _name, (_model, _conditions) in COUNTERS.items():
+    MODEL_COUNTERS.setdefault(_model, []).append(_name)
+
+KEY_PREFIX = 'counter'
+
+
+def counter_key(name: str) -> str:
+    return f"{KEY_PREFIX}:{name}"
+
+
+def count_objects(name: str) -> int:
+    """
+    Считает объекты счётчика по базе данных.
+    """
+    model, conditions = COUNTERS[name]
+    return model.objects.filter(**conditions).count()
+
+
+def counted(name: str, values: dict[str, Any]) -> bool:
+    """
+    Проверяет, входит ли объект с указанными значениями полей в счётчик.
+    """
+    _model, conditions = COUNTERS[name]
+    return all(values.get(field) == value for field, value in conditions.items())
+
+
+def counter_fields(model: type[models.Model]) -> list[str]:
+    """
+    Возвращает поля модели, от которых зависит попадание объекта в счётчики.
+    """
+    return sorted({field for name in MODEL_COUNTERS[model] for field in COUNTERS[name][1]})
+
+
+def counter_deltas(
+    model: type[models.Model], old: Optional[dict[str, Any]], new: Optional[dict[str, Any]]
+) -> dict[str, int]:
+    """
+    Возвращает изменения счётчиков при изменении объекта.
+
+    Args:
+        model: Модель объекта.
+        old: Значения полей до изменения (None для нового объекта).
+        new: Значения полей после изменения (None для удалённого объекта).
+    """
+    deltas = {}
+    for name in MODEL_COUNTERS[model]:
+        delta = int(new is not None and counted(name, new)) - int(old is not None and counted(name, old))
+        if delta:
+            deltas[name] = delta
+    return deltas
+
+
+def get_counters() -> dict[str, int]:
+    """
+    Возвращает значения всех счётчиков одним обращением к кэшу
+    (без общего кэша или при его недоступности — по базе данных).
+    """
+    if not shared_cache():
+        return {name: count_objects(name) for name in COUNTERS}
+    keys = {name: counter_key(name) for name in COUNTERS}
+    try:
+        cached = cache.get_many(keys.values())
+        counters = {}
+        for name, key in keys.items():
+            if key not in cached:
+                # add(): не перезаписываем значение, посчитанное параллельным процессом
+                cache.add(key, count_objects(name), timeout=None)
+                cached[key] = cache.get(key)
+            counters[name] = cached[key]
+    except cache_errors() as e:
+        logger.warning(f"Счётчики недоступны, расчёт по базе данных: {e}")
+        return {name: count_objects(name) for name in COUNTERS}
+    return counters
+
+
+def change_counter(name: str, delta: int) -> None:
+    """
+    Изменяет счётчик на ``delta``.
+
+    Отсутствующий счётчик не создаётся: он будет посчитан при чтении.
+    """
+    try:
+        cache.incr(counter_key(name), delta)
+    except ValueError:
+        pass
+    except cache_errors() as e:
+        # Расхождение исправит сверка reconcile_home_counters
+        logger.warning(f"Не удалось изменить счётчик {name}: {e}")
+
+
+def reconcile_counters() -> dict[str, int]:
+    """
+    Пересчитывает все счётчики по базе данных.
+
+    Returns:
+        Значения счётчиков.
+    """
+    counters = {name: count_objects(name) for name in COUNTERS}
+    cache.set_many({counter_key(name): value for name, value in counters.items()}, timeout=None)
+    return counters
@@ -0,0 +1,356 @@
+"""
+Генерация синтетических данных для профилирования и нагрузочных замеров.
+
+Объекты создаются через ``bulk_create`` пакетами (каждый пакет — отдельная
+транзакция), без сигналов моделей, поэтому после генерации производные
+данные (статистика цен, счётчики, рейтинги, дневные итоги, поисковый индекс)
+пересчитываются целиком. Все строковые значения удовлетворяют
+``RegexValidator`` полей моделей.
+
+Популярность лошадей и учеников распределена по закону Ципфа
+(параметр ``skew``; 0 — равномерно): несколько лошадей получают
+большую часть занятий, как в реальной конюшне.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Callable, Iterator, Optional, Sequence
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import counters, leaderboards, rollups, search, stats
+from .caching import bump_versions
+from .models import Horse, HorseTrainerRelation, Lesson, NewsPost, Payment, Stable, Trainer, UserProfile
+from .notifications import reminder_due_at
+
+FIRST_NAMES = (
+    ('Анна', 'Anna'), ('Мария', 'Maria'), ('Елена', 'Elena'), ('Ольга', 'Olga'), ('Ирина', 'Irina'),
+    ('Алексей', 'Aleksey'), ('Дмитрий', 'Dmitry'), ('Сергей', 'Sergey'), ('Иван', 'Ivan'), ('Павел', 'Pavel'),
+)
+LAST_NAMES = (
+    ('Иванова', 'Ivanova'), ('Смирнова', 'Smirnova'), ('Кузнецова', 'Kuznetsova'), ('Попова', 'Popova'),
+    ('Соколов', 'Sokolov'), ('Лебедев', 'Lebedev'), ('Козлов', 'Kozlov'), ('Новиков', 'Novikov'),
+    ('Морозов', 'Morozov'), ('Волков', 'Volkov'),
+)
+HORSE_NAMES = (
+    ('Буран', 'Buran'), ('Гром', 'Grom'), ('Звезда', 'Zvezda'), ('Ласточка', 'Lastochka'), ('Вихрь', 'Vikhr'),
+    ('Искра', 'Iskra'), ('Орлик', 'Orlik'), ('Сокол', 'Sokol'), ('Тайфун', 'Tayfun'), ('Янтарь', 'Yantar'),
+)
+CITIES = ('Москва', 'Санкт-Петербург', 'Казань', 'Тверь', 'Калуга')
+NEWS_TOPICS = (
+    'Открытие летнего сезона', 'Новые лошади в конюшне', 'Соревнования по конкуру',
+    'Изменение расписания занятий', 'Мастер-класс по выездке', 'Праздник для юных наездников',
+)
+# Часы начала занятий
+LESSON_HOURS = range(8, 21)
+
+
+@dataclass
+class DatasetConfig:
+    """
+    Размеры набора данных и распределения значений.
+    """
+    stables: int = 10
+    trainers: int = 50
+    horses: int = 200
+    students: int = 5000
+    lessons: int = 100_000
+    news: int = 1000
+    # Тренеров у каждой лошади
+    trainers_per_horse: int = 2
+    # Занятия распределены по последним ``days`` дням и ближайшим ``future_days`` дням
+    days: int = 365
+    future_days: int = 30
+    # Доля прошедших занятий со статусом completed (остальные — scheduled)
+    completed_ratio: float = 0.9
+    # Доля завершённых занятий с платежом и распределение статусов платежей
+    payment_ratio: float = 0.8
+    payment_statuses: dict[str, float] = field(
+        default_factory=lambda: {'completed': 0.9, 'pending': 0.07, 'failed': 0.03}
+    )
+    # Доля неактивных новостей
+    inactive_news_ratio: float = 0.1
+    # Цена занятия: от и до (кратно 100)
+    price_min: int = 1500
+    price_max: int = 5000
+    # Показатель распределения Ципфа для популярности лошадей и учеников
+    skew: float = 1.0
+    batch_size: int = 5000
+    seed: Optional[int] = None
+    # Общий пароль учеников (None — вход недоступен)
+    password: Optional[str] = None
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    """
+    Возвращает накопленные веса распределения Ципфа для ``count`` элементов.
+    """
+    return list(accumulate(1 / (rank ** skew) for rank in range(1, count + 1)))
+
+
+def batched(total: int, size: int) -> Iterator[range]:
+    """
+    Разбивает ``range(total)`` на диапазоны не длиннее ``size``.
+    """
+    for start in range(0, total, size):
+        yield range(start, min(start + size, total))
+
+
+class DatasetGenerator:
+    """
+    Генератор набора данных по конфигурации.
+
+    Пример:
+        DatasetGenerator(DatasetConfig(lessons=1_000_000)).run()
+    """
+
+    def __init__(self, config: DatasetConfig, progress: Optional[Callable[[str, int, int], None]] = None) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.progress = progress or (lambda model, done, total: None)
+        self.now = timezone.now()
+        # Полночь сегодняшнего дня (местное время): занятия начинаются в целые часы
+        self.today = timezone.localtime(self.now).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def run(self, refresh: bool = True) -> dict[str, int]:
+        """
+        Создаёт все объекты и, если ``refresh``, пересчитывает производные данные.
+
+        Returns:
+            Количество созданных объектов по моделям.
+        """
+        stable_ids = self.create_stables()
+        trainer_ids = self.create_trainers()
+        horse_ids = self.create_horses(stable_ids)
+        horse_trainers = self.create_relations(horse_ids, trainer_ids)
+        students = self.create_students()
+        lessons, payments = self.create_lessons(horse_ids, horse_trainers, students)
+        news = self.create_news([profile_id for profile_id, _user_id in students])
+        if refresh:
+            refresh_derived_data()
+        return {
+            'stables': len(stable_ids),
+            'trainers': len(trainer_ids),
+            'horses': len(horse_ids),
+            'relations': sum(len(ids) for ids in horse_trainers.values()),
+            'students': len(students),
+            'lessons': lessons,
+            'payments': payments,
+            'news': news,
+        }
+
+    def bulk_create(self, model: type, objects: Sequence) -> list:
+        with transaction.atomic():
+            return model.objects.bulk_create(objects, batch_size=self.config.batch_size)
+
+    def create_stables(self) -> list[int]:
+        stables = [
+            Stable(
+                name=f"Конюшня {number}",
+                location=f"{self.random.choice(CITIES)}, улица Полевая, {self.random.randint(1, 200)}",
+                capacity=self.random.randint(10, 200),
+            )
+            for number in range(1, self.config.stables + 1)
+        ]
+        ids = [stable.pk for stable in self.bulk_create(Stable, stables)]
+        self.progress('stables', len(ids), self.config.stables)
+        return ids
+
+    def create_trainers(self) -> list[int]:
+        trainers = []
+        for _ in range(self.config.trainers):
+            first_name, first_name_en = self.random.choice(FIRST_NAMES)
+            last_name, last_name_en = self.random.choice(LAST_NAMES)
+            experience = self.random.randint(1, 40)
+            trainers.append(Trainer(
+                first_name=first_name,
+                first_name_en=first_name_en,
+                last_name=last_name,
+                last_name_en=last_name_en,
+                bio=f"Тренер по верховой езде, опыт {experience} лет. Работает с детьми и взрослыми.",
+                experience_years=experience,
+            ))
+        ids = [trainer.pk for trainer in self.bulk_create(Trainer, trainers)]
+        self.progress('trainers', len(ids), self.config.trainers)
+        return ids
+
+    def create_horses(self, stable_ids: list[int]) -> list[int]:
+        horses = []
+        for number in range(1, self.config.horses + 1):
+            name, name_en = self.random.choice(HORSE_NAMES)
+            horses.append(Horse(
+                name=f"{name}-{number}",
+                name_en=f"{name_en}-{number}",
+                birth_date=(self.today - timedelta(days=self.random.randint(3 * 365, 20 * 365))).date(),
+                gender=self.random.choice(('male', 'female')),
+                description="Спокойная лошадь, подходит для начинающих.",
+                stable_id=self.random.choice(stable_ids) if stable_ids else None,
+            ))
+        ids = [horse.pk for horse in self.bulk_create(Horse, horses)]
+        self.progress('horses', len(ids), self.config.horses)
+        return ids
+
+    def create_relations(self, horse_ids: list[int], trainer_ids: list[int]) -> dict[int, list[int]]:
+        """
+        Назначает каждой лошади тренеров.
+
+        Returns:
+            ID тренеров каждой лошади.
+        """
+        per_horse = min(self.config.trainers_per_horse, len(trainer_ids))
+        horse_trainers = {horse_id: self.random.sample(trainer_ids, per_horse) for horse_id in horse_ids}
+        relations = [
+            HorseTrainerRelation(
+                horse_id=horse_id,
+                trainer_id=trainer_id,
+                start_date=(self.today - timedelta(days=self.random.randint(0, 3 * 365))).date(),
+                notes="Основной тренер",
+            )
+            for horse_id, trainers in horse_trainers.items()
+            for trainer_id in trainers
+        ]
+        self.bulk_create(HorseTrainerRelation, relations)
+        self.progress('relations', len(relations), len(relations))
+        return horse_trainers
+
+    def create_students(self) -> list[tuple[int, int]]:
+        """
+        Создаёт пользователей-учеников и их профили.
+
+        Returns:
+            Пары (ID профиля, ID пользователя).
+        """
+        # Один хэш на всех: хэширование пароля для каждого пользователя заняло бы минуты
+        password = make_password(self.config.password)
+        # Продолжаем нумерацию, чтобы повторный запуск не нарушил уникальность username
+        start = (User.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        students = []
+        for chunk in batched(self.config.students, self.config.batch_size):
+            users = self.bulk_create(User, [
+                User(
+                    username=f"student{start + number}",
+                    email=f"student{start + number}@example.com",
+                    password=password,
+                    first_name=self.random.choice(FIRST_NAMES)[0],
+                    last_name=self.random.choice(LAST_NAMES)[0],
+                )
+                for number in chunk
+            ])
+            profiles = self.bulk_create(UserProfile, [
+                UserProfile(
+                    user_id=user.pk,
+                    phone=f"+7 9{self.random.randint(0, 99):02d} {self.random.randint(0, 999):03d}-"
+                          f"{self.random.randint(0, 99):02d}-{self.random.randint(0, 99):02d}",
+                    address=f"{self.random.choice(CITIES)}, улица Садовая, {self.random.randint(1, 200)}",
+                )
+                for user in users
+            ])
+            students.extend((profile.pk, profile.user_id) for profile in profiles)
+            self.progress('students', len(students), self.config.students)
+        return students
+
+    def lesson_date(self) -> datetime:
+        """
+        Случайная дата занятия: день в окне [-days, +future_days], час из LESSON_HOURS.
+        """
+        day = self.random.randint(-self.config.days, self.config.future_days)
+        return self.today + timedelta(days=day, hours=self.random.choice(LESSON_HOURS))
+
+    def create_lessons(
+        self, horse_ids: list[int], horse_trainers: dict[int, list[int]], students: list[tuple[int, int]]
+    ) -> tuple[int, int]:
+        """
+        Создаёт занятия и платежи за них пакетами.
+
+        Returns:
+            Количество занятий и платежей.
+        """
+        config = self.config
+        if not horse_ids or not students:
+            return 0, 0
+        horse_weights = zipf_weights(len(horse_ids), config.skew)
+        student_weights = zipf_weights(len(students), config.skew)
+        payment_statuses = list(config.payment_statuses)
+        payment_weights = list(accumulate(config.payment_statuses.values()))
+        prices = range(config.price_min // 100, config.price_max // 100 + 1)
+
+        lessons_total = payments_total = 0
+        for chunk in batched(config.lessons, config.batch_size):
+            horses = self.random.choices(horse_ids, cum_weights=horse_weights, k=len(chunk))
+            lesson_students = self.random.choices(students, cum_weights=student_weights, k=len(chunk))
+            lessons = []
+            for horse_id, (profile_id, _user_id) in zip(horses, lesson_students):
+                date = self.lesson_date()
+                past = date < self.now
+                trainers = horse_trainers[horse_id]
+                status = 'completed' if past and self.random.random() < config.completed_ratio else 'scheduled'
+                lessons.append(Lesson(
+                    horse_id=horse_id,
+                    trainer_id=self.random.choice(trainers),
+                    student_id=profile_id,
+                    date=date,
+                    price=Decimal(self.random.choice(prices) * 100),
+                    status=status,
+                    # Прошедшие занятия: напоминание уже неактуально
+                    reminder_due_at=None if past else reminder_due_at(date, status),
+                ))
+            with transaction.atomic():
+                Lesson.objects.bulk_create(lessons)
+                payments = [
+                    Payment(
+                        user_id=user_id,
+                        lesson_id=lesson.pk,
+                        amount=lesson.price,
+                        timestamp=lesson.date,
+                        status=self.random.choices(payment_statuses, cum_weights=payment_weights)[0],
+                        purpose="Оплата занятия",
+                        reference_id=f"TX-{lesson.pk}",
+                    )
+                    for lesson, (_profile_id, user_id) in zip(lessons, lesson_students)
+                    if lesson.status == 'completed' and self.random.random() < config.payment_ratio
+                ]
+                Payment.objects.bulk_create(payments)
+            lessons_total += len(lessons)
+            payments_total += len(payments)
+            self.progress('lessons', lessons_total, config.lessons)
+        return lessons_total, payments_total
+
+    def create_news(self, author_ids: list[int]) -> int:
+        created = 0
+        for chunk in batched(self.config.news, self.config.batch_size):
+            posts = []
+            for number in chunk:
+                published_at = self.now - timedelta(minutes=self.random.randint(0, self.config.days * 24 * 60))
+                topic = self.random.choice(NEWS_TOPICS)
+                posts.append(NewsPost(
+                    title=f"{topic}. Выпуск {number + 1}",
+                    content=f"<p>{topic}. Подробности у администратора конюшни.</p>",
+                    created_at=published_at,
+                    published_at=published_at,
+                    is_active=self.random.random() >= self.config.inactive_news_ratio,
+                    author_id=self.random.choice(author_ids) if author_ids else None,
+                ))
+            created += len(self.bulk_create(NewsPost, posts))
+            self.progress('news', created, self.config.news)
+        return created
+
+
+def refresh_derived_data() -> None:
+    """
+    Пересчитывает данные, которые обычно обновляют сигналы моделей
+    (bulk_create их не вызывает).
+    """
+    stats.reconcile_price_statistics()
+    stats.refresh_horse_statistics()
+    rollups.backfill()
+    counters.reconcile_counters()
+    leaderboards.rebuild_leaderboards()
+    search.rebuild_index()
+    bump_versions(Stable, Trainer, Horse, HorseTrainerRelation, User, UserProfile, Lesson, Payment, NewsPost)
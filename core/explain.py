@@ -0,0 +1,183 @@
+"""
+Планы выполнения запросов (EXPLAIN) для проверки использования индексов.
+
+``PlanRecorder`` перехватывает SELECT-запросы, выполненные внутри блока
+(запросы API, задачи Celery), и после выхода из блока получает план
+каждого запроса. Полным просмотром таблицы считается чтение без условия
+по индексу: ``SCAN <таблица>`` в SQLite и ``Seq Scan`` в PostgreSQL, а также
+обход всего индекса (``SCAN ... USING INDEX``, ``Index Scan`` без
+``Index Cond``), кроме обхода частичного индекса и запросов с LIMIT
+(обход индекса в порядке сортировки останавливается после первых строк).
+
+На маленьких таблицах PostgreSQL предпочитает последовательное чтение даже
+при наличии индекса, поэтому план строится с ``enable_seqscan = off``:
+``Seq Scan`` остаётся в плане, только если подходящего индекса нет.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.regex_helper import _lazy_re_compile
+
+# Большие таблицы, полный просмотр которых считается регрессией
+GUARDED_TABLES = ('core_lesson', 'core_payment', 'core_newspost')
+
+# SQLite: "SCAN core_lesson", "SCAN U0", "SCAN core_lesson USING COVERING INDEX lesson_date_idx"
+_SQLITE_SCAN_RE = _lazy_re_compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?$')
+# PostgreSQL: "Seq Scan on core_lesson u0", "Index Scan Backward using lesson_date_idx on core_lesson"
+_POSTGRESQL_SCAN_RE = _lazy_re_compile(
+    r'(?:Seq Scan|Index (?:Only )?Scan(?: Backward)? using "?(\w+)"?) on "?(\w+)"?'
+)
+# Псевдонимы таблиц в SQL Django: "core_lesson" U0, "core_horse" T3
+_ALIAS_RE = _lazy_re_compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)\b')
+
+
+@dataclass
+class QueryPlan:
+    """
+    SQL-запрос, его план и таблицы, которые читаются целиком.
+    """
+    sql: str
+    params: Sequence[Any]
+    plan: list[str] = field(default_factory=list)
+    full_scans: list[str] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return '\n'.join([self.sql, *(f"    {line}" for line in self.plan)])
+
+
+def explain(sql: str, params: Sequence[Any], using: str = DEFAULT_DB_ALIAS) -> list[str]:
+    """
+    Возвращает строки плана запроса.
+
+    Raises:
+        NotImplementedError: Для СУБД, отличных от SQLite и PostgreSQL.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            # Строки: (id, parent, notused, detail)
+            return [row[3] for row in cursor.fetchall()]
+        if connection.vendor == 'postgresql':
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                cursor.execute(f"EXPLAIN {sql}", params)
+                return [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.execute("RESET enable_seqscan")
+    raise NotImplementedError(f"EXPLAIN не поддерживается для {connection.vendor}")
+
+
+def partial_indexes() -> set[str]:
+    """
+    Возвращает имена частичных индексов (с условием) из Meta.indexes моделей.
+    """
+    return {
+        index.name
+        for model in apps.get_models()
+        for index in model._meta.indexes
+        if index.condition is not None
+    }
+
+
+def full_scans(sql: str, plan: list[str], vendor: str) -> list[str]:
+    """
+    Возвращает таблицы, которые план читает целиком (псевдонимы заменяются именами таблиц).
+    """
+    aliases = {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+    limited = ' LIMIT ' in sql
+    partial = partial_indexes()
+    tables = []
+    for number, line in enumerate(plan):
+        if vendor == 'sqlite':
+            match = _SQLITE_SCAN_RE.match(line.strip())
+            if not match:
+                continue
+            table, index = match[1], match[2]
+        else:
+            match = _POSTGRESQL_SCAN_RE.search(line)
+            if not match:
+                continue
+            index, table = match[1], match[2]
+            if index and _has_index_condition(plan, number):
+                continue
+        if index and (limited or index in partial):
+            continue
+        tables.append(aliases.get(table, table))
+    return tables
+
+
+def _has_index_condition(plan: list[str], number: int) -> bool:
+    """
+    Проверяет, есть ли у узла PostgreSQL ``Index Cond`` (строки до следующего узла "->").
+    """
+    for line in plan[number + 1:]:
+        if '->' in line:
+            return False
+        if 'Index Cond:' in line:
+            return True
+    return False
+
+
+class PlanRecorder:
+    """
+    Контекстный менеджер: собирает SELECT-запросы и их планы.
+
+    Пример:
+        with PlanRecorder() as recorder:
+            client.get('/api/lessons/')
+        recorder.regressions()
+    """
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS, ignore: Sequence[str] = ('silk_',)) -> None:
+        self.using = using
+        self.ignore = ignore
+        self.queries: list[tuple[str, Sequence[Any]]] = []
+        self.plans: list[QueryPlan] = []
+
+    def __call__(self, execute: Callable, sql: str, params: Any, many: bool, context: dict) -> Any:
+        if not many and sql.lstrip().upper().startswith('SELECT') and not any(name in sql for name in self.ignore):
+            self.queries.append((sql, tuple(params or ())))
+        return execute(sql, params, many, context)
+
+    def __enter__(self) -> 'PlanRecorder':
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._wrapper.__exit__(*exc_info)
+        if exc_info[0] is not None:
+            return
+        vendor = connections[self.using].vendor
+        seen = set()
+        for sql, params in self.queries:
+            if (sql, params) in seen:
+                continue
+            seen.add((sql, params))
+            plan = explain(sql, params, self.using)
+            self.plans.append(QueryPlan(sql, params, plan, full_scans(sql, plan, vendor)))
+
+    def regressions(self, tables: Optional[Sequence[str]] = None) -> list[QueryPlan]:
+        """
+        Возвращает запросы, которые целиком читают одну из таблиц ``tables``
+        (по умолчанию GUARDED_TABLES).
+
+        ``COUNT(*)`` без условий (количество для пагинации) читает все строки
+        по определению и регрессией не считается.
+        """
+        tables = GUARDED_TABLES if tables is None else tables
+        return [
+            plan for plan in self.plans
+            if any(table in tables for table in plan.full_scans) and not is_whole_table_count(plan.sql)
+        ]
+
+
+def is_whole_table_count(sql: str) -> bool:
+    """
+    Проверяет, что запрос считает все строки таблицы (без WHERE).
+    """
+    return sql.startswith('SELECT COUNT(*)') and ' WHERE ' not in sql
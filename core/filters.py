@@ -1,6 +1,29 @@
 import django_filters
 from django_filters import DateFilter, CharFilter, ChoiceFilter, NumberFilter
+from rest_framework.filters import SearchFilter
 from .models import NewsPost, Trainer, Horse, Lesson, Payment
+from . import search
+
+
+def filter_full_text(queryset, name, value):
+    """
+    Фильтрует QuerySet по тексту документа в полнотекстовом индексе
+    (с учётом морфологии).
+    """
+    return search.filter_queryset(queryset, value, body_only=True)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Параметр ``search`` через полнотекстовый индекс для индексируемых моделей.
+    Для остальных моделей работает как обычный SearchFilter.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if queryset.model not in search.INDEXED_MODELS:
+            return super().filter_queryset(request, queryset, view)
+        query = request.query_params.get(self.search_param, '')
+        return search.filter_queryset(queryset, query)
 
 
 class NewsPostFilter(django_filters.FilterSet):
@@ -9,7 +32,7 @@ class NewsPostFilter(django_filters.FilterSet):
     Позволяет фильтровать по заголовку, контенту, дате публикации и активности.
     """
     title: CharFilter = CharFilter(lookup_expr='icontains', label='Заголовок содержит')
-    content: CharFilter = CharFilter(lookup_expr='icontains', label='Контент содержит')
+    content: CharFilter = CharFilter(method=filter_full_text, label='Контент содержит')
     published_after: DateFilter = DateFilter(field_name='published_at', lookup_expr='gte', label='Опубликовано после')
     published_before: DateFilter = DateFilter(field_name='published_at', lookup_expr='lte', label='Опубликовано до')
     is_active: ChoiceFilter = ChoiceFilter(choices=[(True, 'Активные'), (False, 'Неактивные')], label='Статус')
@@ -28,7 +51,7 @@ class TrainerFilter(django_filters.FilterSet):
     """
     first_name: CharFilter = CharFilter(lookup_expr='icontains', label='Имя содержит')
     last_name: CharFilter = CharFilter(lookup_expr='icontains', label='Фамилия содержит')
-    bio: CharFilter = CharFilter(lookup_expr='icontains', label='Биография содержит')
+    bio: CharFilter = CharFilter(method=filter_full_text, label='Биография содержит')
     experience_min: NumberFilter = NumberFilter(field_name='experience_years', lookup_expr='gte', label='Опыт от (лет)')
     experience_max: NumberFilter = NumberFilter(field_name='experience_years', lookup_expr='lte', label='Опыт до (лет)')
     
@@ -43,7 +66,7 @@ class HorseFilter(django_filters.FilterSet):
     Позволяет фильтровать по имени, описанию, полу и конюшне.
     """
     name: CharFilter = CharFilter(lookup_expr='icontains', label='Имя содержит')
-    description: CharFilter = CharFilter(lookup_expr='icontains', label='Описание содержит')
+    description: CharFilter = CharFilter(method=filter_full_text, label='Описание содержит')
     gender: ChoiceFilter = ChoiceFilter(choices=Horse.GENDER_CHOICES, label='Пол')
     stable: django_filters.ModelChoiceFilter = django_filters.ModelChoiceFilter(queryset=Horse.objects.values_list('stable__name', flat=True).distinct(), label='Конюшня')
     
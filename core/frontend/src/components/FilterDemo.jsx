@@ -28,6 +28,32 @@ export default function FilterDemo() {
     description: ''
   });
 
+  // Подсказки имён (автодополнение)
+  const [nameSuggestions, setNameSuggestions] = useState([]);
+  const activeName = activeTab === 'horses' ? horseFilters.name : activeTab === 'trainers' ? trainerFilters.name : '';
+
+  useEffect(() => {
+    if (!activeName) {
+      setNameSuggestions([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const params = new URLSearchParams({ q: activeName, type: activeTab === 'horses' ? 'horse' : 'trainer' });
+        const response = await fetch(`http://localhost:8000/api/autocomplete/?${params}`, { signal: controller.signal });
+        const data = await response.json();
+        setNameSuggestions(data.results || []);
+      } catch (error) {
+        if (error.name !== 'AbortError') console.error('Error fetching suggestions:', error);
+      }
+    }, 150);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [activeTab, activeName]);
+
   const fetchData = async (endpoint, filters) => {
     setLoading(true);
     try {
@@ -104,6 +130,12 @@ export default function FilterDemo() {
         </button>
       </div>
 
+      <datalist id="name-suggestions">
+        {nameSuggestions.map(item => (
+          <option key={`${item.type}-${item.id}`} value={item.label} />
+        ))}
+      </datalist>
+
       {activeTab === 'news' && (
         <div className="filter-section">
           <h2>Фильтрация новостей</h2>
@@ -161,6 +193,7 @@ export default function FilterDemo() {
             <input
               type="text"
               placeholder="Имя содержит..."
+              list="name-suggestions"
               value={trainerFilters.name}
               onChange={(e) => handleTrainerFilterChange('name', e.target.value)}
             />
@@ -202,6 +235,7 @@ export default function FilterDemo() {
             <input
               type="text"
               placeholder="Имя содержит..."
+              list="name-suggestions"
               value={horseFilters.name}
               onChange={(e) => handleHorseFilterChange('name', e.target.value)}
             />
@@ -2,25 +2,31 @@ import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import "./HorsesWidget.css";
 
-export default function HorsesWidget() {
+export default function HorsesWidget({ data: initialData }) {
   const [horses, setHorses] = useState([]);
   const [loading, setLoading] = useState(true);
 
+  const showHorses = (data) => {
+    // Show 4 random horses
+    const horsesData = data.results || [];
+    const shuffled = horsesData.sort(() => 0.5 - Math.random());
+    setHorses(shuffled.slice(0, 4));
+    setLoading(false);
+  };
+
   useEffect(() => {
+    if (initialData) {
+      showHorses(initialData);
+      return;
+    }
     fetch("http://localhost:8000/api/horses/")
       .then((response) => response.json())
-      .then((data) => {
-        // Show 4 random horses
-        const horsesData = data.results || [];
-        const shuffled = horsesData.sort(() => 0.5 - Math.random());
-        setHorses(shuffled.slice(0, 4));
-        setLoading(false);
-      })
+      .then(showHorses)
       .catch((error) => {
         console.error("Error fetching horses:", error);
         setLoading(false);
       });
-  }, []);
+  }, [initialData]);
 
   return (
     <div className="horses-widget">
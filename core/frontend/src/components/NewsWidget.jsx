@@ -2,28 +2,34 @@ import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import "./NewsWidget.css";
 
-export default function NewsWidget() {
+export default function NewsWidget({ data: initialData }) {
   const [news, setNews] = useState([]);
   const [selectedNews, setSelectedNews] = useState(null);
   const [loading, setLoading] = useState(false);
   // NOTE: Favorite state is not implemented on the backend
   const [favorites, setFavorites] = useState(new Set());
 
+  const showNews = (data) => {
+    const newsData = data.results || [];
+    const sorted = newsData.sort((a, b) => new Date(b.published_at) - new Date(a.published_at));
+    setNews(sorted.slice(0, 5)); // Top 5 news
+    setLoading(false);
+  };
+
   useEffect(() => {
+    if (initialData) {
+      showNews(initialData);
+      return;
+    }
     setLoading(true);
     fetch("http://localhost:8000/api/news/")
       .then((response) => response.json())
-      .then((data) => {
-        const newsData = data.results || [];
-        const sorted = newsData.sort((a, b) => new Date(b.published_at) - new Date(a.published_at));
-        setNews(sorted.slice(0, 5)); // Top 5 news
-        setLoading(false);
-      })
+      .then(showNews)
       .catch((error) => {
         console.error("Error fetching news:", error);
         setLoading(false);
       });
-  }, []);
+  }, [initialData]);
 
   const openDetail = (id) => {
     setLoading(true);
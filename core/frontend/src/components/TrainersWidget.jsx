@@ -2,25 +2,31 @@ import { useEffect, useState } from "react";
 import { Link } from "react-router-dom";
 import "./TrainersWidget.css";
 
-export default function TrainersWidget() {
+export default function TrainersWidget({ data: initialData }) {
   const [trainers, setTrainers] = useState([]);
   const [loading, setLoading] = useState(true);
 
+  const showTrainers = (data) => {
+    // Show 3 random trainers
+    const trainersData = data.results || [];
+    const shuffled = trainersData.sort(() => 0.5 - Math.random());
+    setTrainers(shuffled.slice(0, 3));
+    setLoading(false);
+  };
+
   useEffect(() => {
+    if (initialData) {
+      showTrainers(initialData);
+      return;
+    }
     fetch("http://localhost:8000/api/trainers/")
       .then((response) => response.json())
-      .then((data) => {
-        // Show 3 random trainers
-        const trainersData = data.results || [];
-        const shuffled = trainersData.sort(() => 0.5 - Math.random());
-        setTrainers(shuffled.slice(0, 3));
-        setLoading(false);
-      })
+      .then(showTrainers)
       .catch((error) => {
         console.error("Error fetching trainers:", error);
         setLoading(false);
       });
-  }, []);
+  }, [initialData]);
 
   return (
     <div className="trainers-widget">
@@ -1,9 +1,40 @@
+import { useEffect, useState } from "react";
 import "./HomePage.css";
 import NewsWidget from "../components/NewsWidget";
 import TrainersWidget from "../components/TrainersWidget";
 import HorsesWidget from "../components/HorsesWidget";
 
+// Данные всех виджетов загружаются одним запросом к /api/batch/
+const HOME_REQUESTS = [
+  { id: "news", path: "/api/news/" },
+  { id: "trainers", path: "/api/trainers/" },
+  { id: "horses", path: "/api/horses/" },
+];
+
 export default function HomePage() {
+  const [batch, setBatch] = useState(null);
+
+  useEffect(() => {
+    fetch("http://localhost:8000/api/batch/", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ requests: HOME_REQUESTS }),
+    })
+      .then((response) => response.json())
+      .then((data) => {
+        const bodies = {};
+        (data.responses || []).forEach((item) => {
+          if (item.status === 200) bodies[item.id] = item.body;
+        });
+        setBatch(bodies);
+      })
+      .catch((error) => {
+        // Виджеты загрузят данные сами
+        console.error("Error fetching batch:", error);
+        setBatch({});
+      });
+  }, []);
+
   return (
     <>
       <div className="hero-section">
@@ -17,15 +48,15 @@ export default function HomePage() {
       </div>
 
       <div className="container page-section">
-        <NewsWidget />
+        {batch && <NewsWidget data={batch.news} />}
       </div>
 
       <div className="container page-section">
-        <TrainersWidget />
+        {batch && <TrainersWidget data={batch.trainers} />}
       </div>
 
       <div className="container page-section">
-        <HorsesWidget />
+        {batch && <HorsesWidget data={batch.horses} />}
       </div>
     </>
   );
@@ -0,0 +1,384 @@
+"""
+Рейтинги тренеров и лошадей по количеству занятий.
+
+Рейтинги хранятся в Redis sorted sets: общий (за всё время) и по дням.
+Скользящие окна (7 и 30 дней) собираются объединением дневных множеств.
+Сигналы занятия применяют изменения после коммита транзакции, а команда
+и задача ``rebuild_leaderboards`` пересобирают рейтинги по базе данных.
+
+Пока рейтинги не собраны (пустой Redis после развёртывания, нет отметки
+``READY_KEY``), они считаются по базе данных. Без Redis (настройка
+``LEADERBOARD_BACKEND = 'database'``) рейтинги всегда читаются из базы:
+хранилище в памяти процесса у каждого worker'а своё и годится только для тестов.
+"""
+
+import logging
+import uuid
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Any, Iterable, Optional, Sequence
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .caching import bump_versions
+from .models import Lesson
+
+logger = logging.getLogger(__name__)
+
+TRAINERS = 'trainers'
+HORSES = 'horses'
+BOARDS = {TRAINERS: 'trainer_id', HORSES: 'horse_id'}
+
+# Метрики: все занятия и только завершённые
+LESSONS = 'lessons'
+COMPLETED = 'completed'
+METRICS = (LESSONS, COMPLETED)
+
+# Скользящие окна в днях
+WINDOWS = (7, 30)
+
+KEY_PREFIX = 'leaderboard'
+# Отметка о том, что рейтинги собраны по базе данных
+READY_KEY = f"{KEY_PREFIX}:ready"
+# Время жизни временного ключа объединения окна, секунд
+UNION_TTL = 60
+
+
+def board_key(board: str, metric: str, day: Optional[date] = None) -> str:
+    """
+    Возвращает ключ sorted set для рейтинга (общего или за день).
+    """
+    suffix = f"day:{day.isoformat()}" if day else 'all'
+    return f"{KEY_PREFIX}:{board}:{metric}:{suffix}"
+
+
+def window_days(window: int, today: Optional[date] = None) -> list[date]:
+    """
+    Возвращает дни скользящего окна: последние ``window`` дней включая сегодня.
+    """
+    today = today or timezone.localdate()
+    return [today - timedelta(days=offset) for offset in range(window)]
+
+
+def day_ttl(day: date, today: Optional[date] = None) -> Optional[int]:
+    """
+    Возвращает время жизни дневного ключа в секундах или None,
+    если день уже не попадает ни в одно окно.
+    """
+    today = today or timezone.localdate()
+    days_left = (day - today).days + max(WINDOWS) + 1
+    if days_left <= 0:
+        return None
+    return days_left * 86400
+
+
+class MemoryBackend:
+    """
+    Хранилище рейтингов в памяти процесса (только для тестов: у каждого процесса своё).
+    """
+
+    def __init__(self) -> None:
+        self.data: dict[str, dict[str, float]] = {}
+
+    def ready(self) -> bool:
+        return True
+
+    def apply(self, increments: Iterable[tuple[str, str, int, Optional[int]]]) -> None:
+        for key, member, delta, _ttl in increments:
+            scores = self.data.setdefault(key, {})
+            scores[member] = scores.get(member, 0) + delta
+            if scores[member] <= 0:
+                del scores[member]
+
+    def union(self, keys: list[str], members: Optional[Sequence[str]] = None) -> dict[str, float]:
+        result: dict[str, float] = {}
+        for key in keys:
+            for member, score in self.data.get(key, {}).items():
+                result[member] = result.get(member, 0) + score
+        if members is not None:
+            result = {member: result[member] for member in members if member in result}
+        return result
+
+    def top(self, keys: list[str], limit: int) -> list[tuple[str, float]]:
+        return sorted(self.union(keys).items(), key=lambda item: (-item[1], int(item[0])))[:limit]
+
+    def replace(self, boards: dict[str, dict[str, float]], ttls: dict[str, Optional[int]]) -> None:
+        self.data = {key: dict(scores) for key, scores in boards.items() if scores}
+
+
+class DatabaseBackend:
+    """
+    Рейтинги без отдельного хранилища: никогда не «готовы», поэтому
+    всегда считаются по базе данных (общей для всех процессов).
+    """
+
+    def ready(self) -> bool:
+        return False
+
+    def apply(self, increments: Iterable[tuple[str, str, int, Optional[int]]]) -> None:
+        pass
+
+    def replace(self, boards: dict[str, dict[str, float]], ttls: dict[str, Optional[int]]) -> None:
+        pass
+
+
+class RedisBackend:
+    """
+    Хранилище рейтингов в Redis sorted sets.
+    """
+
+    def __init__(self, url: str) -> None:
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True, socket_timeout=2)
+
+    def ready(self) -> bool:
+        return bool(self.client.exists(READY_KEY))
+
+    def apply(self, increments: Iterable[tuple[str, str, int, Optional[int]]]) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        touched = set()
+        for key, member, delta, ttl in increments:
+            pipe.zincrby(key, delta, member)
+            if ttl:
+                pipe.expire(key, ttl)
+            touched.add(key)
+        for key in touched:
+            pipe.zremrangebyscore(key, '-inf', 0)
+        pipe.execute()
+
+    def _read(self, keys: list[str], command: Any) -> Any:
+        """
+        Выполняет чтение по одному ключу или по объединению ключей окна
+        (ZUNIONSTORE во временный ключ, который удаляется в той же транзакции).
+        """
+        if len(keys) == 1:
+            return command(self.client, keys[0])
+        temporary = f"{KEY_PREFIX}:tmp:{uuid.uuid4().hex}"
+        pipe = self.client.pipeline(transaction=True)
+        pipe.zunionstore(temporary, keys)
+        pipe.expire(temporary, UNION_TTL)
+        command(pipe, temporary)
+        pipe.delete(temporary)
+        return pipe.execute()[2]
+
+    def union(self, keys: list[str], members: Optional[Sequence[str]] = None) -> dict[str, float]:
+        if members is None:
+            return dict(self._read(keys, lambda client, key: client.zrange(key, 0, -1, withscores=True)))
+        if not members:
+            return {}
+        values = self._read(keys, lambda client, key: client.zmscore(key, list(members)))
+        return {member: score for member, score in zip(members, values) if score is not None}
+
+    def top(self, keys: list[str], limit: int) -> list[tuple[str, float]]:
+        return self._read(keys, lambda client, key: client.zrevrange(key, 0, limit - 1, withscores=True))
+
+    def replace(self, boards: dict[str, dict[str, float]], ttls: dict[str, Optional[int]]) -> None:
+        stale = list(self.client.scan_iter(match=f"{KEY_PREFIX}:*", count=1000))
+        pipe = self.client.pipeline(transaction=True)
+        if stale:
+            pipe.delete(*stale)
+        for key, scores in boards.items():
+            if not scores:
+                continue
+            pipe.zadd(key, scores)
+            if ttls.get(key):
+                pipe.expire(key, ttls[key])
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+
+
+@lru_cache(maxsize=None)
+def _backend(name: str, url: str) -> Any:
+    if name == 'redis':
+        return RedisBackend(url)
+    if name == 'memory':
+        return MemoryBackend()
+    return DatabaseBackend()
+
+
+def get_backend() -> Any:
+    """
+    Возвращает хранилище рейтингов согласно настройке LEADERBOARD_BACKEND.
+    """
+    return _backend(settings.LEADERBOARD_BACKEND, settings.REDIS_URL)
+
+
+def _backend_errors() -> tuple[type[Exception], ...]:
+    """
+    Возвращает исключения, при которых рейтинг считается недоступным.
+    """
+    try:
+        import redis
+    except ImportError:
+        return (OSError,)
+    return (redis.RedisError, OSError)
+
+
+def lesson_increments(state: Optional[dict[str, Any]], sign: int) -> list[tuple[str, str, int, Optional[int]]]:
+    """
+    Возвращает изменения рейтингов, вносимые одним занятием.
+
+    Args:
+        state: Значения полей занятия (trainer_id, horse_id, status, date) или None.
+        sign: +1 для добавления занятия, -1 для удаления.
+    """
+    if not state:
+        return []
+    day = timezone.localdate(state['date'])
+    ttl = day_ttl(day)
+    metrics = [LESSONS] + ([COMPLETED] if state['status'] == 'completed' else [])
+    increments = []
+    for board, field_name in BOARDS.items():
+        member = str(state[field_name])
+        for metric in metrics:
+            increments.append((board_key(board, metric), member, sign, None))
+            if ttl:
+                increments.append((board_key(board, metric, day), member, sign, ttl))
+    return increments
+
+
+def record_lesson_change(old: Optional[dict[str, Any]], new: Optional[dict[str, Any]]) -> None:
+    """
+    Применяет изменение занятия к рейтингам.
+
+    Ошибки хранилища только логируются: рейтинги восстанавливаются
+    командой rebuild_leaderboards.
+    """
+    totals: dict[tuple[str, str], list] = {}
+    for state, sign in ((old, -1), (new, 1)):
+        for key, member, delta, ttl in lesson_increments(state, sign):
+            entry = totals.setdefault((key, member), [0, ttl])
+            entry[0] += delta
+            entry[1] = entry[1] or ttl
+    increments = [(key, member, delta, ttl) for (key, member), (delta, ttl) in totals.items() if delta]
+    if not increments:
+        return
+    try:
+        get_backend().apply(increments)
+    except _backend_errors() as e:
+        logger.warning(f"Не удалось обновить рейтинги: {e}")
+
+
+def _database_lessons(board: str, metric: str, window: Optional[int]) -> Any:
+    """
+    Возвращает занятия рейтинга, сгруппированные по объекту, с количеством.
+    """
+    lessons = Lesson.objects.order_by()
+    if metric == COMPLETED:
+        lessons = lessons.filter(status='completed')
+    if window:
+        days = window_days(window)
+        lessons = lessons.filter(date__date__gte=days[-1], date__date__lte=days[0])
+    return lessons.values(BOARDS[board]).annotate(count=Count('id'))
+
+
+def _keys(board: str, metric: str, window: Optional[int]) -> list[str]:
+    if window:
+        return [board_key(board, metric, day) for day in window_days(window)]
+    return [board_key(board, metric)]
+
+
+def _ready_backend() -> Optional[Any]:
+    """
+    Возвращает хранилище, если рейтинги в нём собраны, иначе None (расчёт по базе данных).
+    """
+    backend = get_backend()
+    try:
+        if backend.ready():
+            return backend
+    except _backend_errors() as e:
+        logger.warning(f"Рейтинг недоступен, расчёт по базе данных: {e}")
+    return None
+
+
+def scores(
+    board: str,
+    metric: str = LESSONS,
+    window: Optional[int] = None,
+    members: Optional[Iterable[int]] = None,
+) -> dict[int, int]:
+    """
+    Возвращает рейтинг в виде словаря {ID объекта: количество занятий}.
+
+    Args:
+        board: TRAINERS или HORSES.
+        metric: LESSONS или COMPLETED.
+        window: Размер окна в днях (из WINDOWS) или None для рейтинга за всё время.
+        members: ID объектов, для которых нужны значения (None — весь рейтинг).
+    """
+    members = None if members is None else [str(member) for member in members]
+    backend = _ready_backend()
+    if backend is not None:
+        try:
+            raw = backend.union(_keys(board, metric, window), members)
+            return {int(member): int(score) for member, score in raw.items() if score > 0}
+        except _backend_errors() as e:
+            logger.warning(f"Рейтинг недоступен, расчёт по базе данных: {e}")
+    rows = _database_lessons(board, metric, window)
+    if members is not None:
+        rows = rows.filter(**{f"{BOARDS[board]}__in": members})
+    return {row[BOARDS[board]]: row['count'] for row in rows}
+
+
+def top(board: str, metric: str = LESSONS, window: Optional[int] = None, limit: int = 10) -> list[tuple[int, int]]:
+    """
+    Возвращает первые ``limit`` позиций рейтинга в виде пар (ID, количество).
+    """
+    backend = _ready_backend()
+    if backend is not None:
+        try:
+            ranking = backend.top(_keys(board, metric, window), limit)
+            return [(int(member), int(score)) for member, score in ranking if score > 0]
+        except _backend_errors() as e:
+            logger.warning(f"Рейтинг недоступен, расчёт по базе данных: {e}")
+    field_name = BOARDS[board]
+    rows = _database_lessons(board, metric, window).order_by('-count', field_name)[:limit]
+    return [(row[field_name], row['count']) for row in rows]
+
+
+def leaderboards_ready() -> bool:
+    """
+    Проверяет, собраны ли рейтинги в хранилище (иначе их нужно пересобрать).
+    """
+    return _ready_backend() is not None
+
+
+def rebuild_leaderboards() -> int:
+    """
+    Пересобирает все рейтинги по таблице занятий.
+
+    Returns:
+        Количество записанных ключей.
+    """
+    today = timezone.localdate()
+    first_day = today - timedelta(days=max(WINDOWS) - 1)
+    boards: dict[str, dict[str, float]] = {}
+    ttls: dict[str, Optional[int]] = {}
+    for board, field_name in BOARDS.items():
+        for metric in METRICS:
+            lessons = Lesson.objects.order_by()
+            if metric == COMPLETED:
+                lessons = lessons.filter(status='completed')
+            key = board_key(board, metric)
+            boards[key] = {
+                str(row[field_name]): row['count']
+                for row in lessons.values(field_name).annotate(count=Count('id'))
+            }
+            daily = (
+                lessons.filter(date__date__gte=first_day)
+                .annotate(day=TruncDate('date'))
+                .values('day', field_name)
+                .annotate(count=Count('id'))
+            )
+            for row in daily:
+                key = board_key(board, metric, row['day'])
+                boards.setdefault(key, {})[str(row[field_name])] = row['count']
+                ttls[key] = day_ttl(row['day'], today)
+    get_backend().replace(boards, ttls)
+    # Количество занятий тренеров входит в ответы, зависящие от версии Lesson
+    bump_versions(Lesson)
+    return len([key for key, members in boards.items() if members])
@@ -0,0 +1,260 @@
+"""
+Генератор HTTP-нагрузки для замеров API.
+
+Клиент HTTP/1.1 на asyncio без внешних зависимостей: каждый запрос
+открывает отдельное соединение (``Connection: close``). «Медленные»
+клиенты отправляют заголовки запроса с паузой, как клиенты на плохой
+сети, и всё это время занимают соединение сервера.
+
+``run_scenarios`` создаёт смешанный трафик из взвешенных сценариев
+и возвращает отчёт (сводку по каждому сценарию и общую), который можно
+сохранить в JSON и сравнить с эталонным отчётом через ``compare_reports``.
+"""
+
+import asyncio
+import math
+import random
+import ssl
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+
+@dataclass
+class Result:
+    """
+    Результат одного запроса.
+    """
+    latency: float
+    status: int = 0
+    size: int = 0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status < 400
+
+
+async def fetch(
+    url: str,
+    timeout: float = 30.0,
+    headers: Optional[dict[str, str]] = None,
+    trickle: float = 0.0,
+    method: str = 'GET',
+    body: Optional[bytes] = None,
+) -> Result:
+    """
+    Выполняет запрос и читает ответ целиком.
+
+    Args:
+        url: Адрес (http или https).
+        timeout: Предельное время запроса в секундах.
+        headers: Дополнительные заголовки.
+        trickle: Пауза (в секундах) между строкой запроса и остальными заголовками.
+        method: HTTP-метод.
+        body: Тело запроса (JSON).
+    """
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    lines = [f"Host: {parts.netloc}", 'Connection: close', 'Accept: application/json']
+    if body is not None:
+        lines += ['Content-Type: application/json', f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    started = time.perf_counter()
+
+    async def exchange() -> Result:
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, ssl=ssl.create_default_context() if secure else None
+        )
+        try:
+            writer.write(f"{method} {path} HTTP/1.1\r\n".encode())
+            await writer.drain()
+            if trickle:
+                await asyncio.sleep(trickle)
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + (body or b''))
+            await writer.drain()
+            data = await reader.read()
+        finally:
+            writer.close()
+        status_line = data.split(b'\r\n', 1)[0].split()
+        if len(status_line) < 2 or not status_line[1].isdigit():
+            return Result(time.perf_counter() - started, error='bad response')
+        return Result(time.perf_counter() - started, int(status_line[1]), len(data))
+
+    try:
+        return await asyncio.wait_for(exchange(), timeout)
+    except asyncio.TimeoutError:
+        return Result(time.perf_counter() - started, error='timeout')
+    except OSError as e:
+        return Result(time.perf_counter() - started, error=type(e).__name__)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Возвращает перцентиль (метод ближайшего ранга) по отсортированным значениям.
+    """
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), math.ceil(q / 100 * len(values))))
+    return values[rank - 1]
+
+
+def summarize(results: list[Result], elapsed: float) -> dict[str, float]:
+    """
+    Сводка по запросам: количество, ошибки, RPS и задержки успешных запросов (мс).
+    """
+    latencies = sorted(result.latency * 1000 for result in results if result.ok)
+    return {
+        'requests': len(results),
+        'errors': sum(not result.ok for result in results),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean': round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        'p50': round(percentile(latencies, 50), 1),
+        'p95': round(percentile(latencies, 95), 1),
+        'p99': round(percentile(latencies, 99), 1),
+        'max': round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+async def run_load(
+    url: str,
+    requests: int,
+    concurrency: int,
+    slow_clients: int = 0,
+    slow_delay: float = 5.0,
+    timeout: float = 30.0,
+    headers: Optional[dict[str, str]] = None,
+) -> dict[str, float]:
+    """
+    Отправляет ``requests`` запросов с ``concurrency`` параллельными клиентами.
+
+    Пока идёт замер, ``slow_clients`` медленных клиентов непрерывно
+    занимают соединения сервера; их запросы в сводку не входят.
+    """
+    stop = asyncio.Event()
+
+    async def slow_client() -> None:
+        while not stop.is_set():
+            await fetch(url, timeout=timeout + slow_delay, headers=headers, trickle=slow_delay)
+
+    slow_tasks = [asyncio.create_task(slow_client()) for _ in range(slow_clients)]
+    if slow_tasks:
+        # Даём медленным клиентам занять соединения до начала замера
+        await asyncio.sleep(min(1.0, slow_delay / 2))
+
+    results: list[Result] = []
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            results.append(await fetch(url, timeout=timeout, headers=headers))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for task in slow_tasks:
+        task.cancel()
+    await asyncio.gather(*slow_tasks, return_exceptions=True)
+    return summarize(results, elapsed)
+
+
+@dataclass
+class Scenario:
+    """
+    Сценарий смешанной нагрузки: запрос к одному из адресов ``paths``
+    (выбирается случайно) с относительной частотой ``weight``.
+    """
+    name: str
+    paths: list[str]
+    weight: float = 1.0
+    method: str = 'GET'
+    body: Optional[bytes] = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+async def run_scenarios(
+    base_url: str,
+    scenarios: list[Scenario],
+    requests: int,
+    concurrency: int,
+    timeout: float = 30.0,
+    seed: Optional[int] = None,
+) -> dict[str, Any]:
+    """
+    Отправляет ``requests`` запросов, выбирая сценарий пропорционально весу.
+
+    Returns:
+        Отчёт: ``{'total': сводка, 'scenarios': {имя: сводка}}``.
+    """
+    rng = random.Random(seed)
+    # Последовательность запросов определяется заранее: при одном seed она одинакова
+    plan = rng.choices(scenarios, weights=[scenario.weight for scenario in scenarios], k=requests)
+    paths = [rng.choice(scenario.paths) for scenario in plan]
+    results: dict[str, list[Result]] = {scenario.name: [] for scenario in scenarios}
+    all_results: list[Result] = []
+    remaining = iter(zip(plan, paths))
+
+    async def worker() -> None:
+        for scenario, path in remaining:
+            result = await fetch(
+                base_url.rstrip('/') + path, timeout=timeout, headers=scenario.headers,
+                method=scenario.method, body=scenario.body,
+            )
+            results[scenario.name].append(result)
+            all_results.append(result)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'total': summarize(all_results, elapsed),
+        'scenarios': {name: summarize(items, elapsed) for name, items in results.items() if items},
+    }
+
+
+def compare_reports(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = 0.2,
+    min_delta: float = 5.0,
+    max_error_increase: float = 0.01,
+    min_requests: int = 50,
+    metrics: tuple[str, ...] = ('p50', 'p95', 'p99'),
+) -> list[str]:
+    """
+    Сравнивает отчёт с эталонным и возвращает описания регрессий.
+
+    Регрессией считается рост задержки более чем на ``tolerance`` (доля)
+    и одновременно более чем на ``min_delta`` мс, рост доли ошибок более
+    чем на ``max_error_increase`` и падение общего RPS более чем на ``tolerance``.
+    Задержки сценариев, у которых меньше ``min_requests`` запросов,
+    не сравниваются: перцентили по нескольким запросам — шум.
+    """
+    regressions = []
+    sections = [('total', current.get('total'), baseline.get('total'))] + [
+        (name, summary, baseline.get('scenarios', {}).get(name))
+        for name, summary in current.get('scenarios', {}).items()
+    ]
+    for name, summary, reference in sections:
+        if not summary or not reference:
+            continue
+        enough = name == 'total' or min(summary['requests'], reference['requests']) >= min_requests
+        for metric in metrics if enough else ():
+            before, after = reference.get(metric, 0.0), summary.get(metric, 0.0)
+            if after - before > min_delta and after > before * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {before} -> {after} мс")
+        before_rate = reference['errors'] / reference['requests'] if reference.get('requests') else 0.0
+        after_rate = summary['errors'] / summary['requests'] if summary.get('requests') else 0.0
+        if after_rate - before_rate > max_error_increase:
+            regressions.append(f"{name}: доля ошибок {before_rate:.1%} -> {after_rate:.1%}")
+    total, reference = current.get('total'), baseline.get('total')
+    if total and reference and total['rps'] < reference['rps'] * (1 - tolerance):
+        regressions.append(f"total: rps {reference['rps']} -> {total['rps']}")
+    return regressions
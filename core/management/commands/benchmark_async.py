@@ -0,0 +1,56 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import run_load
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает WSGI- и ASGI-развёртывание под нагрузкой с медленными клиентами.
+
+    Серверы запускаются заранее, например:
+
+        gunicorn myproject.wsgi -w 4 -b 127.0.0.1:8001
+        uvicorn myproject.asgi:application --workers 4 --port 8002
+
+        python manage.py benchmark_async \\
+            --target wsgi=http://127.0.0.1:8001/api/lessons/ \\
+            --target asgi=http://127.0.0.1:8002/api/async/lessons/
+    """
+    help = "Сравнивает пропускную способность и хвостовые задержки API при медленных клиентах"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--target', action='append', required=True, help="Имя и адрес: name=url")
+        parser.add_argument('--requests', type=int, default=200, help="Количество замеряемых запросов")
+        parser.add_argument('--concurrency', type=int, default=10, help="Параллельные обычные клиенты")
+        parser.add_argument(
+            '--slow-clients', type=int, nargs='+', default=[0, 50], help="Количество медленных клиентов (по сценариям)"
+        )
+        parser.add_argument('--slow-delay', type=float, default=5.0, help="Пауза медленного клиента, с")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Предельное время запроса, с")
+
+    def handle(self, *args, **options) -> None:
+        targets = []
+        for target in options['target']:
+            name, separator, url = target.partition('=')
+            if not separator or not url.startswith(('http://', 'https://')):
+                raise CommandError(f"Неверная цель '{target}': ожидается name=http://...")
+            targets.append((name, url))
+
+        columns = ('requests', 'errors', 'rps', 'p50', 'p95', 'p99', 'max')
+        self.stdout.write(f"{'цель':<10}{'медленных':>10}" + ''.join(f"{column:>10}" for column in columns))
+        for slow_clients in options['slow_clients']:
+            for name, url in targets:
+                summary = asyncio.run(run_load(
+                    url,
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    slow_clients=slow_clients,
+                    slow_delay=options['slow_delay'],
+                    timeout=options['timeout'],
+                ))
+                self.stdout.write(
+                    f"{name:<10}{slow_clients:>10}" + ''.join(f"{summary[column]:>10}" for column in columns)
+                )
+        self.stdout.write("Задержки в миллисекундах; rps — успешные запросы в секунду.")
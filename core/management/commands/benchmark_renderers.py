@@ -0,0 +1,75 @@
+import timeit
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Horse, Lesson, Payment, Trainer, UserProfile
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from core.serializers import LessonSerializer, PaymentSerializer
+
+
+def build_pages(size: int) -> dict[str, list]:
+    """
+    Строит страницы занятий и платежей заданного размера (без обращений к БД).
+    """
+    now = timezone.now()
+    horses = [Horse(id=index, name=f"Лошадь {index}") for index in range(1, 21)]
+    trainers = [Trainer(id=index, first_name='Анна', last_name=f"Тренер {index}") for index in range(1, 11)]
+    lessons, payments = [], []
+    for index in range(1, size + 1):
+        user = User(id=index, username=f"student{index}")
+        lesson = Lesson(
+            id=index,
+            horse=horses[index % len(horses)],
+            trainer=trainers[index % len(trainers)],
+            student=UserProfile(id=index, user=user),
+            date=now - timedelta(hours=index),
+            price=Decimal('1500.00') + index,
+            status='completed',
+        )
+        lessons.append(lesson)
+        payments.append(Payment(
+            id=index, user=user, lesson=lesson, amount=lesson.price, timestamp=lesson.date,
+            status='completed', purpose='Оплата занятия', reference_id=f"TX-{index:08d}",
+        ))
+    context = {'average_price': Decimal('1600.00')}
+    return {
+        'lessons': LessonSerializer(lessons, many=True, context=context).data,
+        'payments': PaymentSerializer(payments, many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает скорость рендереров API на страницах занятий и платежей.
+    """
+    help = "Сравнивает JSONRenderer (stdlib json), orjson и MessagePack на страницах разного размера"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--sizes', type=int, nargs='+', default=[20, 100, 1000], help="Размеры страниц")
+        parser.add_argument('--repeat', type=int, default=5, help="Количество повторов замера")
+
+    def handle(self, *args, **options) -> None:
+        renderers = [('json (DRF)', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', ORJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+
+        self.stdout.write(f"{'страница':<16}{'рендерер':<14}{'мкс/ответ':>12}{'байт':>10}{'ускорение':>11}")
+        for size in options['sizes']:
+            for name, page in build_pages(size).items():
+                baseline = None
+                for label, renderer in renderers:
+                    number = max(1, 20000 // size)
+                    timings = timeit.repeat(lambda: renderer.render(page), number=number, repeat=options['repeat'])
+                    microseconds = min(timings) / number * 1_000_000
+                    baseline = baseline or microseconds
+                    self.stdout.write(
+                        f"{f'{name}×{size}':<16}{label:<14}{microseconds:>12.1f}"
+                        f"{len(renderer.render(page)):>10}{baseline / microseconds:>10.1f}x"
+                    )
@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import rollups
+
+
+def parse_day(value: str) -> date:
+    """
+    Разбирает дату в формате ``YYYY-MM-DD``.
+    """
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Неверная дата '{value}': ожидается YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    """
+    Строит дневные итоги платежей и занятий.
+
+    Без параметров достраивает итоги по вчерашний день (как ночная задача),
+    с ``--start``/``--end`` или ``--all`` пересчитывает период заново:
+
+        python manage.py build_rollups --all
+        python manage.py build_rollups --start 2025-01-01 --end 2025-03-31
+    """
+    help = "Строит дневные итоги платежей и занятий (DailyIncome, DailyLessons)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--start', type=parse_day, default=None, help="Первый день периода (YYYY-MM-DD)")
+        parser.add_argument('--end', type=parse_day, default=None, help="Последний день периода (по умолчанию вчера)")
+        parser.add_argument('--all', action='store_true', help="Пересчитать итоги с первого дня данных")
+
+    def handle(self, *args, **options) -> None:
+        start, end = options['start'], options['end']
+        today = timezone.localdate()
+        # Текущий день ещё не закончился: его итоги неполны, а отчёты читают его из исходных таблиц
+        if end is not None and end >= today:
+            raise CommandError(f"--end должен быть раньше текущего дня ({today})")
+        if start and start > (end or today - timedelta(days=1)):
+            raise CommandError("Ожидается --start <= --end (по умолчанию --end — вчера)")
+
+        def progress(first: date, last: date) -> None:
+            self.stdout.write(f"{first} — {last}")
+
+        if start or end or options['all']:
+            written = rollups.backfill(start, end, progress=progress)
+        else:
+            written = rollups.refresh_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Дневные итоги построены: записано {written} строк"))
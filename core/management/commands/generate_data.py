@@ -0,0 +1,96 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.datagen import DatasetConfig, DatasetGenerator
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """
+    Разбирает распределение вида ``completed=0.9,pending=0.07,failed=0.03``.
+    """
+    weights = {}
+    for part in value.split(','):
+        name, separator, weight = part.partition('=')
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            raise CommandError(f"Неверный вес '{part}': ожидается name=число")
+        if not separator or weights[name.strip()] < 0:
+            raise CommandError(f"Неверный вес '{part}': ожидается name=число")
+    return weights
+
+
+class Command(BaseCommand):
+    """
+    Заполняет базу синтетическими данными для профилирования.
+
+    Пример (миллион занятий):
+
+        python manage.py generate_data --lessons 1000000 --students 50000 --horses 500 --seed 1
+    """
+    help = "Генерирует конюшни, тренеров, лошадей, учеников, занятия, платежи и новости через bulk_create"
+
+    def add_arguments(self, parser) -> None:
+        defaults = DatasetConfig()
+        parser.add_argument('--stables', type=int, default=defaults.stables, help="Количество конюшен")
+        parser.add_argument('--trainers', type=int, default=defaults.trainers, help="Количество тренеров")
+        parser.add_argument('--horses', type=int, default=defaults.horses, help="Количество лошадей")
+        parser.add_argument('--students', type=int, default=defaults.students, help="Количество учеников")
+        parser.add_argument('--lessons', type=int, default=defaults.lessons, help="Количество занятий")
+        parser.add_argument('--news', type=int, default=defaults.news, help="Количество новостей")
+        parser.add_argument(
+            '--trainers-per-horse', type=int, default=defaults.trainers_per_horse, help="Тренеров у лошади"
+        )
+        parser.add_argument('--days', type=int, default=defaults.days, help="Глубина истории занятий, дней")
+        parser.add_argument(
+            '--future-days', type=int, default=defaults.future_days, help="Горизонт расписания занятий, дней"
+        )
+        parser.add_argument(
+            '--completed-ratio', type=float, default=defaults.completed_ratio,
+            help="Доля завершённых среди прошедших занятий",
+        )
+        parser.add_argument(
+            '--payment-ratio', type=float, default=defaults.payment_ratio,
+            help="Доля завершённых занятий с платежом",
+        )
+        parser.add_argument(
+            '--payment-statuses', type=parse_weights,
+            default=defaults.payment_statuses, help="Распределение статусов платежей: completed=0.9,pending=0.1",
+        )
+        parser.add_argument(
+            '--inactive-news-ratio', type=float, default=defaults.inactive_news_ratio,
+            help="Доля неактивных новостей",
+        )
+        parser.add_argument('--price-min', type=int, default=defaults.price_min, help="Минимальная цена занятия")
+        parser.add_argument('--price-max', type=int, default=defaults.price_max, help="Максимальная цена занятия")
+        parser.add_argument(
+            '--skew', type=float, default=defaults.skew,
+            help="Неравномерность популярности лошадей и учеников (Ципф, 0 — равномерно)",
+        )
+        parser.add_argument('--batch-size', type=int, default=defaults.batch_size, help="Размер пакета bulk_create")
+        parser.add_argument('--seed', type=int, default=None, help="Зерно генератора случайных чисел")
+        parser.add_argument('--password', default=None, help="Общий пароль учеников (по умолчанию вход запрещён)")
+        parser.add_argument(
+            '--skip-refresh', action='store_true',
+            help="Не пересчитывать статистику, счётчики, рейтинги и поисковый индекс",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['price_min'] <= 0 or options['price_min'] > options['price_max']:
+            raise CommandError("Ожидается 0 < --price-min <= --price-max")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size должен быть больше 0")
+        config = DatasetConfig(**{
+            name: options[name] for name in DatasetConfig.__dataclass_fields__ if name in options
+        })
+        started = time.perf_counter()
+
+        def progress(model: str, done: int, total: int) -> None:
+            self.stdout.write(f"{model}: {done}/{total} ({time.perf_counter() - started:.1f} с)")
+
+        created = DatasetGenerator(config, progress=progress).run(refresh=not options['skip_refresh'])
+        summary = ', '.join(f"{model}: {count}" for model, count in created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Данные созданы за {time.perf_counter() - started:.1f} с — {summary}"
+        ))
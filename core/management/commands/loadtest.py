@@ -0,0 +1,287 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Optional
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.utils import timezone
+
+from core.datagen import DatasetConfig, DatasetGenerator
+from core.loadtest import Scenario, compare_reports, run_scenarios
+from core.models import Horse, Lesson, NewsPost, Payment, Trainer
+
+SERVERS = {
+    'runserver': lambda port, workers: [
+        sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'runserver', '--noreload', f"127.0.0.1:{port}",
+    ],
+    'gunicorn': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'myproject.wsgi', '-w', str(workers), '-b', f"127.0.0.1:{port}",
+    ],
+    'uvicorn': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'myproject.asgi:application',
+        '--workers', str(workers), '--host', '127.0.0.1', '--port', str(port),
+    ],
+}
+
+
+def sample_ids(queryset: models.QuerySet, count: int = 50) -> list[int]:
+    """
+    Возвращает ID первых и последних объектов (без ORDER BY RANDOM() по большой таблице).
+    """
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    return sorted(set(queryset[:count]) | set(queryset.reverse()[:count]))
+
+
+def words(values: list[str]) -> list[str]:
+    """
+    Возвращает слова для поисковых запросов.
+    """
+    return sorted({word for value in values for word in value.replace('-', ' ').split() if len(word) > 3}) or ['тест']
+
+
+def build_scenarios(admin_cookie: Optional[str]) -> list[Scenario]:
+    """
+    Строит сценарии по данным в базе: списки, фильтры, поиск, пагинация
+    и детальные страницы всех ресурсов API, а также страницы админки.
+    """
+    month_ago = (timezone.now() - timedelta(days=30)).date().isoformat()
+    yesterday = (timezone.now() - timedelta(days=1)).date().isoformat()
+    horse_words = words(list(Horse.objects.values_list('name', flat=True)[:50]))
+    trainer_words = words(list(Trainer.objects.values_list('last_name', flat=True)[:50]))
+    news_words = words(list(NewsPost.objects.values_list('title', flat=True)[:50]))
+    ids = {model: sample_ids(model.objects.all()) for model in (Trainer, Horse, Lesson, Payment)}
+    # Неактивные новости API не отдаёт (404)
+    ids[NewsPost] = sample_ids(NewsPost.objects.filter(is_active=True))
+
+    def detail(prefix: str, model: type[models.Model]) -> list[str]:
+        return [f"{prefix}{pk}/" for pk in ids[model]] or [prefix]
+
+    scenarios = [
+        Scenario('home', ['/'], weight=3),
+        Scenario('news-list', ['/api/news/', '/api/news/?page=2', '/api/news/?page_size=50'], weight=8),
+        Scenario('news-filter', [f"/api/news/?published_after={month_ago}", '/api/news/?ordering=-created_at'], weight=3),
+        Scenario('news-search', [f"/api/news/?search={word}" for word in news_words], weight=3),
+        Scenario('news-cursor', ['/api/news/?cursor=', '/api/news/?cursor=&count=estimated'], weight=3),
+        Scenario('news-detail', detail('/api/news/', NewsPost), weight=5),
+        Scenario('trainers-list', ['/api/trainers/', '/api/trainers/?ordering=last_name'], weight=4),
+        Scenario('trainers-filter', ['/api/trainers/?experience_min=10', '/api/trainers/?experience_max=5'], weight=2),
+        Scenario('trainers-search', [f"/api/trainers/?search={word}" for word in trainer_words], weight=2),
+        Scenario('trainers-detail', detail('/api/trainers/', Trainer), weight=3),
+        Scenario('horses-list', ['/api/horses/', '/api/horses/?page=2'], weight=4),
+        Scenario('horses-filter', ['/api/horses/?gender=female', '/api/horses/?gender=male'], weight=2),
+        Scenario('horses-search', [f"/api/horses/?search={word}" for word in horse_words], weight=2),
+        Scenario('horses-detail', detail('/api/horses/', Horse), weight=3),
+        Scenario('lessons-list', ['/api/lessons/', '/api/lessons/?page=3', '/api/lessons/?ordering=price'], weight=6),
+        Scenario(
+            'lessons-filter',
+            ['/api/lessons/?status=completed', f"/api/lessons/?status=scheduled&date_after={yesterday}",
+             f"/api/lessons/?date_after={month_ago}&price_min=2000"],
+            weight=4,
+        ),
+        Scenario('lessons-search', [f"/api/lessons/?search={word}" for word in horse_words], weight=2),
+        Scenario('lessons-cursor', ['/api/lessons/?cursor=', '/api/lessons/?cursor=&ordering=price'], weight=2),
+        Scenario('lessons-detail', detail('/api/lessons/', Lesson), weight=3),
+        Scenario('lessons-export', [f"/api/lessons/export/?date_after={yesterday}&export_format=ndjson"], weight=0.5),
+        Scenario('payments-list', ['/api/payments/', '/api/payments/?page=2'], weight=4),
+        Scenario(
+            'payments-filter',
+            ['/api/payments/?status=completed', f"/api/payments/?timestamp_after={month_ago}"],
+            weight=3,
+        ),
+        Scenario('payments-detail', detail('/api/payments/', Payment), weight=2),
+        Scenario('search', [f"/api/search/?q={word}" for word in news_words + horse_words], weight=3),
+        Scenario('autocomplete', [f"/api/autocomplete/?q={word[:3]}" for word in horse_words + trainer_words], weight=3),
+        Scenario(
+            'batch',
+            ['/api/batch/'],
+            weight=1,
+            method='POST',
+            body=json.dumps({'requests': [
+                {'id': 'news', 'path': '/api/news/?page_size=5'},
+                {'id': 'horses', 'path': '/api/horses/?page_size=5'},
+                {'id': 'trainers', 'path': '/api/trainers/?page_size=5'},
+            ]}).encode(),
+        ),
+    ]
+    if admin_cookie:
+        headers = {'Cookie': admin_cookie}
+        scenarios += [
+            Scenario(
+                'admin-changelist',
+                ['/admin/core/lesson/', '/admin/core/payment/', '/admin/core/newspost/', '/admin/core/horse/',
+                 '/admin/core/trainer/', '/admin/core/lesson/?status__exact=completed'],
+                weight=2, headers=headers,
+            ),
+            Scenario(
+                'admin-search',
+                [f"/admin/core/lesson/?q={word}" for word in horse_words[:10]]
+                + [f"/admin/core/horse/?q={word}" for word in horse_words[:10]],
+                weight=1, headers=headers,
+            ),
+            Scenario(
+                'admin-change', [f"/admin/core/lesson/{pk}/change/" for pk in ids[Lesson]], weight=1, headers=headers
+            ),
+        ]
+    return [scenario for scenario in scenarios if scenario.paths]
+
+
+def admin_session(username: Optional[str]) -> tuple[Optional[str], Optional[Any]]:
+    """
+    Создаёт сессию администратора для запросов к админке.
+
+    Returns:
+        Заголовок Cookie и объект сессии (для удаления после замера).
+    """
+    users = User.objects.filter(is_superuser=True, is_active=True)
+    user = users.filter(username=username).first() if username else users.order_by('pk').first()
+    if user is None:
+        if username:
+            raise CommandError(f"Суперпользователь '{username}' не найден")
+        return None, None
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}", session
+
+
+def wait_for_port(process: subprocess.Popen, port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Сервер завершился с кодом {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Сервер не открыл порт {port} за {timeout} с")
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный замер API и админки со смешанным трафиком.
+
+    Без ``--base-url`` команда сама запускает сервер (gunicorn, uvicorn
+    или runserver) на текущей базе данных. Отчёт сохраняется в JSON;
+    с ``--baseline`` он сравнивается с эталонным отчётом и команда
+    завершается ошибкой при регрессиях:
+
+        python manage.py generate_data --lessons 1000000 --seed 1
+        python manage.py loadtest --requests 5000 --concurrency 20 --seed 1 --output baseline.json
+        python manage.py loadtest --requests 5000 --concurrency 20 --seed 1 --baseline baseline.json
+    """
+    help = "Замеряет RPS и задержки p50/p95/p99 при смешанной нагрузке и сравнивает с эталонным отчётом"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--base-url', help="Адрес запущенного сервера (по умолчанию сервер запускается)")
+        parser.add_argument('--server', choices=sorted(SERVERS), default='gunicorn', help="Запускаемый сервер")
+        parser.add_argument('--workers', type=int, default=4, help="Воркеры запускаемого сервера")
+        parser.add_argument('--port', type=int, default=8765, help="Порт запускаемого сервера")
+        parser.add_argument('--boot-timeout', type=float, default=30.0, help="Ожидание запуска сервера, с")
+        parser.add_argument(
+            '--generate', type=int, default=0, metavar='LESSONS',
+            help="Сгенерировать набор данных с указанным числом занятий перед замером",
+        )
+        parser.add_argument('--requests', type=int, default=2000, help="Количество запросов")
+        parser.add_argument('--concurrency', type=int, default=10, help="Параллельные клиенты")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Предельное время запроса, с")
+        parser.add_argument('--warmup', type=int, default=100, help="Запросы прогрева (в отчёт не входят)")
+        parser.add_argument('--seed', type=int, default=None, help="Зерно выбора сценариев и адресов")
+        parser.add_argument('--only', nargs='+', default=None, help="Префиксы имён сценариев (news, admin, ...)")
+        parser.add_argument('--admin-user', default=None, help="Суперпользователь для страниц админки")
+        parser.add_argument('--output', default='loadtest-report.json', help="Файл отчёта (JSON)")
+        parser.add_argument('--baseline', default=None, help="Эталонный отчёт для сравнения")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Допустимый рост задержек (доля)")
+        parser.add_argument('--no-fail', action='store_true', help="Не завершаться ошибкой при регрессиях")
+
+    def handle(self, *args, **options) -> None:
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Не удалось прочитать эталонный отчёт: {e}")
+
+        if options['generate']:
+            self.stdout.write(f"Генерация данных: {options['generate']} занятий...")
+            DatasetGenerator(DatasetConfig(lessons=options['generate'], seed=options['seed'])).run()
+
+        cookie, session = admin_session(options['admin_user'])
+        scenarios = build_scenarios(cookie)
+        if options['only']:
+            scenarios = [scenario for scenario in scenarios if scenario.name.startswith(tuple(options['only']))]
+        if not scenarios:
+            raise CommandError("Нет сценариев для замера")
+
+        process = None
+        base_url = options['base_url']
+        if not base_url:
+            port = options['port']
+            process = subprocess.Popen(
+                SERVERS[options['server']](port, options['workers']), cwd=settings.BASE_DIR,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            base_url = f"http://127.0.0.1:{port}"
+        try:
+            if process is not None:
+                wait_for_port(process, options['port'], options['boot_timeout'])
+            if options['warmup']:
+                asyncio.run(run_scenarios(
+                    base_url, scenarios, options['warmup'], options['concurrency'], options['timeout'], options['seed']
+                ))
+            report = asyncio.run(run_scenarios(
+                base_url, scenarios, options['requests'], options['concurrency'], options['timeout'], options['seed']
+            ))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=10)
+            if session is not None:
+                session.delete()
+
+        report['meta'] = {
+            'created_at': timezone.now().isoformat(),
+            'base_url': base_url,
+            'server': None if options['base_url'] else options['server'],
+            'workers': None if options['base_url'] else options['workers'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'dataset': {model.__name__: model.objects.count() for model in (NewsPost, Trainer, Horse, Lesson, Payment)},
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+        self.print_report(report)
+        self.stdout.write(f"Отчёт сохранён: {options['output']}")
+        if baseline is None:
+            return
+        regressions = compare_reports(report, baseline, tolerance=options['tolerance'])
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS("Регрессий относительно эталона нет"))
+            return
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if not options['no_fail']:
+            raise CommandError(f"Найдено регрессий: {len(regressions)}")
+
+    def print_report(self, report: dict[str, Any]) -> None:
+        columns = ('requests', 'errors', 'rps', 'p50', 'p95', 'p99', 'max')
+        self.stdout.write(f"{'сценарий':<20}" + ''.join(f"{column:>10}" for column in columns))
+        rows = sorted(report['scenarios'].items()) + [('total', report['total'])]
+        for name, summary in rows:
+            self.stdout.write(f"{name:<20}" + ''.join(f"{summary[column]:>10}" for column in columns))
+        self.stdout.write("Задержки в миллисекундах; rps — успешные запросы в секунду.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.leaderboards import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает рейтинги тренеров и лошадей по базе данных.
+    """
+    help = "Пересобирает рейтинги тренеров и лошадей (Redis sorted sets) по таблице занятий"
+
+    def handle(self, *args, **options) -> None:
+        keys = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS(f"Рейтинги пересобраны: {keys} ключей"))
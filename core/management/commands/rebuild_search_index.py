@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Пересобирает поисковые документы новостей, тренеров и лошадей.
+    """
+    help = "Пересобирает полнотекстовый поисковый индекс (новости, тренеры, лошади)"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--batch-size', type=int, default=500, help="Размер пакета при записи документов")
+
+    def handle(self, *args, **options) -> None:
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Поисковый индекс пересобран: {total} документов"))
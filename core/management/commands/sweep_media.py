@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cleanup import MEDIA_MIN_AGE, SweepReport, media_directories, sweep_orphaned_media
+
+
+class Command(BaseCommand):
+    """
+    Удаляет медиафайлы, на которые не ссылается ни одна запись.
+
+    Пример (только показать, что будет удалено):
+
+        python manage.py sweep_media --dry-run
+    """
+    help = "Удаляет файлы без ссылок из каталогов загрузок новостей, лошадей и тренеров"
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--dry-run', action='store_true', help="Только посчитать файлы, не удаляя")
+        parser.add_argument(
+            '--min-age', type=float, default=MEDIA_MIN_AGE.total_seconds() / 3600,
+            help="Не удалять файлы моложе указанного возраста, часов",
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['min_age'] < 0:
+            raise CommandError("--min-age не может быть отрицательным")
+
+        def progress(report: SweepReport) -> None:
+            self.stdout.write(f"Просмотрено {report.scanned}, без ссылок {report.removed}")
+
+        self.stdout.write(f"Каталоги: {', '.join(media_directories())}")
+        keep = getattr(settings, 'MEDIA_SWEEP_KEEP', ())
+        if keep:
+            self.stdout.write(f"Не удаляются: {', '.join(keep)}")
+        report = sweep_orphaned_media(
+            dry_run=options['dry_run'], min_age=timedelta(hours=options['min_age']), progress=progress
+        )
+        action = "Будет удалено" if options['dry_run'] else "Удалено"
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} файлов: {report.removed} из {report.scanned} ({report.removed_bytes} байт)"
+        ))
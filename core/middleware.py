@@ -1,10 +1,17 @@
 """
-Middleware для интеграции с Sentry.
+Middleware проекта: интеграция с Sentry и сжатие ответов.
 """
 
 import sentry_sdk
 from typing import Any, Callable
 from django.http import HttpRequest, HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from .compression import (
+    MIN_LENGTH, choose_encoding, compress, compress_async_stream, compress_padded, compress_stream, has_csrf_token,
+    is_compressible, mark_encoded,
+)
 
 
 class SentryMiddleware:
@@ -55,4 +62,61 @@ class SentryMiddleware:
         # Добавляем информацию о статусе ответа
         sentry_sdk.set_tag("status_code", response.status_code)
         
-        return response 
\ No newline at end of file
+        return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Middleware для сжатия ответов brotli или gzip (по Accept-Encoding).
+
+    Пропускает короткие, уже сжатые и несжимаемые ответы (изображения, архивы).
+    Потоковые ответы сжимаются по фрагментам. Для ответов из кэша API
+    (ResponseCacheMixin) используется сжатый вариант из той же записи кэша.
+    Ответы с CSRF-токеном сжимаются gzip со случайным дополнением (BREACH).
+    """
+
+    def process_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if not is_compressible(response):
+            return response
+        if not response.streaming and len(response.content) < MIN_LENGTH:
+            return response
+        # Ответ зависит от Accept-Encoding, даже если этот клиент сжатие не принимает
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if has_csrf_token(request, response):
+            return self.compress_with_secret(request, response)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            variants = getattr(response, 'compressed_variants', None)
+            compressed = variants.get(encoding) if variants is not None else compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        mark_encoded(response, encoding)
+        return response
+
+    @staticmethod
+    def compress_with_secret(request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        """
+        Сжимает ответ с CSRF-токеном: только gzip со случайным дополнением длины.
+
+        Потоковые ответы и клиенты без gzip получают ответ без сжатия.
+        """
+        if response.streaming or choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), ('gzip',)) is None:
+            return response
+        compressed = compress_padded(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        mark_encoded(response, 'gzip')
+        return response
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.17 on 2026-10-18 04:05
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_price_statistics(apps, schema_editor):
+    Lesson = apps.get_model('core', 'Lesson')
+    PriceStatistics = apps.get_model('core', 'PriceStatistics')
+    totals = Lesson.objects.aggregate(count=Count('id'), total=Sum('price'))
+    rows = [PriceStatistics(scope='global', object_id=0, lessons_count=totals['count'], total_price=totals['total'] or 0)]
+    for scope, group_field in (('trainer', 'trainer_id'), ('horse', 'horse_id')):
+        grouped = Lesson.objects.order_by().values(group_field).annotate(count=Count('id'), total=Sum('price'))
+        rows.extend(
+            PriceStatistics(scope=scope, object_id=row[group_field], lessons_count=row['count'], total_price=row['total'])
+            for row in grouped
+        )
+    PriceStatistics.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_horse_name_en_newspost_title_en_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('global', 'Все занятия'), ('trainer', 'Тренер'), ('horse', 'Лошадь')], max_length=20, verbose_name='Область')),
+                ('object_id', models.PositiveBigIntegerField(default=0, verbose_name='ID объекта')),
+                ('lessons_count', models.BigIntegerField(default=0, verbose_name='Количество занятий')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Сумма цен')),
+            ],
+            options={
+                'verbose_name': 'Статистика цен',
+                'verbose_name_plural': 'Статистика цен',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pricestatistics',
+            constraint=models.UniqueConstraint(fields=('scope', 'object_id'), name='unique_price_statistics_scope'),
+        ),
+        migrations.RunPython(fill_price_statistics, migrations.RunPython.noop),
+    ]
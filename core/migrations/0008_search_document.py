@@ -0,0 +1,133 @@
+# Generated by Django 4.2.17 on 2026-10-18 04:14
+
+import re
+
+from django.db import migrations, models
+
+SQLITE_FTS_SQL = [
+    "CREATE VIRTUAL TABLE core_searchdocument_fts USING fts5("
+    "title_terms, body_terms, content='core_searchdocument', content_rowid='id')",
+    "CREATE TRIGGER core_searchdocument_fts_insert AFTER INSERT ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(rowid, title_terms, body_terms) "
+    "VALUES (new.id, new.title_terms, new.body_terms); END",
+    "CREATE TRIGGER core_searchdocument_fts_delete AFTER DELETE ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title_terms, body_terms) "
+    "VALUES ('delete', old.id, old.title_terms, old.body_terms); END",
+    "CREATE TRIGGER core_searchdocument_fts_update AFTER UPDATE ON core_searchdocument BEGIN "
+    "INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title_terms, body_terms) "
+    "VALUES ('delete', old.id, old.title_terms, old.body_terms); "
+    "INSERT INTO core_searchdocument_fts(rowid, title_terms, body_terms) "
+    "VALUES (new.id, new.title_terms, new.body_terms); END",
+]
+
+SQLITE_FTS_DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_insert",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_delete",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_update",
+    "DROP TABLE IF EXISTS core_searchdocument_fts",
+]
+
+POSTGRESQL_VECTOR_SQL = [
+    "ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('russian', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(title_en, '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(body, '')), 'B')) STORED",
+    "CREATE INDEX core_searchdocument_vector_gin ON core_searchdocument USING GIN (search_vector)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRESQL_VECTOR_SQL
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            options = {row[0] for row in cursor.fetchall()}
+        # Без FTS5 поиск работает через LIKE по основам слов
+        statements = SQLITE_FTS_SQL if 'ENABLE_FTS5' in options else []
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FTS_DROP_SQL:
+            schema_editor.execute(statement)
+
+
+TAG_RE = re.compile(r'<[^>]+>')
+
+
+def news_fields(obj):
+    return obj.title, obj.title_en, TAG_RE.sub(' ', obj.content or ''), obj.is_active
+
+
+def trainer_fields(obj):
+    title_en = f"{obj.first_name_en} {obj.last_name_en}".strip()
+    return f"{obj.first_name} {obj.last_name}", title_en, obj.bio, True
+
+
+def horse_fields(obj):
+    return obj.name, obj.name_en, obj.description or '', True
+
+
+# Поля документов на момент этой миграции (не зависят от текущего core.search)
+DOCUMENT_FIELDS = (
+    ('NewsPost', 'news', news_fields),
+    ('Trainer', 'trainer', trainer_fields),
+    ('Horse', 'horse', horse_fields),
+)
+
+
+def fill_search_documents(apps, schema_editor):
+    # Стеммер работает только с текстом и от полей моделей не зависит
+    from core.search import terms
+
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    for model_name, kind, fields in DOCUMENT_FIELDS:
+        model = apps.get_model('core', model_name)
+        documents = []
+        for obj in model.objects.iterator():
+            title, title_en, body, is_public = fields(obj)
+            documents.append(SearchDocument(
+                kind=kind, object_id=obj.pk, title=title, title_en=title_en or '', body=body,
+                title_terms=terms(title, title_en), body_terms=terms(body), is_public=is_public,
+            ))
+        SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_price_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('news', 'Новость'), ('trainer', 'Тренер'), ('horse', 'Лошадь')], max_length=20, verbose_name='Вид')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('title', models.CharField(max_length=300, verbose_name='Заголовок')),
+                ('title_en', models.CharField(blank=True, max_length=300, verbose_name='Заголовок (англ.)')),
+                ('body', models.TextField(blank=True, verbose_name='Текст')),
+                ('title_terms', models.TextField(blank=True, verbose_name='Основы слов заголовка')),
+                ('body_terms', models.TextField(blank=True, verbose_name='Основы слов текста')),
+                ('is_public', models.BooleanField(default=True, verbose_name='Доступен в поиске')),
+            ],
+            options={
+                'verbose_name': 'Поисковый документ',
+                'verbose_name_plural': 'Поисковые документы',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document_object'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.17 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_search_document'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['status', 'date'], name='lesson_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['date'], name='lesson_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newspost',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['published_at'], name='newspost_active_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='newspost',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['created_at'], name='newspost_inactive_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'timestamp'], name='payment_status_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['timestamp'], name='payment_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.17 on 2026-10-18 05:03
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def plan_reminders(apps, schema_editor):
+    # Напоминание за 2 часа до будущих запланированных занятий (core.notifications.REMINDER_LEAD)
+    Lesson = apps.get_model('core', 'Lesson')
+    Lesson.objects.filter(status='scheduled', date__gt=timezone.now()).update(
+        reminder_due_at=F('date') - timedelta(hours=2)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='reminder_due_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Время напоминания'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Напоминание отправлено'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(('reminder_due_at__isnull', False), ('reminder_sent_at__isnull', True)), fields=['reminder_due_at'], name='lesson_reminder_due_idx'),
+        ),
+        migrations.RunPython(plan_reminders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.17 on 2026-10-18 05:06
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def fill_horse_statistics(apps, schema_editor):
+    # Тот же расчёт, что и в core.stats.refresh_horse_statistics
+    Horse = apps.get_model('core', 'Horse')
+    HorseStatistics = apps.get_model('core', 'HorseStatistics')
+    now = timezone.now()
+    past = Q(lessons__date__lte=now)
+    grouped = Horse.objects.order_by().values('pk').annotate(
+        lessons_7d=Count('lessons', filter=past & Q(lessons__date__gt=now - timedelta(days=7))),
+        lessons_30d=Count('lessons', filter=past & Q(lessons__date__gt=now - timedelta(days=30))),
+        lessons_365d=Count('lessons', filter=past & Q(lessons__date__gt=now - timedelta(days=365))),
+        lessons_total=Count('lessons'),
+        total_price=Sum('lessons__price'),
+        last_lesson_date=Max('lessons__date', filter=past),
+    )
+    rows = []
+    for row in grouped:
+        total, count = Decimal(row['total_price'] or 0), row['lessons_total']
+        rows.append(HorseStatistics(
+            horse_id=row['pk'],
+            lessons_7d=row['lessons_7d'],
+            lessons_30d=row['lessons_30d'],
+            lessons_365d=row['lessons_365d'],
+            lessons_total=count,
+            average_price=(total / count).quantize(Decimal('0.01')) if count else Decimal('0'),
+            total_price=total,
+            last_lesson_date=row['last_lesson_date'],
+            updated_at=now,
+        ))
+    HorseStatistics.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_lesson_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HorseStatistics',
+            fields=[
+                ('horse', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='core.horse', verbose_name='Лошадь')),
+                ('lessons_7d', models.PositiveIntegerField(default=0, verbose_name='Занятий за 7 дней')),
+                ('lessons_30d', models.PositiveIntegerField(default=0, verbose_name='Занятий за 30 дней')),
+                ('lessons_365d', models.PositiveIntegerField(default=0, verbose_name='Занятий за год')),
+                ('lessons_total', models.PositiveIntegerField(default=0, verbose_name='Всего занятий')),
+                ('average_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Средняя цена')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Сумма цен')),
+                ('last_lesson_date', models.DateTimeField(blank=True, null=True, verbose_name='Последнее занятие')),
+                ('updated_at', models.DateTimeField(verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Статистика лошади',
+                'verbose_name_plural': 'Статистика лошадей',
+            },
+        ),
+        migrations.RunPython(fill_horse_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.17 on 2026-10-18 05:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_horse_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyIncome',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус платежа')),
+                ('payments_count', models.PositiveIntegerField(default=0, verbose_name='Количество платежей')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Сумма')),
+            ],
+            options={
+                'verbose_name': 'Дневной доход',
+                'verbose_name_plural': 'Дневные доходы',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyLessons',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('status', models.CharField(max_length=20, verbose_name='Статус занятия')),
+                ('lessons_count', models.PositiveIntegerField(default=0, verbose_name='Количество занятий')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Сумма цен')),
+                ('horse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.horse', verbose_name='Лошадь')),
+                ('trainer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.trainer', verbose_name='Тренер')),
+            ],
+            options={
+                'verbose_name': 'Дневные занятия',
+                'verbose_name_plural': 'Дневные занятия',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailyincome',
+            constraint=models.UniqueConstraint(fields=('day', 'status'), name='unique_daily_income'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailylessons',
+            constraint=models.UniqueConstraint(fields=('day', 'trainer', 'horse', 'status'), name='unique_daily_lessons'),
+        ),
+    ]
@@ -0,0 +1,337 @@
+"""
+Миксины для API ViewSet'ов.
+"""
+
+import csv
+import hashlib
+import json
+import time
+from typing import Any, Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.utils import timezone
+from django.utils.translation import get_language
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .caching import get_versions, shared_cache
+from .compression import MIN_LENGTH, CompressedVariants, choose_encoding, compress
+from .planner import build_query_plan
+
+
+class QueryPlannerMixin:
+    """
+    Миксин ViewSet'а, автоматически подключающий select_related,
+    prefetch_related и only() по полям сериализатора.
+    """
+
+    def get_queryset(self) -> models.QuerySet:
+        """
+        Возвращает QuerySet, оптимизированный под сериализатор представления.
+        """
+        queryset = super().get_queryset()
+        serializer = self.get_serializer_class()(context={'request': self.request, 'view': self})
+        plan = build_query_plan(serializer, queryset.query.annotations.keys())
+        return plan.apply(queryset, defer=self.request.method in SAFE_METHODS)
+
+
+class ValuesListMixin:
+    """
+    Миксин ViewSet'а, отдающий списки через ``values()`` сериализатора
+    (см. ValuesSerializerMixin) без создания объектов моделей.
+
+    Детальный просмотр и запросы на изменение используют полный
+    сериализатор; ``values_fast_path = False`` отключает быстрый режим.
+    """
+    values_fast_path = True
+
+    def use_values_fast_path(self, request: Request) -> bool:
+        """
+        Проверяет, можно ли отдать список через values().
+        """
+        return (
+            self.values_fast_path
+            and request.method in SAFE_METHODS
+            and hasattr(self.get_serializer_class(), 'values_queryset')
+        )
+
+    def values_extra_lookups(self) -> list[str]:
+        """
+        Возвращает пути, нужные пагинации (ключи сортировки и курсора), даже если поля нет в ответе.
+        """
+        return ['id', *getattr(self, 'ordering_fields', ())]
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        if not self.use_values_fast_path(request):
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer()
+        queryset = serializer.values_queryset(self.filter_queryset(self.get_queryset()), self.values_extra_lookups())
+        page = self.paginate_queryset(queryset)
+        rows = queryset if page is None else page
+        data = [serializer.row_to_representation(row) for row in rows]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ModelVersionsMixin:
+    """
+    Базовый миксин для представлений, зависящих от версий моделей.
+    """
+    # Модели, изменения которых влияют на ответ представления
+    version_models: tuple[type[models.Model], ...] = ()
+
+    def get_version_models(self) -> tuple[type[models.Model], ...]:
+        """
+        Возвращает модели, от которых зависит ответ.
+        """
+        return self.version_models or (self.queryset.model,)
+
+    def get_model_versions(self) -> dict[str, int]:
+        """
+        Возвращает версии моделей (один раз за запрос).
+        """
+        if getattr(self, '_model_versions', None) is None:
+            self._model_versions = get_versions(self.get_version_models())
+        return self._model_versions
+
+
+class ConditionalGetMixin(ModelVersionsMixin):
+    """
+    Миксин ViewSet'а с поддержкой условных GET-запросов.
+
+    ETag и Last-Modified вычисляются по версиям моделей из
+    ``version_models``, поэтому ответ 304 отдаётся до обращения
+    к ORM и сериализаторам. Без общего кэша (версии были бы у каждого
+    процесса свои) валидаторы не выдаются.
+    """
+
+    def get_validators(self, request: Request) -> tuple[str, int]:
+        """
+        Возвращает ETag и время последнего изменения (в секундах) для запроса.
+        """
+        versions = self.get_model_versions()
+        material = json.dumps(
+            [sorted(versions.items()), request.get_full_path(), request.accepted_renderer.media_type],
+            ensure_ascii=False,
+        )
+        etag = quote_etag(hashlib.sha1(material.encode()).hexdigest())
+        last_modified = max(versions.values()) // 1_000_000
+        return etag, last_modified
+
+    @staticmethod
+    def is_not_modified(request: Request, etag: str, last_modified: int) -> bool:
+        """
+        Проверяет заголовки If-None-Match и If-Modified-Since.
+
+        Если клиент прислал If-None-Match, решает только ETag (If-Modified-Since
+        игнорируется, RFC 9110 13.2.2).
+        """
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            return '*' in etags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in etags]
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and last_modified <= if_modified_since
+
+    def conditional_response(self, request: Request, handler: Callable, *args: Any, **kwargs: Any) -> Response:
+        """
+        Отдаёт 304 при совпадении валидаторов, иначе вызывает обработчик.
+        """
+        if request.method not in ('GET', 'HEAD') or not shared_cache():
+            return handler(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        if self.is_not_modified(request, etag, last_modified):
+            response = Response(status=304)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            # Секунда последнего изменения ещё не закончилась: изменение в ту же
+            # секунду не изменило бы Last-Modified, поэтому остаётся только ETag
+            if last_modified < int(time.time()):
+                response['Last-Modified'] = http_date(last_modified)
+            # Браузер хранит ответ, но перепроверяет его при каждом запросе
+            patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request: Request, *args: Any, **kwargs: Any) -> Response:
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+
+class ResponseCacheMixin(ModelVersionsMixin):
+    """
+    Миксин ViewSet'а, кэширующий отрендеренные ответы списков.
+
+    Ключ строится по версиям моделей-зависимостей, нормализованной строке
+    запроса (фильтры, поиск, сортировка, страница), языку и формату ответа.
+    Изменение любой зависимости меняет её версию (сигналы моделей), и старые
+    записи перестают использоваться без явного удаления. Рядом с ответом
+    хранятся его сжатые варианты (br, gzip), которые отдаёт
+    CompressionMiddleware, поэтому горячие списки сжимаются один раз,
+    а не при каждом запросе. Без общего кэша ответы не кэшируются:
+    версии моделей в памяти процесса не видят изменений из других процессов.
+    """
+    cache_formats = ('json', 'msgpack')
+
+    def normalized_query(self, request: Request) -> list[tuple[str, str]]:
+        """
+        Возвращает параметры запроса в каноническом виде.
+
+        Пустые значения фильтров, поиска и сортировки, а также ``page=1``
+        не меняют результат и отбрасываются.
+        """
+        optional = {'search', 'ordering'}
+        filterset_class = getattr(self, 'filterset_class', None)
+        if filterset_class is not None:
+            optional.update(filterset_class.base_filters.keys())
+        params = []
+        for key, values in request.query_params.lists():
+            for value in values:
+                if key in optional and value == '':
+                    continue
+                if key == 'page' and value == '1':
+                    continue
+                params.append((key, value))
+        return sorted(params)
+
+    def response_cache_key(self, request: Request) -> str:
+        """
+        Возвращает ключ кэша ответа для запроса.
+        """
+        material = json.dumps(
+            [
+                # Ссылки пагинации абсолютные, поэтому учитываются схема и хост
+                request.build_absolute_uri(request.path),
+                sorted(self.get_model_versions().items()),
+                self.normalized_query(request),
+                get_language(),
+                request.accepted_renderer.format,
+            ],
+            ensure_ascii=False,
+        )
+        return f"api-response:{hashlib.sha1(material.encode()).hexdigest()}"
+
+    def list(self, request: Request, *args: Any, **kwargs: Any) -> HttpResponse:
+        if request.accepted_renderer.format not in self.cache_formats or not shared_cache():
+            return super().list(request, *args, **kwargs)
+        key = self.response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+            response.compressed_variants = CompressedVariants(key, cached, settings.API_RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'HIT'
+            return response
+        self._response_cache_key = key
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request: Request, response: HttpResponse, *args: Any, **kwargs: Any) -> HttpResponse:
+        """
+        Сохраняет отрендеренный успешный ответ в кэш.
+        """
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, '_response_cache_key', None)
+        if key and isinstance(response, Response) and response.status_code == 200:
+            response.render()
+            cached = {'content': response.content, 'content_type': response['Content-Type'], 'encoded': {}}
+            # Вариант для кодировки клиента сжимается сразу, чтобы не записывать кэш дважды
+            encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            if encoding is not None and len(response.content) >= MIN_LENGTH:
+                cached['encoded'][encoding] = compress(response.content, encoding, cached=True)
+            cache.set(key, cached, settings.API_RESPONSE_CACHE_TIMEOUT)
+            response.compressed_variants = CompressedVariants(key, cached, settings.API_RESPONSE_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+        return response
+
+
+class _Echo:
+    """
+    Псевдо-файл для csv.writer: возвращает строку вместо записи.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+class ExportMixin:
+    """
+    Миксин ViewSet'а с потоковой выгрузкой списка (``/export/``).
+
+    Учитывает те же параметры фильтрации, поиска и сортировки, что и список.
+    Строки читаются через ``values()`` и ``iterator(chunk_size=...)``
+    (серверный курсор на PostgreSQL), поэтому память не зависит от объёма
+    выгрузки. Формат задаётся параметром ``export_format`` (ndjson | csv);
+    поток сжимается на лету CompressionMiddleware.
+    """
+    # Пары (имя столбца выгрузки, путь для values())
+    export_fields: tuple[tuple[str, str], ...] = ()
+    export_chunk_size = 2000
+    # Действия с потоковым ответом (не выполняются в пакетном запросе)
+    streaming_actions: tuple[str, ...] = ('export',)
+    export_formats = {
+        'ndjson': 'application/x-ndjson; charset=utf-8',
+        'csv': 'text/csv; charset=utf-8',
+    }
+
+    def export_rows(self) -> Iterator[dict[str, Any]]:
+        """
+        Возвращает итератор строк выгрузки с учётом фильтров запроса.
+        """
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        lookups = [lookup for _name, lookup in self.export_fields]
+        names = [name for name, _lookup in self.export_fields]
+        for row in queryset.values_list(*lookups).iterator(chunk_size=self.export_chunk_size):
+            yield dict(zip(names, row))
+
+    def encode_rows(self, rows: Iterable[dict[str, Any]], export_format: str) -> Iterator[str]:
+        """
+        Кодирует строки в NDJSON или CSV пачками по ``export_chunk_size``.
+        """
+        batch: list[str] = []
+        writer = csv.writer(_Echo())
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+        def encode(row: dict[str, Any]) -> str:
+            if export_format == 'csv':
+                return writer.writerow([value.isoformat() if hasattr(value, 'isoformat') else value for value in row.values()])
+            return encoder.encode(row) + '\n'
+
+        if export_format == 'csv':
+            batch.append(writer.writerow([name for name, _lookup in self.export_fields]))
+        for row in rows:
+            batch.append(encode(row))
+            if len(batch) >= self.export_chunk_size:
+                yield ''.join(batch)
+                batch = []
+        if batch:
+            yield ''.join(batch)
+
+    @action(detail=False)
+    def export(self, request: Request) -> StreamingHttpResponse:
+        """
+        Потоковая выгрузка отфильтрованного списка в NDJSON или CSV.
+        """
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in self.export_formats:
+            raise ValidationError({'export_format': f"Допустимые значения: {', '.join(self.export_formats)}."})
+
+        chunks = self.encode_rows(self.export_rows(), export_format)
+        response = StreamingHttpResponse(
+            (chunk.encode() for chunk in chunks), content_type=self.export_formats[export_format]
+        )
+        filename = f"{self.basename}-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -1,3 +1,4 @@
+from decimal import Decimal
 from typing import Optional
 from django.db import models
 from django.contrib.auth.models import User
@@ -315,6 +316,9 @@ class Lesson(models.Model):
         ]
     )
     status = models.CharField("Статус", max_length=20, choices=STATUS_CHOICES)
+    # Напоминание ученику: время отправки и отметка об отправке (см. core.notifications)
+    reminder_due_at = models.DateTimeField("Время напоминания", null=True, blank=True, editable=False)
+    reminder_sent_at = models.DateTimeField("Напоминание отправлено", null=True, blank=True, editable=False)
 
     objects = models.Manager()
     completed = CompletedLessonManager()
@@ -323,6 +327,16 @@ class Lesson(models.Model):
         verbose_name = "Занятие"
         verbose_name_plural = "Занятия"
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['status', 'date'], name='lesson_status_date_idx'),
+            models.Index(fields=['date'], name='lesson_date_idx'),
+            # Только неотправленные напоминания: индекс не растёт вместе с историей занятий
+            models.Index(
+                fields=['reminder_due_at'],
+                name='lesson_reminder_due_idx',
+                condition=models.Q(reminder_sent_at__isnull=True, reminder_due_at__isnull=False),
+            ),
+        ]
 
     def __str__(self) -> str:
         """
@@ -331,6 +345,170 @@ class Lesson(models.Model):
         return f"{self.student.user.username} - {self.date}"
 
 
+class PriceStatistics(models.Model):
+    """
+    Агрегаты цен занятий (количество и сумма).
+    Обновляются инкрементально при сохранении и удалении занятий
+    и периодически сверяются с таблицей занятий задачей Celery.
+    """
+    SCOPE_GLOBAL = 'global'
+    SCOPE_TRAINER = 'trainer'
+    SCOPE_HORSE = 'horse'
+    SCOPE_CHOICES = [
+        (SCOPE_GLOBAL, 'Все занятия'),
+        (SCOPE_TRAINER, 'Тренер'),
+        (SCOPE_HORSE, 'Лошадь'),
+    ]
+
+    scope = models.CharField("Область", max_length=20, choices=SCOPE_CHOICES)
+    object_id = models.PositiveBigIntegerField("ID объекта", default=0)
+    lessons_count = models.BigIntegerField("Количество занятий", default=0)
+    total_price = models.DecimalField("Сумма цен", max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Статистика цен"
+        verbose_name_plural = "Статистика цен"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id'], name='unique_price_statistics_scope'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление статистики (область и средняя цена).
+        """
+        if self.scope == self.SCOPE_GLOBAL:
+            return f"{self.get_scope_display()}: {self.average_price:.2f}"
+        return f"{self.get_scope_display()} #{self.object_id}: {self.average_price:.2f}"
+
+    @property
+    def average_price(self) -> Decimal:
+        """
+        Возвращает среднюю цену занятия.
+        """
+        if self.lessons_count <= 0:
+            return Decimal('0')
+        return Decimal(self.total_price) / self.lessons_count
+
+
+class HorseStatistics(models.Model):
+    """
+    Статистика занятий лошади: количество за последние 7/30/365 дней,
+    средняя и суммарная цена, дата последнего занятия.
+    Пересчитывается для всех лошадей одним агрегирующим запросом
+    задачей Celery update_horse_statistics.
+    """
+    horse = models.OneToOneField(
+        Horse, verbose_name="Лошадь", on_delete=models.CASCADE, primary_key=True, related_name="statistics"
+    )
+    lessons_7d = models.PositiveIntegerField("Занятий за 7 дней", default=0)
+    lessons_30d = models.PositiveIntegerField("Занятий за 30 дней", default=0)
+    lessons_365d = models.PositiveIntegerField("Занятий за год", default=0)
+    lessons_total = models.PositiveIntegerField("Всего занятий", default=0)
+    average_price = models.DecimalField("Средняя цена", max_digits=10, decimal_places=2, default=0)
+    total_price = models.DecimalField("Сумма цен", max_digits=16, decimal_places=2, default=0)
+    last_lesson_date = models.DateTimeField("Последнее занятие", null=True, blank=True)
+    updated_at = models.DateTimeField("Обновлено")
+
+    class Meta:
+        verbose_name = "Статистика лошади"
+        verbose_name_plural = "Статистика лошадей"
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление статистики (лошадь и число занятий за 30 дней).
+        """
+        return f"{self.horse}: {self.lessons_30d} занятий за 30 дней"
+
+
+class DailyIncome(models.Model):
+    """
+    Дневной итог платежей по статусу (день — по местному времени).
+    За каждый построенный день хранятся строки всех статусов платежей,
+    включая нулевые, поэтому последний день в таблице — граница построения.
+    """
+    day = models.DateField("День")
+    status = models.CharField("Статус платежа", max_length=20)
+    payments_count = models.PositiveIntegerField("Количество платежей", default=0)
+    amount = models.DecimalField("Сумма", max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Дневной доход"
+        verbose_name_plural = "Дневные доходы"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_income'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление итога (день, статус и сумма).
+        """
+        return f"{self.day} {self.status}: {self.amount}"
+
+
+class DailyLessons(models.Model):
+    """
+    Дневной итог занятий по тренеру, лошади и статусу (день — по местному времени).
+    """
+    day = models.DateField("День")
+    trainer = models.ForeignKey(Trainer, verbose_name="Тренер", on_delete=models.CASCADE, related_name="+")
+    horse = models.ForeignKey(Horse, verbose_name="Лошадь", on_delete=models.CASCADE, related_name="+")
+    status = models.CharField("Статус занятия", max_length=20)
+    lessons_count = models.PositiveIntegerField("Количество занятий", default=0)
+    total_price = models.DecimalField("Сумма цен", max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Дневные занятия"
+        verbose_name_plural = "Дневные занятия"
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'trainer', 'horse', 'status'], name='unique_daily_lessons'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление итога (день, статус и количество занятий).
+        """
+        return f"{self.day} {self.status}: {self.lessons_count}"
+
+
+class SearchDocument(models.Model):
+    """
+    Поисковый документ новости, тренера или лошади.
+    Содержит тексты объекта и основы их слов; полнотекстовый индекс
+    (FTS5 или tsvector) создаётся миграцией в зависимости от СУБД.
+    """
+    KIND_NEWS = 'news'
+    KIND_TRAINER = 'trainer'
+    KIND_HORSE = 'horse'
+    KIND_CHOICES = [
+        (KIND_NEWS, 'Новость'),
+        (KIND_TRAINER, 'Тренер'),
+        (KIND_HORSE, 'Лошадь'),
+    ]
+    KINDS = (KIND_NEWS, KIND_TRAINER, KIND_HORSE)
+
+    kind = models.CharField("Вид", max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField("ID объекта")
+    title = models.CharField("Заголовок", max_length=300)
+    title_en = models.CharField("Заголовок (англ.)", max_length=300, blank=True)
+    body = models.TextField("Текст", blank=True)
+    title_terms = models.TextField("Основы слов заголовка", blank=True)
+    body_terms = models.TextField("Основы слов текста", blank=True)
+    is_public = models.BooleanField("Доступен в поиске", default=True)
+
+    class Meta:
+        verbose_name = "Поисковый документ"
+        verbose_name_plural = "Поисковые документы"
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document_object'),
+        ]
+
+    def __str__(self) -> str:
+        """
+        Возвращает строковое представление документа (вид и заголовок).
+        """
+        return f"{self.get_kind_display()}: {self.title}"
+
+
 class Payment(models.Model):
     """
     Модель платежа за занятие.
@@ -389,6 +567,10 @@ class Payment(models.Model):
         verbose_name = "Платёж"
         verbose_name_plural = "Платежи"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['status', 'timestamp'], name='payment_status_timestamp_idx'),
+            models.Index(fields=['timestamp'], name='payment_timestamp_idx'),
+        ]
 
     def __str__(self) -> str:
         """
@@ -452,6 +634,16 @@ class NewsPost(models.Model):
         verbose_name = "Новость"
         verbose_name_plural = "Новости"
         ordering = ['-created_at']
+        indexes = [
+            # Частичные индексы: SQLite не использует составной индекс для условия
+            # "WHERE is_active" (булево поле без сравнения), а частичный — использует
+            models.Index(
+                fields=['published_at'], condition=models.Q(is_active=True), name='newspost_active_published_idx'
+            ),
+            models.Index(
+                fields=['created_at'], condition=models.Q(is_active=False), name='newspost_inactive_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         """
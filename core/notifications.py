@@ -0,0 +1,203 @@
+"""
+Планирование и пакетная отправка напоминаний о занятиях.
+
+У каждого запланированного занятия есть одно время напоминания
+(``Lesson.reminder_due_at`` = начало минус ``REMINDER_LEAD``), которое
+пересчитывается при изменении даты или статуса занятия (сигнал pre_save).
+Отметка ``reminder_sent_at`` — журнал отправки: повторно напоминание не
+отправляется, пока занятие не перенесут. Задача ``send_lesson_reminders``
+выбирает по частичному индексу только наступившие неотправленные
+напоминания, поэтому её работа пропорциональна числу писем, а не частоте
+запуска.
+
+Перед отправкой напоминания «захватываются»: условный UPDATE проставляет
+``reminder_sent_at`` только строкам, где он ещё пуст, поэтому параллельные
+запуски задачи не отправят одно письмо дважды. Захват писем с ошибкой
+отправки снимается, и они уходят при следующем запуске.
+
+Занятия загружаются одним запросом (ученик, пользователь, тренер и лошадь
+через JOIN), письма формируются заранее и отправляются через одно
+SMTP-соединение на пакет из ``chunk_size`` писем. Ошибка одного письма
+не прерывает отправку: она учитывается в отчёте, соединение
+переоткрывается, и отправка продолжается со следующего письма.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import Lesson
+
+logger = logging.getLogger(__name__)
+
+# Писем на одно SMTP-соединение (многие серверы ограничивают число писем за сессию)
+REMINDER_CHUNK_SIZE = 100
+
+# За сколько до начала занятия отправляется напоминание
+REMINDER_LEAD = timedelta(hours=2)
+
+
+@dataclass
+class DeliveryReport:
+    """
+    Итог отправки: всего занятий, отправлено, пропущено (нет адреса)
+    и ID занятий, письма для которых отправить не удалось.
+    """
+    total: int = 0
+    sent: int = 0
+    skipped: int = 0
+    failed: list[int] = field(default_factory=list)
+
+
+def reminder_due_at(date: datetime, status: str) -> Optional[datetime]:
+    """
+    Возвращает время напоминания о занятии (None — напоминание не нужно).
+    """
+    return date - REMINDER_LEAD if status == 'scheduled' else None
+
+
+def due_reminders(now: Optional[datetime] = None) -> QuerySet:
+    """
+    Возвращает занятия, напоминание о которых пора отправить.
+    """
+    now = now or timezone.now()
+    return Lesson.objects.filter(
+        reminder_due_at__lte=now, reminder_sent_at__isnull=True, reminder_due_at__isnull=False
+    ).order_by('reminder_due_at')
+
+
+def send_due_reminders(now: Optional[datetime] = None, chunk_size: int = REMINDER_CHUNK_SIZE) -> DeliveryReport:
+    """
+    Отправляет наступившие напоминания, захватив их в журнале.
+
+    Напоминания о занятиях, которые уже начались или отменены в обход
+    сигналов, снимаются без отправки. Письма с ошибкой отправки остаются
+    в очереди до следующего запуска.
+    """
+    now = now or timezone.now()
+    expired = due_reminders(now).filter(date__lt=now).update(reminder_due_at=None)
+    if expired:
+        logger.info(f"Сняты просроченные напоминания: {expired}")
+    # Статус проверяется после загрузки: условие по статусу увело бы план с частичного индекса
+    lessons = list(reminder_lessons(due_reminders(now)))
+    claimed = claim_reminders([lesson.pk for lesson in lessons], now)
+    lessons = [lesson for lesson in lessons if lesson.pk in claimed]
+    report = send_reminders([lesson for lesson in lessons if lesson.status == 'scheduled'], chunk_size)
+    if report.failed:
+        # Занятие, перенесённое во время отправки, уже получило новое время и пустую отметку
+        Lesson.objects.filter(pk__in=report.failed, reminder_sent_at=now).update(reminder_sent_at=None)
+    return report
+
+
+def claim_reminders(pks: list[int], now: datetime) -> set[int]:
+    """
+    Отмечает напоминания отправленными, если их не захватил другой запуск.
+
+    Returns:
+        ID занятий, захваченных этим запуском (отметка равна ``now``).
+    """
+    if not pks:
+        return set()
+    claimed = Lesson.objects.filter(pk__in=pks, reminder_sent_at__isnull=True, reminder_due_at__lte=now).update(
+        reminder_sent_at=now
+    )
+    if claimed == len(pks):
+        return set(pks)
+    # Часть строк захватил параллельный запуск или перенесли: выясняем, какие наши
+    return set(Lesson.objects.filter(pk__in=pks, reminder_sent_at=now).values_list('pk', flat=True))
+
+
+def reminder_lessons(queryset: QuerySet) -> QuerySet:
+    """
+    Добавляет к QuerySet занятий всё, что нужно для текста напоминания (одним запросом).
+    """
+    return queryset.select_related('student__user', 'trainer', 'horse')
+
+
+def reminder_message(lesson: Lesson) -> EmailMessage:
+    """
+    Формирует письмо-напоминание о занятии.
+    """
+    user = lesson.student.user
+    subject = f'Напоминание о занятии - {lesson.date.strftime("%d.%m.%Y %H:%M")}'
+    body = f"""
+Здравствуйте, {user.username}!
+
+Напоминаем о предстоящем занятии:
+- Дата: {lesson.date.strftime("%d.%m.%Y")}
+- Время: {lesson.date.strftime("%H:%M")}
+- Тренер: {lesson.trainer.get_full_name()}
+- Лошадь: {lesson.horse.name}
+- Стоимость: {lesson.price} руб.
+
+Ждем вас в конюшне!
+
+С уважением,
+Команда конюшни
+    """.strip()
+    return EmailMessage(subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=[user.email])
+
+
+def send_reminders(lessons: Iterable[Lesson], chunk_size: int = REMINDER_CHUNK_SIZE) -> DeliveryReport:
+    """
+    Отправляет напоминания о занятиях пакетами через переиспользуемое соединение.
+
+    Args:
+        lessons: Занятия (с загруженными student.user, trainer и horse, см. reminder_lessons).
+        chunk_size: Писем на одно соединение.
+
+    Returns:
+        Отчёт об отправке.
+    """
+    report = DeliveryReport()
+    messages: list[tuple[Lesson, EmailMessage]] = []
+    for lesson in lessons:
+        report.total += 1
+        if not lesson.student.user.email:
+            report.skipped += 1
+            continue
+        messages.append((lesson, reminder_message(lesson)))
+
+    for start in range(0, len(messages), chunk_size):
+        _send_chunk(messages[start:start + chunk_size], report)
+    return report
+
+
+def _send_chunk(messages: list[tuple[Lesson, EmailMessage]], report: DeliveryReport) -> None:
+    """
+    Отправляет пакет писем через одно соединение с учётом ошибок по каждому письму.
+    """
+    connection = get_connection(fail_silently=False)
+    error: Optional[Exception] = _open(connection)
+    try:
+        for lesson, message in messages:
+            if error is not None:
+                # Соединение открыть не удалось: остаток пакета не отправляется
+                report.failed.append(lesson.pk)
+                continue
+            try:
+                report.sent += connection.send_messages([message])
+            except Exception as e:
+                logger.error(f"Ошибка отправки напоминания для занятия {lesson.pk}: {e}")
+                report.failed.append(lesson.pk)
+                # После ошибки сервер мог закрыть сессию: открываем новую
+                connection.close()
+                error = _open(connection)
+    finally:
+        connection.close()
+    if error is not None:
+        logger.error(f"Не удалось открыть соединение для отправки напоминаний: {error}")
+
+
+def _open(connection) -> Optional[Exception]:
+    try:
+        connection.open()
+    except Exception as e:
+        return e
+    return None
@@ -0,0 +1,291 @@
+"""
+Пагинация API.
+
+KeysetPagination поддерживает два режима:
+
+* курсорный (``?cursor=``) — постраничный обход по ключу сортировки
+  с добавочным ключом ``id``, не зависящий от глубины и без ``COUNT(*)``;
+* постраничный (``?page=N``) — как PageNumberPagination, но с опциональной
+  оценкой общего количества по статистике планировщика (``?count=estimated``).
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional, Union
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset: models.QuerySet) -> Optional[int]:
+    """
+    Оценивает количество строк QuerySet по статистике планировщика.
+
+    Поддерживается PostgreSQL (``EXPLAIN (FORMAT JSON)``). Для остальных
+    СУБД возвращает None.
+
+    Args:
+        queryset: Отфильтрованный QuerySet.
+
+    Returns:
+        Оценка количества строк или None, если оценка недоступна.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator, использующий оценку количества строк вместо COUNT(*).
+
+    Для небольших выборок (меньше ``exact_threshold``) количество считается
+    точно. Страницы не обрезаются по оценке, поэтому неточная оценка
+    не приводит к потере строк.
+    """
+    exact_threshold = 10000
+    is_estimated = False
+
+    @cached_property
+    def count(self) -> int:
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_threshold:
+            return super().count
+        self.is_estimated = True
+        return estimate
+
+    def validate_number(self, number: Any) -> int:
+        """
+        Проверяет номер страницы без сравнения с оценочным числом страниц.
+        """
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            return super().validate_number(number)
+        return number
+
+    def page(self, number: Any):
+        """
+        Возвращает страницу, не ограничивая срез оценочным количеством.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Пагинация по ключу сортировки с добавочным ключом ``id``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    tie_breaker = 'id'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset: models.QuerySet, request: Request, view: Any = None) -> Optional[list]:
+        """
+        Выбирает режим пагинации по параметрам запроса.
+        """
+        self.request = request
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        self.estimated = request.query_params.get(self.count_query_param) == 'estimated'
+        if not self.cursor_mode:
+            if self.estimated:
+                self.django_paginator_class = EstimatedCountPaginator
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_by_cursor(queryset, request, view)
+
+    def get_paginated_response(self, data: list) -> Response:
+        """
+        Формирует ответ для текущего режима пагинации.
+        """
+        if not self.cursor_mode:
+            response = super().get_paginated_response(data)
+            if self.estimated:
+                response.data['count_is_estimated'] = self.page.paginator.is_estimated
+            return response
+        payload = OrderedDict()
+        if self.estimated:
+            payload['count'] = self.total_count
+            payload['count_is_estimated'] = self.total_is_estimated
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    # Курсорный режим
+
+    def paginate_by_cursor(self, queryset: models.QuerySet, request: Request, view: Any) -> list:
+        """
+        Возвращает страницу, следующую за позицией курсора.
+        """
+        self.page_size_value = self.get_page_size(request)
+        field_name, descending = self.get_ordering(request, queryset, view)
+        model_field = queryset.model._meta.get_field(field_name)
+        self.field_name = field_name
+        self.model_field = model_field
+        self.tie_field = queryset.model._meta.get_field(self.tie_breaker)
+        self.nullable = model_field.null
+
+        position = self.decode_cursor(request)
+        reverse = bool(position and position.get('r'))
+        # Порядок обхода: в обратном направлении меняются и направление, и место NULL
+        ascending = descending == reverse
+        nulls_last = not reverse
+
+        if self.estimated:
+            estimate = estimate_count(queryset)
+            self.total_is_estimated = estimate is not None
+            self.total_count = estimate if estimate is not None else queryset.count()
+
+        queryset = queryset.order_by(*self.order_expressions(ascending, nulls_last))
+        if position:
+            queryset = queryset.filter(self.after_position(position, ascending, nulls_last))
+
+        results = list(queryset[:self.page_size_value + 1])
+        has_more = len(results) > self.page_size_value
+        results = results[:self.page_size_value]
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page_results = results
+        return results
+
+    def get_ordering(self, request: Request, queryset: models.QuerySet, view: Any) -> tuple[str, bool]:
+        """
+        Возвращает поле сортировки и её направление.
+
+        Учитывает ``?ordering=`` через OrderingFilter представления,
+        иначе использует ``ordering`` представления.
+        """
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = getattr(view, 'ordering', None) or queryset.model._meta.ordering or [self.tie_breaker]
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        first = ordering[0]
+        return first.lstrip('-'), first.startswith('-')
+
+    def order_expressions(self, ascending: bool, nulls_last: bool) -> list:
+        """
+        Возвращает выражения сортировки с добавочным ключом.
+        """
+        field = F(self.field_name)
+        tie = F(self.tie_breaker)
+        # Для NOT NULL полей порядок оставляем простым, чтобы СУБД могла использовать индекс
+        nulls = {}
+        if self.nullable:
+            nulls = {'nulls_last': True} if nulls_last else {'nulls_first': True}
+        if ascending:
+            return [field.asc(**nulls), tie.asc()]
+        return [field.desc(**nulls), tie.desc()]
+
+    def after_position(self, position: dict[str, Any], ascending: bool, nulls_last: bool) -> Q:
+        """
+        Строит условие "строго после позиции" для текущего порядка обхода.
+        """
+        compare = 'gt' if ascending else 'lt'
+        value, pk = position['v'], position['id']
+        after_pk = Q(**{f"{self.tie_breaker}__{compare}": pk})
+        is_null = Q(**{f"{self.field_name}__isnull": True})
+
+        if value is None:
+            if nulls_last:
+                return is_null & after_pk
+            return (is_null & after_pk) | ~is_null
+
+        condition = Q(**{f"{self.field_name}__{compare}": value}) | (Q(**{self.field_name: value}) & after_pk)
+        if self.nullable and nulls_last:
+            condition |= is_null
+        return condition
+
+    def encode_cursor(self, obj: Union[models.Model, dict[str, Any]], reverse: bool) -> str:
+        """
+        Кодирует позицию объекта (или строки values()) в строку курсора.
+        """
+        def read(name: str) -> Any:
+            return obj[name] if isinstance(obj, dict) else getattr(obj, name)
+
+        value = read(self.field_name)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = str(value)
+        position = {'v': value, 'id': read(self.tie_breaker)}
+        if reverse:
+            position['r'] = 1
+        raw = json.dumps(position, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def decode_cursor(self, request: Request) -> Optional[dict[str, Any]]:
+        """
+        Декодирует курсор из параметров запроса.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if not isinstance(position, dict) or 'v' not in position or 'id' not in position:
+                raise ValueError
+            # Курсор приходит от клиента: значения приводятся к типам полей, а не передаются в ORM как есть
+            if position['v'] is not None:
+                if isinstance(position['v'], (list, dict)):
+                    raise ValueError
+                position['v'] = self.model_field.to_python(position['v'])
+            position['id'] = self.tie_field.to_python(position['id'])
+            if position['id'] is None:
+                raise ValueError
+        except (TypeError, ValueError, ValidationError, binascii.Error, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def get_next_link(self) -> Optional[str]:
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page_results[-1], False))
+
+    def get_previous_link(self) -> Optional[str]:
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page_results[0], True))
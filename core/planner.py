@@ -0,0 +1,222 @@
+"""
+Планировщик запросов для DRF-сериализаторов.
+
+По объявленным в сериализаторе полям (их ``source``) и зависимостям
+SerializerMethodField строит план загрузки: какие связи подтянуть через
+``select_related``, какие через ``prefetch_related`` и какие колонки
+ограничить через ``only()``. Благодаря этому список выполняется за
+постоянное число запросов независимо от размера страницы.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from rest_framework import serializers
+
+
+@dataclass
+class QueryPlan:
+    """
+    План загрузки данных для сериализатора.
+    """
+    select_related: set[str] = field(default_factory=set)
+    prefetch_related: set[str] = field(default_factory=set)
+    only: set[str] = field(default_factory=set)
+    # only() применим, только если все зависимости известны планировщику
+    can_defer: bool = True
+
+    def apply(self, queryset: models.QuerySet, defer: bool = True) -> models.QuerySet:
+        """
+        Применяет план к QuerySet.
+
+        Args:
+            queryset: Исходный QuerySet.
+            defer: Ограничивать ли загружаемые колонки через only().
+
+        Returns:
+            QuerySet с подключёнными связями.
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(self.prefetch_related))
+        if defer and self.can_defer and self.only:
+            queryset = queryset.only(*sorted(self.only))
+        return queryset
+
+
+def _concrete_field_names(model: type[models.Model], prefix: str) -> list[str]:
+    """
+    Возвращает имена всех конкретных полей модели с префиксом пути.
+    """
+    return [f"{prefix}{f.name}" for f in model._meta.concrete_fields]
+
+
+class _Planner:
+    """
+    Обходит поля сериализатора и накапливает QueryPlan.
+    """
+
+    def __init__(self, annotations: Iterable[str]) -> None:
+        self.plan = QueryPlan()
+        self.annotations = set(annotations)
+
+    def visit_serializer(
+        self,
+        serializer: serializers.BaseSerializer,
+        model: type[models.Model],
+        path: str,
+        prefetched: bool,
+    ) -> None:
+        """
+        Добавляет в план зависимости всех полей сериализатора.
+        """
+        hints = getattr(getattr(serializer, 'Meta', None), 'method_field_sources', {})
+        for name, serializer_field in serializer.fields.items():
+            if serializer_field.write_only:
+                continue
+            if name in hints:
+                for source in hints[name]:
+                    self.visit_source(source.split('.'), model, path, prefetched, None)
+                continue
+            if isinstance(serializer_field, serializers.SerializerMethodField):
+                # Зависимости метода неизвестны: загружаем модель целиком
+                self.mark_opaque(model, path, prefetched)
+                continue
+            if serializer_field.source == '*':
+                if isinstance(serializer_field, serializers.BaseSerializer):
+                    self.visit_serializer(serializer_field, model, path, prefetched)
+                else:
+                    self.mark_opaque(model, path, prefetched)
+                continue
+            self.visit_source(serializer_field.source_attrs, model, path, prefetched, serializer_field)
+
+    def visit_source(
+        self,
+        attrs: list[str],
+        model: type[models.Model],
+        path: str,
+        prefetched: bool,
+        serializer_field: Optional[serializers.Field],
+    ) -> None:
+        """
+        Разбирает путь ``source`` поля относительно модели.
+        """
+        attr = attrs[0]
+        rest = attrs[1:]
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            if not path and attr in self.annotations:
+                return
+            # Метод или свойство модели: нужные колонки неизвестны
+            self.mark_opaque(model, path, prefetched)
+            return
+
+        if not model_field.is_relation:
+            if not prefetched:
+                self.plan.only.add(f"{path}{attr}")
+            return
+
+        if model_field.many_to_many or model_field.one_to_many:
+            self.plan.prefetch_related.add(f"{path}{attr}")
+            related_path = f"{path}{attr}__"
+            self.visit_related(rest, model_field.related_model, related_path, True, serializer_field)
+            return
+
+        # many_to_one или one_to_one
+        if not rest and model_field.concrete and self.is_pk_only(serializer_field):
+            if not prefetched:
+                self.plan.only.add(f"{path}{attr}")
+            return
+        if prefetched:
+            self.plan.prefetch_related.add(f"{path}{attr}")
+        else:
+            self.plan.select_related.add(f"{path}{attr}")
+            if model_field.concrete:
+                self.plan.only.add(f"{path}{attr}")
+        self.visit_related(rest, model_field.related_model, f"{path}{attr}__", prefetched, serializer_field)
+
+    def visit_related(
+        self,
+        rest: list[str],
+        model: type[models.Model],
+        path: str,
+        prefetched: bool,
+        serializer_field: Optional[serializers.Field],
+    ) -> None:
+        """
+        Продолжает обход после перехода по связи.
+        """
+        if rest:
+            self.visit_source(rest, model, path, prefetched, serializer_field)
+            return
+        if isinstance(serializer_field, serializers.ListSerializer):
+            serializer_field = serializer_field.child
+        if isinstance(serializer_field, serializers.BaseSerializer):
+            self.visit_serializer(serializer_field, model, path, prefetched)
+        elif not prefetched and not self.is_pk_only(serializer_field):
+            # Связанный объект используется целиком (например, через __str__)
+            self.plan.only.update(_concrete_field_names(model, path))
+
+    def mark_opaque(self, model: type[models.Model], path: str, prefetched: bool) -> None:
+        """
+        Отмечает, что объект пути нужен со всеми колонками.
+        """
+        if prefetched:
+            return
+        if not path:
+            self.plan.can_defer = False
+            return
+        self.plan.only.update(_concrete_field_names(model, path))
+
+    @staticmethod
+    def is_pk_only(serializer_field: Optional[serializers.Field]) -> bool:
+        """
+        Проверяет, достаточно ли полю первичного ключа связанного объекта.
+        """
+        if isinstance(serializer_field, serializers.ManyRelatedField):
+            serializer_field = serializer_field.child_relation
+        return (
+            isinstance(serializer_field, serializers.RelatedField)
+            and serializer_field.use_pk_only_optimization()
+        )
+
+
+@lru_cache(maxsize=1024)
+def _cached_plan(
+    serializer_class: type[serializers.BaseSerializer],
+    field_names: tuple[str, ...],
+    annotations: tuple[str, ...],
+) -> QueryPlan:
+    serializer = serializer_class()
+    for name in list(serializer.fields):
+        if name not in field_names:
+            serializer.fields.pop(name)
+    planner = _Planner(annotations)
+    planner.visit_serializer(serializer, serializer.Meta.model, '', False)
+    return planner.plan
+
+
+def build_query_plan(
+    serializer: serializers.ModelSerializer,
+    annotations: Iterable[str] = (),
+) -> QueryPlan:
+    """
+    Строит (и кэширует) план загрузки для экземпляра сериализатора.
+
+    Args:
+        serializer: Сериализатор с уже определённым набором полей.
+        annotations: Имена аннотаций QuerySet, которые не требуют загрузки.
+
+    Returns:
+        QueryPlan для модели сериализатора.
+    """
+    return _cached_plan(
+        type(serializer),
+        tuple(serializer.fields.keys()),
+        tuple(sorted(annotations)),
+    )
@@ -0,0 +1,73 @@
+"""
+Быстрые рендереры REST API.
+
+ORJSONRenderer кодирует JSON через orjson, MessagePackRenderer — в формат
+MessagePack (выбирается заголовком ``Accept: application/msgpack``).
+Decimal, даты и прочие типы, которые не поддерживаются кодировщиком
+напрямую, приводятся так же, как в стандартном JSONRenderer DRF, поэтому
+ответы совпадают с ответами стандартного рендерера. Зависимости
+необязательные: без orjson используется стандартный JSONRenderer.
+"""
+
+from decimal import Decimal
+from typing import Any, Optional
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack необязателен
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj: Any) -> Any:
+    """
+    Приводит значение, не поддерживаемое кодировщиком, к простому типу.
+
+    Decimal становится строкой (COERCE_DECIMAL_TO_STRING) или числом,
+    остальные типы обрабатываются кодировщиком DRF.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj) if api_settings.COERCE_DECIMAL_TO_STRING else float(obj)
+    return _encoder.default(obj)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+    """
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[dict] = None) -> bytes:
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        # Даты передаются в encode_default, чтобы формат совпадал с DRF
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=encode_default, option=option)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Рендерер MessagePack.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data: Any, accepted_media_type: Optional[str] = None, renderer_context: Optional[dict] = None) -> bytes:
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True, datetime=False)
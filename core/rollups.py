@@ -0,0 +1,230 @@
+"""
+Дневные итоги (rollup) платежей и занятий для отчётов.
+
+DailyIncome хранит количество и сумму платежей по дню и статусу,
+DailyLessons — количество занятий и сумму цен по дню, тренеру, лошади
+и статусу. Ночная задача ``build_daily_rollups`` достраивает дни после
+последнего построенного и заново пересчитывает последние
+``ROLLUP_CORRECTION_DAYS`` дней (платежи и изменения занятий, записанные
+задним числом). День пересчитывается целиком: строки дня удаляются
+и вставляются заново в одной транзакции.
+
+Отчёты суммируют итоги за построенные дни и читают исходные строки только
+за дни после границы построения (обычно — текущий день), поэтому их
+стоимость зависит от числа дней в окне, а не от числа платежей и занятий.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Optional, Sequence
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyIncome, DailyLessons, Lesson, Payment
+
+# Сколько последних дней пересчитывается каждую ночь (поздние данные)
+ROLLUP_CORRECTION_DAYS = 3
+# Дней в одной транзакции при построении за длинный период
+ROLLUP_CHUNK_DAYS = 31
+
+PAYMENT_STATUSES = [status for status, _label in Payment.STATUS_CHOICES]
+
+
+def day_start(day: date) -> datetime:
+    """
+    Возвращает начало дня по местному времени.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def built_through() -> Optional[date]:
+    """
+    Возвращает последний построенный день (None — итоги не строились).
+    """
+    return DailyIncome.objects.aggregate(day=Max('day'))['day']
+
+
+def first_activity_day() -> Optional[date]:
+    """
+    Возвращает день первого платежа или занятия.
+    """
+    first = [
+        Payment.objects.aggregate(first=Min('timestamp'))['first'],
+        Lesson.objects.aggregate(first=Min('date'))['first'],
+    ]
+    first = [value for value in first if value is not None]
+    return timezone.localdate(min(first)) if first else None
+
+
+def rebuild_days(start: date, end: date) -> int:
+    """
+    Пересчитывает итоги за дни с ``start`` по ``end`` включительно.
+
+    Returns:
+        Количество записанных строк итогов.
+    """
+    lower, upper = day_start(start), day_start(end + timedelta(days=1))
+    income = {
+        (start + timedelta(days=offset), status): DailyIncome(day=start + timedelta(days=offset), status=status)
+        for offset in range((end - start).days + 1)
+        for status in PAYMENT_STATUSES
+    }
+    payments = (
+        Payment.objects.filter(timestamp__gte=lower, timestamp__lt=upper).order_by()
+        .values('status', day=TruncDate('timestamp')).annotate(count=Count('id'), amount=Sum('amount'))
+        .values_list('day', 'status', 'count', 'amount')
+    )
+    for day, status, count, amount in payments:
+        row = income.setdefault((day, status), DailyIncome(day=day, status=status))
+        row.payments_count, row.amount = count, amount
+    lessons = [
+        DailyLessons(
+            day=day, trainer_id=trainer_id, horse_id=horse_id, status=status, lessons_count=count, total_price=total
+        )
+        for day, trainer_id, horse_id, status, count, total in (
+            Lesson.objects.filter(date__gte=lower, date__lt=upper).order_by()
+            .values('trainer_id', 'horse_id', 'status', day=TruncDate('date'))
+            .annotate(count=Count('id'), total=Sum('price'))
+            .values_list('day', 'trainer_id', 'horse_id', 'status', 'count', 'total')
+        )
+    ]
+    with transaction.atomic():
+        DailyIncome.objects.filter(day__range=(start, end)).delete()
+        DailyLessons.objects.filter(day__range=(start, end)).delete()
+        DailyIncome.objects.bulk_create(income.values(), batch_size=1000)
+        DailyLessons.objects.bulk_create(lessons, batch_size=1000)
+    return len(income) + len(lessons)
+
+
+def backfill(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    progress: Optional[Callable[[date, date], None]] = None,
+) -> int:
+    """
+    Пересчитывает итоги за период пакетами по ROLLUP_CHUNK_DAYS дней.
+
+    Args:
+        start: Первый день (по умолчанию — день первого платежа или занятия).
+        end: Последний день (по умолчанию — вчера).
+        progress: Вызывается после каждого пакета с его первым и последним днём.
+
+    Returns:
+        Количество записанных строк итогов.
+    """
+    end = end or timezone.localdate() - timedelta(days=1)
+    start = start or first_activity_day() or end
+    written = 0
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=ROLLUP_CHUNK_DAYS - 1))
+        written += rebuild_days(start, chunk_end)
+        if progress:
+            progress(start, chunk_end)
+        start = chunk_end + timedelta(days=1)
+    return written
+
+
+def refresh_rollups(today: Optional[date] = None, correction_days: int = ROLLUP_CORRECTION_DAYS) -> int:
+    """
+    Достраивает итоги по вчерашний день и пересчитывает последние ``correction_days`` дней.
+    Если итоги ещё не строились, строит их с первого дня данных.
+
+    Returns:
+        Количество записанных строк итогов.
+    """
+    today = today or timezone.localdate()
+    end = today - timedelta(days=1)
+    built = built_through()
+    if built is None:
+        return backfill(end=end)
+    return backfill(min(built + timedelta(days=1), today - timedelta(days=correction_days)), end)
+
+
+@dataclass
+class ReportWindow:
+    """
+    Окно отчёта: дни с ``start`` по ``end`` включительно.
+
+    Построенные дни читаются из итогов, остальные — из исходных таблиц.
+    """
+    start: date
+    end: date
+    built: Optional[date] = None
+
+    @classmethod
+    def last_days(cls, days: int, today: Optional[date] = None) -> 'ReportWindow':
+        """
+        Окно из ``days`` календарных дней, включая текущий.
+
+        Например, недельное окно (``days=7``) — сегодня и шесть предыдущих
+        дней, как у рейтингов за 7 дней (leaderboards.window_days).
+        """
+        today = today or timezone.localdate()
+        return cls(today - timedelta(days=days - 1), today, built_through())
+
+    @property
+    def rolled(self) -> Optional[tuple[date, date]]:
+        if self.built is None or self.built < self.start:
+            return None
+        return self.start, min(self.end, self.built)
+
+    @property
+    def live(self) -> Optional[tuple[datetime, datetime]]:
+        first = self.start if self.rolled is None else self.rolled[1] + timedelta(days=1)
+        if first > self.end:
+            return None
+        return day_start(first), day_start(self.end + timedelta(days=1))
+
+    def income(self, status: str = 'completed') -> Decimal:
+        """
+        Сумма платежей со статусом ``status``.
+        """
+        total = Decimal('0')
+        if self.rolled:
+            total += DailyIncome.objects.filter(day__range=self.rolled, status=status).aggregate(
+                total=Sum('amount')
+            )['total'] or 0
+        if self.live:
+            lower, upper = self.live
+            total += Payment.objects.filter(timestamp__gte=lower, timestamp__lt=upper, status=status).aggregate(
+                total=Sum('amount')
+            )['total'] or 0
+        return total
+
+    def lessons(self, group_by: Sequence[str] = ()) -> dict[tuple[Any, ...], tuple[int, Decimal]]:
+        """
+        Количество занятий и сумма цен по группам.
+
+        Args:
+            group_by: Поля группировки (``trainer_id``, ``horse_id``, ``status``);
+                пустой список — итог по всем занятиям (ключ ``()``).
+
+        Returns:
+            Словарь {значения полей группировки: (количество, сумма цен)}.
+        """
+        sources = []
+        if self.rolled:
+            sources.append((
+                DailyLessons.objects.filter(day__range=self.rolled), Sum('lessons_count'), Sum('total_price')
+            ))
+        if self.live:
+            lower, upper = self.live
+            sources.append((Lesson.objects.filter(date__gte=lower, date__lt=upper), Count('id'), Sum('price')))
+        totals: dict[tuple[Any, ...], tuple[int, Decimal]] = {}
+        for queryset, count, total in sources:
+            queryset = queryset.order_by()
+            if group_by:
+                rows = queryset.values(*group_by).annotate(count=count, total=total).values_list(
+                    *group_by, 'count', 'total'
+                )
+            else:
+                result = queryset.aggregate(count=count, total=total)
+                rows = [(result['count'], result['total'])] if result['count'] else []
+            for *key, row_count, row_total in rows:
+                previous_count, previous_total = totals.get(tuple(key), (0, Decimal('0')))
+                totals[tuple(key)] = (previous_count + row_count, previous_total + (row_total or 0))
+        return totals
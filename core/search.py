@@ -0,0 +1,455 @@
+"""
+Полнотекстовый поиск по новостям, тренерам и лошадям.
+
+Для каждого объекта поддерживается поисковый документ (SearchDocument)
+с заголовком, английским заголовком, текстом и их основами слов.
+Индекс зависит от СУБД:
+
+* SQLite — виртуальная таблица FTS5 по основам слов (стемминг выполняется
+  в Python), ранжирование bm25;
+* PostgreSQL — генерируемый столбец tsvector (конфигурации russian
+  и english) с GIN-индексом, ранжирование ts_rank_cd;
+* прочие СУБД — поиск LIKE по основам слов без ранжирования.
+
+Документы обновляются сигналами моделей, команда ``rebuild_search_index``
+пересобирает их целиком.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+from django.db import connection, connections, models, transaction
+from django.db.models.expressions import RawSQL
+
+from .caching import bump_versions
+from .models import Horse, NewsPost, SearchDocument, Trainer
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+# Вес заголовка относительно текста при ранжировании
+TITLE_WEIGHT = 10.0
+
+_TOKEN_RE = re.compile(r'[0-9a-zа-яё]+')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+_RU_VOWELS = 'аеиоуыэюя'
+_RU_PERFECTIVE_GERUND = (('вшись', 'вши', 'в'), ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'))
+_RU_REFLEXIVE = ('ся', 'сь')
+_RU_ADJECTIVE = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+    'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею',
+)
+_RU_PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+_RU_VERB = (
+    ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н'),
+    (
+        'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+        'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю',
+    ),
+)
+_RU_NOUN = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+    'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у',
+    'ы', 'ь', 'ю', 'я',
+)
+_RU_SUPERLATIVE = ('ейше', 'ейш')
+_RU_DERIVATIONAL = ('ость', 'ост')
+
+
+def _ending_groups(groups: tuple[tuple[str, ...], tuple[str, ...]]) -> list[tuple[str, bool]]:
+    """
+    Объединяет окончания двух групп, отмечая требующие предшествующей «а»/«я».
+    """
+    endings = [(ending, True) for ending in groups[0]] + [(ending, False) for ending in groups[1]]
+    return sorted(endings, key=lambda item: -len(item[0]))
+
+
+_RU_PERFECTIVE_GERUND_ENDINGS = _ending_groups(_RU_PERFECTIVE_GERUND)
+_RU_PARTICIPLE_ENDINGS = _ending_groups(_RU_PARTICIPLE)
+_RU_VERB_ENDINGS = _ending_groups(_RU_VERB)
+
+
+def _strip_ending(word: str, endings: Iterable[Any]) -> Optional[str]:
+    """
+    Отсекает самое длинное подходящее окончание или возвращает None.
+
+    Элемент ``endings`` — строка или пара (окончание, нужна ли перед ним «а»/«я»).
+    """
+    for item in endings:
+        ending, needs_a = item if isinstance(item, tuple) else (item, False)
+        if word.endswith(ending):
+            stem = word[:-len(ending)]
+            if not needs_a or stem.endswith(('а', 'я')):
+                return stem
+    return None
+
+
+def _region_start(word: str, start: int = 0) -> int:
+    """
+    Возвращает начало области R1 (после первой согласной, следующей за гласной).
+    """
+    for index in range(start + 1, len(word)):
+        if word[index] not in _RU_VOWELS and word[index - 1] in _RU_VOWELS:
+            return index + 1
+    return len(word)
+
+
+def stem_russian(word: str) -> str:
+    """
+    Возвращает основу русского слова (алгоритм Портера для русского языка).
+    """
+    rv_start = next((index + 1 for index, char in enumerate(word) if char in _RU_VOWELS), len(word))
+    r2_start = _region_start(word, _region_start(word))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    stem = _strip_ending(rv, _RU_PERFECTIVE_GERUND_ENDINGS)
+    if stem is None:
+        rv = _strip_ending(rv, _RU_REFLEXIVE) or rv
+        stem = _strip_ending(rv, _RU_ADJECTIVE)
+        if stem is not None:
+            stem = _strip_ending(stem, _RU_PARTICIPLE_ENDINGS) or stem
+        else:
+            stem = _strip_ending(rv, _RU_VERB_ENDINGS)
+            if stem is None:
+                stem = _strip_ending(rv, _RU_NOUN)
+    rv = rv if stem is None else stem
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    derivational = _strip_ending(rv, _RU_DERIVATIONAL)
+    if derivational is not None and rv_start + len(derivational) >= r2_start:
+        rv = derivational
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        superlative = _strip_ending(rv, _RU_SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith('нн') else superlative
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_english(word: str) -> str:
+    """
+    Возвращает основу английского слова (облегчённое отсечение окончаний).
+    """
+    if len(word) <= 3:
+        return word
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    for ending in ('ing', 'ed'):
+        if word.endswith(ending) and len(word) - len(ending) >= 3:
+            return word[:-len(ending)]
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """
+    Возвращает основу слова в зависимости от алфавита.
+    """
+    if token.isdigit():
+        return token
+    if token[0] >= 'а':
+        return stem_russian(token)
+    return stem_english(token)
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """
+    Разбивает текст (в том числе HTML) на слова в нижнем регистре.
+    """
+    if not text:
+        return []
+    text = _TAG_RE.sub(' ', text).lower().replace('ё', 'е')
+    return _TOKEN_RE.findall(text)
+
+
+def terms(*texts: Optional[str]) -> str:
+    """
+    Возвращает основы слов текстов через пробел (с пробелами по краям).
+    """
+    stems = [stem(token) for text in texts for token in tokenize(text)]
+    return f" {' '.join(stems)} " if stems else ''
+
+
+def query_terms(query: str) -> list[str]:
+    """
+    Возвращает уникальные основы слов поискового запроса.
+    """
+    return stem_tokens(query_tokens(query))
+
+
+def query_tokens(query: str) -> list[str]:
+    """
+    Возвращает уникальные слова поискового запроса без стемминга.
+    """
+    return list(dict.fromkeys(tokenize(query)))
+
+
+def stem_tokens(tokens: Iterable[str]) -> list[str]:
+    """
+    Возвращает уникальные основы слов.
+    """
+    return list(dict.fromkeys(stem(token) for token in tokens))
+
+
+def document_fields(kind: str, obj: Any) -> dict[str, Any]:
+    """
+    Возвращает поля поискового документа для объекта.
+    """
+    if kind == SearchDocument.KIND_NEWS:
+        title, title_en, body, is_public = obj.title, obj.title_en, _TAG_RE.sub(' ', obj.content or ''), obj.is_active
+    elif kind == SearchDocument.KIND_TRAINER:
+        title = f"{obj.first_name} {obj.last_name}"
+        title_en = f"{obj.first_name_en} {obj.last_name_en}".strip()
+        body, is_public = obj.bio, True
+    else:
+        title, title_en, body, is_public = obj.name, obj.name_en, obj.description or '', True
+    return {
+        'title': title,
+        'title_en': title_en or '',
+        'body': body,
+        'title_terms': terms(title, title_en),
+        'body_terms': terms(body),
+        'is_public': is_public,
+    }
+
+
+# Индексируемые модели и виды их документов
+INDEXED_MODELS: dict[type[models.Model], str] = {
+    NewsPost: SearchDocument.KIND_NEWS,
+    Trainer: SearchDocument.KIND_TRAINER,
+    Horse: SearchDocument.KIND_HORSE,
+}
+
+
+def index_object(obj: models.Model) -> None:
+    """
+    Создаёт или обновляет поисковый документ объекта.
+    """
+    kind = INDEXED_MODELS[type(obj)]
+    SearchDocument.objects.update_or_create(kind=kind, object_id=obj.pk, defaults=document_fields(kind, obj))
+
+
+def remove_object(obj: models.Model) -> None:
+    """
+    Удаляет поисковый документ объекта.
+    """
+    SearchDocument.objects.filter(kind=INDEXED_MODELS[type(obj)], object_id=obj.pk).delete()
+
+
+def rebuild_index(batch_size: int = 500) -> int:
+    """
+    Пересобирает все поисковые документы.
+
+    Returns:
+        Количество проиндексированных объектов.
+    """
+    total = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for model, kind in INDEXED_MODELS.items():
+            documents = [
+                SearchDocument(kind=kind, object_id=obj.pk, **document_fields(kind, obj))
+                for obj in model.objects.order_by('pk').iterator(chunk_size=batch_size)
+            ]
+            SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+            total += len(documents)
+    # Результаты поиска входят в закэшированные ответы списков
+    bump_versions(*INDEXED_MODELS)
+    return total
+
+
+@dataclass
+class SearchHit:
+    """
+    Результат поиска.
+    """
+    kind: str
+    object_id: int
+    title: str
+    title_en: str
+    snippet: str
+    rank: float
+
+
+class LikeBackend:
+    """
+    Поиск подстрок по основам слов (без индекса и ранжирования).
+    """
+
+    # Слова запроса (query_tokens) в том виде, в каком их ждут ranked и object_ids
+    words = staticmethod(stem_tokens)
+
+    def documents(self, stems: list[str], kinds: Iterable[str], body_only: bool = False) -> models.QuerySet:
+        documents = SearchDocument.objects.filter(kind__in=list(kinds))
+        for word in stems:
+            condition = models.Q(body_terms__contains=f" {word}")
+            if not body_only:
+                condition |= models.Q(title_terms__contains=f" {word}")
+            documents = documents.filter(condition)
+        return documents
+
+    def ranked(self, stems: list[str], kinds: Iterable[str], limit: int) -> list[tuple[int, float]]:
+        rows = self.documents(stems, kinds).filter(is_public=True).values_list('id', 'title_terms')
+        ranked = [(pk, float(sum(f" {word}" in title for word in stems))) for pk, title in rows]
+        return sorted(ranked, key=lambda item: -item[1])[:limit]
+
+    def object_ids(self, stems: list[str], kind: str, body_only: bool = False) -> Any:
+        return self.documents(stems, [kind], body_only).values('object_id')
+
+
+class SQLiteBackend:
+    """
+    Поиск через FTS5: основы слов с префиксным совпадением, ранжирование bm25.
+    """
+
+    words = staticmethod(stem_tokens)
+
+    @staticmethod
+    def match(stems: list[str], body_only: bool = False) -> str:
+        expression = ' '.join(f'"{word}"*' for word in stems)
+        return f"body_terms : ({expression})" if body_only else expression
+
+    def ranked(self, stems: list[str], kinds: Iterable[str], limit: int) -> list[tuple[int, float]]:
+        kinds = list(kinds)
+        sql = (
+            f"SELECT d.id, -bm25({FTS_TABLE}, %s, 1.0) AS rank FROM {FTS_TABLE} "
+            f"JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.is_public AND d.kind IN ({', '.join(['%s'] * len(kinds))}) "
+            "ORDER BY rank DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [TITLE_WEIGHT, self.match(stems), *kinds, limit])
+            return cursor.fetchall()
+
+    def object_ids(self, stems: list[str], kind: str, body_only: bool = False) -> Any:
+        return RawSQL(
+            f"SELECT d.object_id FROM {FTS_TABLE} JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND d.kind = %s",
+            [self.match(stems, body_only), kind],
+        )
+
+
+class PostgreSQLBackend:
+    """
+    Поиск через tsvector и GIN-индекс (словари russian и english).
+
+    Слова запроса передаются без стемминга: их приводит к основам сама
+    to_tsquery теми же словарями, что и документ. Основа, полученная
+    стеммером Python, была бы застеммлена повторно и могла не совпасть.
+    """
+
+    TSQUERY = "(to_tsquery('russian', %s) || to_tsquery('english', %s))"
+
+    @staticmethod
+    def words(tokens: list[str]) -> list[str]:
+        return tokens
+
+    @staticmethod
+    def tsquery(tokens: list[str], body_only: bool = False) -> str:
+        # Текст документа имеет вес B, заголовки — A
+        weight = 'B' if body_only else ''
+        return ' & '.join(f"{word}:*{weight}" for word in tokens)
+
+    def ranked(self, stems: list[str], kinds: Iterable[str], limit: int) -> list[tuple[int, float]]:
+        kinds = list(kinds)
+        query = self.tsquery(stems)
+        sql = (
+            f"SELECT id, ts_rank_cd(search_vector, {self.TSQUERY}) AS rank FROM core_searchdocument "
+            f"WHERE search_vector @@ {self.TSQUERY} AND is_public AND kind = ANY(%s) "
+            "ORDER BY rank DESC LIMIT %s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [query, query, query, query, kinds, limit])
+            return cursor.fetchall()
+
+    def object_ids(self, stems: list[str], kind: str, body_only: bool = False) -> Any:
+        query = self.tsquery(stems, body_only)
+        return RawSQL(
+            f"SELECT object_id FROM core_searchdocument WHERE search_vector @@ {self.TSQUERY} AND kind = %s",
+            [query, query, kind],
+        )
+
+
+@lru_cache(maxsize=None)
+def _fts_available(alias: str) -> bool:
+    """
+    Проверяет, создана ли таблица FTS5 (SQLite может быть собран без неё).
+
+    Результат запоминается для каждого подключения до следующей миграции.
+    """
+    return FTS_TABLE in connections[alias].introspection.table_names()
+
+
+def clear_backend_cache() -> None:
+    """
+    Сбрасывает запомненную доступность FTS5 (после миграций).
+    """
+    _fts_available.cache_clear()
+
+
+def get_backend() -> Any:
+    """
+    Возвращает поисковый бэкенд для текущей СУБД.
+    """
+    if connection.vendor == 'postgresql':
+        return PostgreSQLBackend()
+    if connection.vendor == 'sqlite' and _fts_available(connection.alias):
+        return SQLiteBackend()
+    return LikeBackend()
+
+
+def search(query: str, kinds: Optional[Iterable[str]] = None, limit: int = 20) -> list[SearchHit]:
+    """
+    Ищет документы по запросу и возвращает их в порядке релевантности.
+
+    Args:
+        query: Поисковый запрос.
+        kinds: Виды документов (по умолчанию все).
+        limit: Максимальное количество результатов.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return []
+    backend = get_backend()
+    ranked = backend.ranked(backend.words(tokens), kinds or SearchDocument.KINDS, limit)
+    documents = SearchDocument.objects.in_bulk([pk for pk, _ in ranked])
+    return [
+        SearchHit(
+            kind=documents[pk].kind,
+            object_id=documents[pk].object_id,
+            title=documents[pk].title,
+            title_en=documents[pk].title_en,
+            snippet=documents[pk].body[:200],
+            rank=round(rank, 6),
+        )
+        for pk, rank in ranked
+        if pk in documents
+    ]
+
+
+def filter_queryset(queryset: models.QuerySet, query: str, body_only: bool = False) -> models.QuerySet:
+    """
+    Оставляет в QuerySet объекты, документы которых соответствуют запросу.
+
+    При ``body_only`` поиск ведётся только по тексту документа
+    (контент новости, биография тренера, описание лошади).
+
+    Фильтрация выполняется одним подзапросом к поисковому индексу;
+    видимость объектов определяет сам QuerySet.
+    """
+    tokens = query_tokens(query)
+    if not tokens:
+        return queryset
+    backend = get_backend()
+    kind = INDEXED_MODELS[queryset.model]
+    return queryset.filter(pk__in=backend.object_ids(backend.words(tokens), kind, body_only))
@@ -1,8 +1,137 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models
+from django.db.models import BooleanField, CharField, ExpressionWrapper, Q, Value
+from django.db.models.functions import Concat
 from rest_framework import serializers
-from .models import NewsPost, Trainer, Horse, UserProfile, User, Lesson, Payment
-from typing import Optional
+from rest_framework.permissions import SAFE_METHODS
+from .models import NewsPost, Trainer, Horse, HorseStatistics, UserProfile, User, Lesson, Payment
+from typing import Any, Iterable, Optional
 
-class NewsPostSerializer(serializers.ModelSerializer):
+
+class DynamicFieldsMixin:
+    """
+    Миксин сериализатора с выбором полей через параметры запроса
+    ``fields`` и ``omit`` (имена через запятую).
+
+    Поля отбрасываются при создании сериализатора, поэтому планировщик
+    запросов не загружает их столбцы и не делает для них JOIN/prefetch.
+    Для запросов на изменение набор полей не меняется.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected:
+                    self.fields.pop(name)
+
+    @staticmethod
+    def _parse(value: Optional[str]) -> list[str]:
+        return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+    @classmethod
+    def selected_fields(cls, request: Any) -> Optional[set[str]]:
+        """
+        Возвращает имена полей, запрошенных клиентом, или None, если нужны все.
+
+        Raises:
+            serializers.ValidationError: Если запрошено неизвестное поле.
+        """
+        if request is None or request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields, omit = cls._parse(params.get('fields')), cls._parse(params.get('omit'))
+        if not fields and not omit:
+            return None
+        available = list(cls.Meta.fields)
+        unknown = [name for name in fields + omit if name not in available]
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Неизвестные поля: {', '.join(unknown)}."})
+        return {name for name in available if (not fields or name in fields) and name not in omit}
+
+    @classmethod
+    def wants_field(cls, request: Any, name: str) -> bool:
+        """
+        Проверяет, попадёт ли поле в ответ на запрос.
+        """
+        selected = cls.selected_fields(request)
+        return selected is None or name in selected
+
+
+class ValuesSerializerMixin:
+    """
+    Миксин сериализатора с быстрым режимом чтения списков через ``values()``.
+
+    Строка ответа собирается из столбцов ``values()`` без создания моделей
+    и вызова методов полей. Пути и выражения для вычисляемых полей задаются
+    в ``Meta.values_fields`` или методом ``values_<поле>()``, если выражение
+    зависит от контекста; остальные поля читаются по ``source``. Значения
+    полей модели проходят через ``to_representation`` тех же полей, поэтому
+    ответ совпадает с ответом полного сериализатора.
+    """
+
+    def values_columns(self) -> dict[str, Any]:
+        """
+        Возвращает путь или выражение для каждого читаемого поля.
+
+        Raises:
+            ImproperlyConfigured: Если для вычисляемого поля не задан столбец.
+        """
+        declared = getattr(self.Meta, 'values_fields', {})
+        columns = {}
+        for field in self._readable_fields:
+            name = field.field_name
+            method = getattr(self, f'values_{name}', None)
+            if method is not None:
+                columns[name] = method()
+            elif name in declared:
+                columns[name] = declared[name]
+            elif field.source == '*':
+                raise ImproperlyConfigured(f"{type(self).__name__}: не задан столбец values() для поля '{name}'.")
+            else:
+                columns[name] = field.source.replace('.', '__')
+        return columns
+
+    def values_queryset(self, queryset: models.QuerySet, extra: Iterable[str] = ()) -> models.QuerySet:
+        """
+        Возвращает QuerySet словарей со столбцами полей сериализатора.
+
+        Args:
+            queryset: Отфильтрованный и отсортированный QuerySet модели.
+            extra: Дополнительные пути (например, ключи сортировки для пагинации).
+        """
+        lookups = dict.fromkeys(extra)
+        expressions = {}
+        columns = self.values_columns()
+        self._values_plan = []
+        for field in self._readable_fields:
+            column = columns[field.field_name]
+            if isinstance(column, str):
+                key = column
+                lookups[column] = None
+            else:
+                key = f"values_{field.field_name}"
+                expressions[key] = column
+            # Связи уже приходят первичным ключом, вычисляемые значения — готовыми
+            plain = isinstance(column, str) and not isinstance(
+                field, (serializers.RelatedField, serializers.SerializerMethodField)
+            )
+            self._values_plan.append((field.field_name, key, field.to_representation if plain else None))
+        return queryset.prefetch_related(None).values(*lookups, **expressions)
+
+    def row_to_representation(self, row: dict[str, Any]) -> dict[str, Any]:
+        """
+        Преобразует строку ``values_queryset()`` в представление объекта.
+        """
+        data = {}
+        for name, key, convert in self._values_plan:
+            value = row[key]
+            data[name] = convert(value) if convert is not None and value is not None else value
+        return data
+
+
+class NewsPostSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для новости.
     """
@@ -32,12 +161,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = ['user']
 
-class TrainerSerializer(serializers.ModelSerializer):
+class TrainerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для тренера.
     Демонстрирует использование SerializerMethodField и контекста.
     """
-    lessons_count = serializers.IntegerField(read_only=True)
+    lessons_count = serializers.SerializerMethodField()
     is_top_trainer = serializers.SerializerMethodField()
     full_name = serializers.CharField(source='get_full_name', read_only=True)
     full_name_en = serializers.SerializerMethodField()
@@ -49,6 +178,19 @@ class TrainerSerializer(serializers.ModelSerializer):
             'last_name', 'last_name_en', 'bio', 'photo', 
             'experience_years', 'lessons_count', 'is_top_trainer'
         ]
+        # Поля модели, которые читают вычисляемые поля (для планировщика запросов)
+        method_field_sources = {
+            'full_name': ['first_name', 'last_name'],
+            'full_name_en': ['first_name', 'last_name', 'first_name_en', 'last_name_en'],
+            'is_top_trainer': ['id'],
+            'lessons_count': ['id'],
+        }
+
+    def get_lessons_count(self, obj: Trainer) -> int:
+        """
+        Возвращает количество занятий тренера из рейтинга, переданного через контекст.
+        """
+        return self.context.get('lessons_counts', {}).get(obj.id, 0)
 
     def get_is_top_trainer(self, obj: Trainer) -> bool:
         """
@@ -70,18 +212,36 @@ class TrainerSerializer(serializers.ModelSerializer):
         else:
             return f"{obj.first_name} {obj.last_name}"
 
-class HorseSerializer(serializers.ModelSerializer):
+class HorseStatisticsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор для статистики лошади.
+    """
+
+    class Meta:
+        model = HorseStatistics
+        fields = [
+            'lessons_7d', 'lessons_30d', 'lessons_365d', 'lessons_total',
+            'average_price', 'total_price', 'last_lesson_date', 'updated_at'
+        ]
+
+
+class HorseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для лошади.
+    Статистика (null до первого пересчёта) загружается тем же запросом через JOIN.
     """
     trainer_names = serializers.SerializerMethodField()
+    statistics = HorseStatisticsSerializer(read_only=True)
 
     class Meta:
         model = Horse
         fields = [
             'id', 'name', 'name_en', 'birth_date', 'gender', 'photo', 
-            'description', 'stable', 'trainer_names'
+            'description', 'stable', 'trainer_names', 'statistics'
         ]
+        method_field_sources = {
+            'trainer_names': ['trainers.first_name', 'trainers.last_name'],
+        }
 
     def get_trainer_names(self, obj: Horse) -> list[str]:
         """
@@ -89,7 +249,7 @@ class HorseSerializer(serializers.ModelSerializer):
         """
         return [f"{trainer.first_name} {trainer.last_name}" for trainer in obj.trainers.all()]
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(ValuesSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для занятия (урока).
     """
@@ -104,6 +264,18 @@ class LessonSerializer(serializers.ModelSerializer):
             'id', 'horse', 'horse_name', 'trainer', 'trainer_name',
             'student', 'student_name', 'date', 'price', 'status', 'is_expensive'
         ]
+        method_field_sources = {
+            'horse_name': ['horse.name'],
+            'trainer_name': ['trainer.first_name', 'trainer.last_name'],
+            'student_name': ['student.user.username'],
+            'is_expensive': ['price'],
+        }
+        # Столбцы вычисляемых полей для быстрого чтения списков
+        values_fields = {
+            'horse_name': 'horse__name',
+            'trainer_name': Concat('trainer__first_name', Value(' '), 'trainer__last_name', output_field=CharField()),
+            'student_name': 'student__user__username',
+        }
 
     def get_horse_name(self, obj: Lesson) -> str:
         return obj.horse.name
@@ -124,7 +296,16 @@ class LessonSerializer(serializers.ModelSerializer):
             return obj.price > average_price
         return False
 
-class PaymentSerializer(serializers.ModelSerializer):
+    def values_is_expensive(self) -> Any:
+        """
+        Возвращает выражение is_expensive для values() (аналог get_is_expensive).
+        """
+        average_price = self.context.get('average_price', 0)
+        if average_price > 0:
+            return ExpressionWrapper(Q(price__gt=average_price), output_field=BooleanField())
+        return Value(False, output_field=BooleanField())
+
+class PaymentSerializer(ValuesSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор для платежа.
     """
@@ -0,0 +1,199 @@
+"""
+Обработчики сигналов моделей.
+
+Поддерживают производные данные (статистику цен и т.п.) в актуальном
+состоянии при изменении исходных записей.
+"""
+
+from typing import Any, Optional
+
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from .autocomplete import MODEL_KINDS, publish_change
+from .caching import bump_versions
+from .counters import MODEL_COUNTERS, change_counter, counter_deltas, counter_fields
+from .leaderboards import record_lesson_change
+from .models import Horse, HorseTrainerRelation, Lesson, NewsPost, Payment, Trainer, UserProfile
+from .notifications import reminder_due_at
+from .search import INDEXED_MODELS, clear_backend_cache, index_object, remove_object
+from .stats import update_price_statistics
+
+# Модели, для которых ведутся версии (ETag/Last-Modified и кэш ответов)
+VERSIONED_MODELS = (Horse, Trainer, HorseTrainerRelation, NewsPost, Lesson, Payment, UserProfile, User)
+
+# Изменения только этих полей не влияют на ответы API
+IGNORED_UPDATE_FIELDS = {'last_login'}
+
+LESSON_STATE_FIELDS = ('trainer_id', 'horse_id', 'student_id', 'price', 'status', 'date')
+
+
+def lesson_state(lesson: Lesson) -> dict[str, Any]:
+    """
+    Возвращает значения полей занятия, от которых зависят производные данные.
+    """
+    return {name: getattr(lesson, name) for name in LESSON_STATE_FIELDS}
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_state(sender: type[Lesson], instance: Lesson, **kwargs: Any) -> None:
+    """
+    Запоминает состояние занятия в БД до сохранения.
+    """
+    previous: Optional[dict[str, Any]] = None
+    if instance.pk is not None and not kwargs.get('raw'):
+        previous = Lesson.objects.filter(pk=instance.pk).values(*LESSON_STATE_FIELDS).first()
+    instance._previous_state = previous
+
+
+@receiver(pre_save, sender=Lesson)
+def plan_lesson_reminder(sender: type[Lesson], instance: Lesson, **kwargs: Any) -> None:
+    """
+    Планирует напоминание для нового занятия и заново — при изменении даты или статуса.
+    """
+    # Флаг от предыдущего сохранения того же объекта не должен повторить UPDATE
+    instance._reminder_replanned = False
+    if kwargs.get('raw'):
+        return
+    previous = instance._previous_state
+    if previous is not None and (previous['date'], previous['status']) == (instance.date, instance.status):
+        return
+    instance.reminder_due_at = reminder_due_at(instance.date, instance.status)
+    instance.reminder_sent_at = None
+    # save(update_fields=...) без полей напоминания: сохраняем их отдельно после записи
+    update_fields = kwargs.get('update_fields')
+    instance._reminder_replanned = update_fields is not None and not {'reminder_due_at', 'reminder_sent_at'} <= update_fields
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_saved(sender: type[Lesson], instance: Lesson, **kwargs: Any) -> None:
+    """
+    Обновляет производные данные после сохранения занятия.
+    """
+    if kwargs.get('raw'):
+        return
+    previous = getattr(instance, '_previous_state', None)
+    current = lesson_state(instance)
+    if getattr(instance, '_reminder_replanned', False):
+        Lesson.objects.filter(pk=instance.pk).update(reminder_due_at=instance.reminder_due_at, reminder_sent_at=None)
+    update_price_statistics(previous, current)
+    transaction.on_commit(lambda: record_lesson_change(previous, current))
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender: type[Lesson], instance: Lesson, **kwargs: Any) -> None:
+    """
+    Обновляет производные данные после удаления занятия.
+    """
+    previous = lesson_state(instance)
+    update_price_statistics(previous, None)
+    transaction.on_commit(lambda: record_lesson_change(previous, None))
+
+
+def bump_model_version(sender: type[models.Model], **kwargs: Any) -> None:
+    """
+    Обновляет версию модели сразу и после коммита транзакции.
+
+    Повторное обновление после коммита инвалидирует ответы, закэшированные
+    параллельными запросами до того, как изменения стали видны.
+    """
+    update_fields = kwargs.get('update_fields')
+    if kwargs.get('raw') or (update_fields and set(update_fields) <= IGNORED_UPDATE_FIELDS):
+        return
+    bump_versions(sender)
+    transaction.on_commit(lambda: bump_versions(sender))
+
+
+for versioned_model in VERSIONED_MODELS:
+    post_save.connect(bump_model_version, sender=versioned_model, dispatch_uid=f'version-save-{versioned_model._meta.label_lower}')
+    post_delete.connect(bump_model_version, sender=versioned_model, dispatch_uid=f'version-delete-{versioned_model._meta.label_lower}')
+
+
+@receiver(m2m_changed, sender=Horse.trainers.through)
+def horse_trainers_changed(sender: type[models.Model], action: str, **kwargs: Any) -> None:
+    """
+    Обновляет версию связей лошадей и тренеров при изменении M2M.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_model_version(HorseTrainerRelation)
+
+
+def update_search_document(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    """
+    Обновляет поисковый документ после сохранения объекта.
+    """
+    if not kwargs.get('raw'):
+        index_object(instance)
+
+
+def delete_search_document(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    """
+    Удаляет поисковый документ вместе с объектом.
+    """
+    remove_object(instance)
+
+
+for indexed_model in INDEXED_MODELS:
+    post_save.connect(update_search_document, sender=indexed_model, dispatch_uid=f'search-save-{indexed_model._meta.label_lower}')
+    post_delete.connect(delete_search_document, sender=indexed_model, dispatch_uid=f'search-delete-{indexed_model._meta.label_lower}')
+
+
+@receiver(post_migrate, dispatch_uid='search-backend-reset')
+def reset_search_backend(**kwargs: Any) -> None:
+    """
+    Сбрасывает запомненную доступность FTS5: миграция могла создать или удалить таблицу.
+    """
+    clear_backend_cache()
+
+
+def publish_autocomplete_change(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    """
+    Записывает изменение в журнал автодополнения после коммита транзакции.
+    """
+    kind, object_id = MODEL_KINDS[sender], instance.pk
+    transaction.on_commit(lambda: publish_change(kind, object_id))
+
+
+for autocomplete_model in MODEL_KINDS:
+    post_save.connect(publish_autocomplete_change, sender=autocomplete_model, dispatch_uid=f'autocomplete-save-{autocomplete_model._meta.label_lower}')
+    post_delete.connect(publish_autocomplete_change, sender=autocomplete_model, dispatch_uid=f'autocomplete-delete-{autocomplete_model._meta.label_lower}')
+
+
+def remember_counter_state(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    """
+    Запоминает значения полей, от которых зависят счётчики, до сохранения.
+    """
+    fields = counter_fields(sender)
+    previous: Optional[dict[str, Any]] = {}
+    if fields and instance.pk is not None and not kwargs.get('raw'):
+        previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._counter_state = previous
+
+
+def apply_counter_deltas(deltas: dict[str, int]) -> None:
+    for name, delta in deltas.items():
+        transaction.on_commit(lambda name=name, delta=delta: change_counter(name, delta))
+
+
+def counter_object_saved(sender: type[models.Model], instance: models.Model, created: bool, **kwargs: Any) -> None:
+    """
+    Обновляет счётчики главной страницы после коммита транзакции.
+    """
+    if kwargs.get('raw'):
+        return
+    current = {field: getattr(instance, field) for field in counter_fields(sender)}
+    previous = None if created else getattr(instance, '_counter_state', None)
+    apply_counter_deltas(counter_deltas(sender, previous, current))
+
+
+def counter_object_deleted(sender: type[models.Model], instance: models.Model, **kwargs: Any) -> None:
+    current = {field: getattr(instance, field) for field in counter_fields(sender)}
+    apply_counter_deltas(counter_deltas(sender, current, None))
+
+
+for counted_model in MODEL_COUNTERS:
+    pre_save.connect(remember_counter_state, sender=counted_model, dispatch_uid=f'counter-pre-save-{counted_model._meta.label_lower}')
+    post_save.connect(counter_object_saved, sender=counted_model, dispatch_uid=f'counter-save-{counted_model._meta.label_lower}')
+    post_delete.connect(counter_object_deleted, sender=counted_model, dispatch_uid=f'counter-delete-{counted_model._meta.label_lower}')
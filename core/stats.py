@@ -0,0 +1,176 @@
+"""
+Инкрементальная статистика цен занятий и статистика лошадей.
+
+Хранилище PriceStatistics содержит количество и сумму цен занятий
+в целом, по тренерам и по лошадям. Сигналы занятия применяют дельты
+через F-выражения, а задача reconcile_price_statistics периодически
+пересчитывает значения по таблице занятий (например, после
+bulk_create/update, которые обходят сигналы).
+
+HorseStatistics зависит от текущей даты (скользящие окна), поэтому не
+обновляется сигналами, а пересчитывается целиком одним агрегирующим
+запросом (refresh_horse_statistics).
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_versions
+from .models import Horse, HorseStatistics, Lesson, PriceStatistics
+
+# Скользящие окна статистики лошадей: поле HorseStatistics -> длина окна в днях
+HORSE_STATISTICS_WINDOWS = {'lessons_7d': 7, 'lessons_30d': 30, 'lessons_365d': 365}
+
+
+def lesson_scopes(state: Optional[dict[str, Any]]) -> list[tuple[str, int]]:
+    """
+    Возвращает области статистики, в которые входит занятие.
+
+    Args:
+        state: Значения полей занятия (trainer_id, horse_id, price) или None.
+
+    Returns:
+        Список пар (область, ID объекта).
+    """
+    if not state:
+        return []
+    return [
+        (PriceStatistics.SCOPE_GLOBAL, 0),
+        (PriceStatistics.SCOPE_TRAINER, state['trainer_id']),
+        (PriceStatistics.SCOPE_HORSE, state['horse_id']),
+    ]
+
+
+def _apply_delta(scope: str, object_id: int, count_delta: int, price_delta: Decimal) -> None:
+    """
+    Атомарно прибавляет дельту к строке статистики, создавая её при необходимости.
+    """
+    rows = PriceStatistics.objects.filter(scope=scope, object_id=object_id)
+    if rows.update(lessons_count=F('lessons_count') + count_delta, total_price=F('total_price') + price_delta):
+        return
+    try:
+        with transaction.atomic():
+            PriceStatistics.objects.create(
+                scope=scope, object_id=object_id, lessons_count=count_delta, total_price=price_delta
+            )
+    except IntegrityError:
+        # Строку успел создать параллельный процесс
+        rows.update(lessons_count=F('lessons_count') + count_delta, total_price=F('total_price') + price_delta)
+
+
+def update_price_statistics(old: Optional[dict[str, Any]], new: Optional[dict[str, Any]]) -> None:
+    """
+    Применяет изменение занятия к статистике цен.
+
+    Args:
+        old: Состояние занятия до изменения (None для нового занятия).
+        new: Состояние после изменения (None для удалённого занятия).
+    """
+    deltas: dict[tuple[str, int], list] = {}
+    for state, sign in ((old, -1), (new, 1)):
+        for key in lesson_scopes(state):
+            delta = deltas.setdefault(key, [0, Decimal('0')])
+            delta[0] += sign
+            delta[1] += sign * Decimal(state['price'])
+    for (scope, object_id), (count_delta, price_delta) in deltas.items():
+        if count_delta or price_delta:
+            _apply_delta(scope, object_id, count_delta, price_delta)
+
+
+def get_average_price(scope: str = PriceStatistics.SCOPE_GLOBAL, object_id: int = 0) -> Decimal:
+    """
+    Возвращает среднюю цену занятия для области одним запросом по ключу.
+    """
+    stats = PriceStatistics.objects.filter(scope=scope, object_id=object_id).first()
+    return stats.average_price if stats else Decimal('0')
+
+
+def _grouped_statistics(group_field: Optional[str]) -> Iterable[tuple[int, int, Decimal]]:
+    """
+    Возвращает (ID объекта, количество, сумма) по группировке занятий.
+    """
+    if group_field is None:
+        totals = Lesson.objects.aggregate(count=Count('id'), total=Sum('price'))
+        return [(0, totals['count'], totals['total'] or Decimal('0'))]
+    rows = Lesson.objects.order_by().values(group_field).annotate(count=Count('id'), total=Sum('price'))
+    return [(row[group_field], row['count'], row['total'] or Decimal('0')) for row in rows]
+
+
+def reconcile_price_statistics() -> int:
+    """
+    Пересчитывает статистику цен по таблице занятий.
+
+    Returns:
+        Количество записанных строк статистики.
+    """
+    groups = {
+        PriceStatistics.SCOPE_GLOBAL: None,
+        PriceStatistics.SCOPE_TRAINER: 'trainer_id',
+        PriceStatistics.SCOPE_HORSE: 'horse_id',
+    }
+    rows = [
+        PriceStatistics(scope=scope, object_id=object_id, lessons_count=count, total_price=total)
+        for scope, group_field in groups.items()
+        for object_id, count, total in _grouped_statistics(group_field)
+    ]
+    with transaction.atomic():
+        PriceStatistics.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['scope', 'object_id'],
+            update_fields=['lessons_count', 'total_price'],
+        )
+        for scope in (PriceStatistics.SCOPE_TRAINER, PriceStatistics.SCOPE_HORSE):
+            actual = [row.object_id for row in rows if row.scope == scope]
+            PriceStatistics.objects.filter(scope=scope).exclude(object_id__in=actual).delete()
+    # Средняя цена влияет на is_expensive в ответах по занятиям
+    bump_versions(Lesson)
+    return len(rows)
+
+
+def refresh_horse_statistics(now: Optional[datetime] = None, batch_size: int = 1000) -> int:
+    """
+    Пересчитывает статистику всех лошадей одним запросом с группировкой
+    и записывает её через upsert.
+
+    В окна и дату последнего занятия входят только прошедшие занятия;
+    средняя и суммарная цена считаются по всем занятиям лошади.
+
+    Returns:
+        Количество записанных строк статистики.
+    """
+    now = now or timezone.now()
+    windows = {
+        name: Count('lessons', filter=Q(lessons__date__gt=now - timedelta(days=days), lessons__date__lte=now))
+        for name, days in HORSE_STATISTICS_WINDOWS.items()
+    }
+    aggregates = {
+        **windows,
+        'count': Count('lessons'),
+        'total': Sum('lessons__price'),
+        'last_date': Max('lessons__date', filter=Q(lessons__date__lte=now)),
+    }
+    grouped = Horse.objects.order_by().values('pk').annotate(**aggregates).values_list('pk', *aggregates)
+    rows = []
+    for horse_id, *window_counts, count, total, last_date in grouped:
+        total = Decimal(total or 0)
+        rows.append(HorseStatistics(
+            horse_id=horse_id,
+            **dict(zip(windows, window_counts)),
+            lessons_total=count,
+            average_price=(total / count).quantize(Decimal('0.01')) if count else Decimal('0'),
+            total_price=total,
+            last_lesson_date=last_date,
+            updated_at=now,
+        ))
+    fields = [*windows, 'lessons_total', 'average_price', 'total_price', 'last_lesson_date', 'updated_at']
+    HorseStatistics.objects.bulk_create(
+        rows, batch_size=batch_size, update_conflicts=True, unique_fields=['horse'], update_fields=fields
+    )
+    bump_versions(HorseStatistics)
+    return len(rows)
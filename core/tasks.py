@@ -1,11 +1,13 @@
 import logging
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.db.models import Count, Avg, Sum
 from django.core.mail import send_mail
 from django.conf import settings
 from celery import shared_task
-from .models import Lesson, Payment, NewsPost, Horse, Trainer, UserProfile
+from .models import Lesson, NewsPost, Horse, Trainer, UserProfile
+from .counters import reconcile_counters
+from .stats import reconcile_price_statistics, refresh_horse_statistics
+from . import cleanup, leaderboards, notifications, rollups
 
 logger = logging.getLogger(__name__)
 
@@ -21,22 +23,26 @@ def daily_cleanup():
             created_at__lt=one_year_ago,
             is_active=False
         )
-        deleted_count = old_news.count()
-        old_news.delete()
+        # Пакетами по первичному ключу: короткие транзакции вместо одного долгого DELETE
+        deleted_count = cleanup.delete_in_batches(
+            old_news, progress=lambda deleted: logger.info(f"Ежедневная очистка: удалено {deleted} старых новостей")
+        )
         
         logger.info(f"Ежедневная очистка: удалено {deleted_count} старых новостей")
         
-        # Уведомления о завтрашних занятиях
-        tomorrow = timezone.now().date() + timedelta(days=1)
+        # Уведомления о завтрашних занятиях (диапазон по date, а не date__date:
+        # сравнение с функцией от столбца не использует индекс (status, date))
+        tomorrow_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
         tomorrow_lessons = Lesson.objects.filter(
-            date__date=tomorrow,
+            date__gte=tomorrow_start,
+            date__lt=tomorrow_start + timedelta(days=1),
             status='scheduled'
-        )
+        ).select_related('student__user', 'trainer')
         
         for lesson in tomorrow_lessons:
-            logger.info(f"Напоминание: завтра занятие {lesson.student.user.username} с {lesson.trainer.full_name}")
+            logger.info(f"Напоминание: завтра занятие {lesson.student.user.username} с {lesson.trainer.get_full_name()}")
         
-        return f"Очистка завершена. Удалено новостей: {deleted_count}, напоминаний отправлено: {tomorrow_lessons.count()}"
+        return f"Очистка завершена. Удалено новостей: {deleted_count}, напоминаний отправлено: {len(tomorrow_lessons)}"
         
     except Exception as e:
         logger.error(f"Ошибка в ежедневной очистке: {e}")
@@ -48,33 +54,24 @@ def weekly_reports():
     Еженедельные отчеты по доходам и активности.
     """
     try:
-        # Статистика за неделю
-        week_ago = timezone.now() - timedelta(days=7)
-        
-        # Доходы за неделю
-        weekly_income = Payment.objects.filter(
-            timestamp__gte=week_ago,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Количество занятий за неделю
-        weekly_lessons = Lesson.objects.filter(
-            date__gte=week_ago
-        ).count()
+        # Доходы и количество занятий за неделю (сегодня и 6 предыдущих дней) из дневных итогов
+        window = rollups.ReportWindow.last_days(7)
+        weekly_income = window.income('completed')
+        weekly_lessons = window.lessons().get((), (0, 0))[0]
         
-        # Популярные лошади
-        popular_horses = Horse.objects.annotate(
-            lesson_count=Count('lessons')
-        ).filter(
-            lessons__date__gte=week_ago
-        ).order_by('-lesson_count')[:5]
+        # Популярные лошади (из рейтинга за 7 дней)
+        popular_horses = leaderboards.top(leaderboards.HORSES, window=7, limit=5)
+        horse_names = Horse.objects.in_bulk([horse_id for horse_id, _ in popular_horses])
         
         logger.info(f"Еженедельный отчет: доход {weekly_income}, занятий {weekly_lessons}")
         
         return {
             'weekly_income': float(weekly_income),
             'weekly_lessons': weekly_lessons,
-            'popular_horses': list(popular_horses.values('name', 'lesson_count'))
+            'popular_horses': [
+                {'name': horse_names[horse_id].name, 'lesson_count': count}
+                for horse_id, count in popular_horses if horse_id in horse_names
+            ]
         }
         
     except Exception as e:
@@ -87,38 +84,39 @@ def monthly_analytics():
     Ежемесячная аналитика по лошадям и тренерам.
     """
     try:
-        # Статистика за месяц
-        month_ago = timezone.now() - timedelta(days=30)
+        # Дневные итоги за месяц (сегодня и 29 предыдущих дней)
+        window = rollups.ReportWindow.last_days(30)
         
-        # Топ тренеров по количеству занятий
-        top_trainers = Trainer.objects.annotate(
-            lesson_count=Count('lessons')
-        ).filter(
-            lessons__date__gte=month_ago
-        ).order_by('-lesson_count')[:10]
+        # Топ тренеров по количеству занятий (из рейтинга за 30 дней)
+        top_trainers = leaderboards.top(leaderboards.TRAINERS, window=30, limit=10)
+        trainers = Trainer.objects.in_bulk([trainer_id for trainer_id, _ in top_trainers])
         
         # Статистика по лошадям
-        horse_stats = Horse.objects.annotate(
-            lesson_count=Count('lessons'),
-            avg_price=Avg('lessons__price')
-        ).filter(
-            lessons__date__gte=month_ago
-        ).order_by('-lesson_count')[:10]
+        horse_totals = sorted(window.lessons(['horse_id']).items(), key=lambda item: item[1][0], reverse=True)
+        horse_names = Horse.objects.in_bulk([horse_id for (horse_id,), _ in horse_totals[:10]])
+        horse_stats = [
+            {'name': horse_names[horse_id].name, 'lesson_count': count, 'avg_price': float(total / count)}
+            for (horse_id,), (count, total) in horse_totals[:10] if horse_id in horse_names
+        ]
         
         # Общая статистика
-        total_lessons = Lesson.objects.filter(date__gte=month_ago).count()
-        total_income = Payment.objects.filter(
-            timestamp__gte=month_ago,
-            status='completed'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        total_lessons = sum(count for _, (count, _total) in horse_totals)
+        total_income = window.income('completed')
         
         logger.info(f"Ежемесячная аналитика: {total_lessons} занятий, доход {total_income}")
         
         return {
             'total_lessons': total_lessons,
             'total_income': float(total_income),
-            'top_trainers': list(top_trainers.values('first_name', 'last_name', 'lesson_count')),
-            'horse_stats': list(horse_stats.values('name', 'lesson_count', 'avg_price'))
+            'top_trainers': [
+                {
+                    'first_name': trainers[trainer_id].first_name,
+                    'last_name': trainers[trainer_id].last_name,
+                    'lesson_count': count,
+                }
+                for trainer_id, count in top_trainers if trainer_id in trainers
+            ],
+            'horse_stats': horse_stats
         }
         
     except Exception as e:
@@ -128,58 +126,18 @@ def monthly_analytics():
 @shared_task
 def send_lesson_reminders():
     """
-    Отправка напоминаний о занятиях (каждый час).
+    Отправка наступивших напоминаний о занятиях (ежеминутно).
     """
     try:
-        # Занятия в ближайшие 2 часа
-        now = timezone.now()
-        two_hours_later = now + timedelta(hours=2)
+        report = notifications.send_due_reminders()
+        if report.failed:
+            logger.warning(f"Не отправлены напоминания для занятий: {report.failed}")
         
-        upcoming_lessons = Lesson.objects.filter(
-            date__gte=now,
-            date__lte=two_hours_later,
-            status='scheduled'
+        return (
+            f"Напоминания отправлены для {report.sent} из {report.total} занятий "
+            f"(без email: {report.skipped}, ошибок: {len(report.failed)})"
         )
         
-        emails_sent = 0
-        for lesson in upcoming_lessons:
-            try:
-                # Формируем сообщение
-                subject = f'Напоминание о занятии - {lesson.date.strftime("%d.%m.%Y %H:%M")}'
-                message = f"""
-Здравствуйте, {lesson.student.user.username}!
-
-Напоминаем о предстоящем занятии:
-- Дата: {lesson.date.strftime("%d.%m.%Y")}
-- Время: {lesson.date.strftime("%H:%M")}
-- Тренер: {lesson.trainer.full_name}
-- Лошадь: {lesson.horse.name}
-- Продолжительность: {lesson.duration} минут
-- Стоимость: {lesson.price} руб.
-
-Ждем вас в конюшне!
-
-С уважением,
-Команда конюшни
-                """.strip()
-                
-                # Отправляем email
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[lesson.student.user.email] if lesson.student.user.email else [],
-                    fail_silently=True,
-                )
-                
-                emails_sent += 1
-                logger.info(f"Напоминание отправлено: занятие через {lesson.date - now} для {lesson.student.user.username}")
-                
-            except Exception as e:
-                logger.error(f"Ошибка отправки напоминания для занятия {lesson.id}: {e}")
-        
-        return f"Напоминания отправлены для {emails_sent} из {upcoming_lessons.count()} занятий"
-        
     except Exception as e:
         logger.error(f"Ошибка в отправке напоминаний: {e}")
         raise
@@ -204,19 +162,10 @@ def update_horse_statistics():
     Обновление статистики лошадей (ежедневно).
     """
     try:
-        horses = Horse.objects.all()
-        
-        for horse in horses:
-            # Подсчет занятий за последний месяц
-            month_ago = timezone.now() - timedelta(days=30)
-            recent_lessons = horse.lessons.filter(date__gte=month_ago).count()
-            
-            # Средняя цена за занятие
-            avg_price = horse.lessons.aggregate(avg_price=Avg('price'))['avg_price'] or 0
-            
-            logger.info(f"Статистика лошади {horse.name}: {recent_lessons} занятий, средняя цена {avg_price}")
-        
-        return f"Статистика обновлена для {horses.count()} лошадей"
+        # Все лошади одним запросом с группировкой, запись через upsert
+        updated = refresh_horse_statistics()
+        logger.info(f"Статистика обновлена для {updated} лошадей")
+        return f"Статистика обновлена для {updated} лошадей"
         
     except Exception as e:
         logger.error(f"Ошибка в обновлении статистики лошадей: {e}")
@@ -270,4 +219,86 @@ def send_weekly_reports_email():
         
     except Exception as e:
         logger.error(f"Ошибка в отправке еженедельного отчета: {e}")
-        raise 
\ No newline at end of file
+        raise 
+
+@shared_task
+def sweep_orphaned_media():
+    """
+    Удаление медиафайлов, на которые не ссылается ни одна запись (ежедневно).
+    """
+    try:
+        report = cleanup.sweep_orphaned_media(
+            progress=lambda current: logger.info(f"Очистка медиафайлов: просмотрено {current.scanned} файлов")
+        )
+        logger.info(
+            f"Очистка медиафайлов: просмотрено {report.scanned}, удалено {report.removed} "
+            f"({report.removed_bytes} байт)"
+        )
+        return f"Удалено медиафайлов: {report.removed} из {report.scanned}"
+
+    except Exception as e:
+        logger.error(f"Ошибка в очистке медиафайлов: {e}")
+        raise
+
+@shared_task
+def build_daily_rollups():
+    """
+    Построение дневных итогов платежей и занятий для отчётов (еженощно).
+    """
+    try:
+        written = rollups.refresh_rollups()
+        logger.info(f"Дневные итоги построены: записано {written} строк")
+        return f"Дневные итоги построены: записано {written} строк"
+
+    except Exception as e:
+        logger.error(f"Ошибка в построении дневных итогов: {e}")
+        raise
+
+@shared_task
+def reconcile_lesson_price_statistics():
+    """
+    Сверка инкрементальной статистики цен занятий с таблицей занятий (ежедневно).
+    """
+    try:
+        rows = reconcile_price_statistics()
+        logger.info(f"Статистика цен пересчитана: {rows} строк")
+        return f"Статистика цен пересчитана: {rows} строк"
+
+    except Exception as e:
+        logger.error(f"Ошибка в сверке статистики цен: {e}")
+        raise
+
+
+@shared_task
+def reconcile_home_counters():
+    """
+    Сверка счётчиков главной страницы с базой данных (ежечасно).
+    """
+    try:
+        values = reconcile_counters()
+        logger.info(f"Счётчики главной страницы пересчитаны: {values}")
+        return f"Счётчики главной страницы пересчитаны: {values}"
+
+    except Exception as e:
+        logger.error(f"Ошибка в сверке счётчиков главной страницы: {e}")
+        raise
+
+
+@shared_task
+def rebuild_leaderboards(force: bool = True):
+    """
+    Пересборка рейтингов тренеров и лошадей по таблице занятий.
+
+    С ``force=False`` рейтинги пересобираются, только если их нет в хранилище
+    (первый запуск после развёртывания, очищенный Redis).
+    """
+    try:
+        if not force and leaderboards.leaderboards_ready():
+            return "Рейтинги уже собраны"
+        keys = leaderboards.rebuild_leaderboards()
+        logger.info(f"Рейтинги пересобраны: {keys} ключей")
+        return f"Рейтинги пересобраны: {keys} ключей"
+
+    except Exception as e:
+        logger.error(f"Ошибка в пересборке рейтингов: {e}")
+        raise
@@ -8,7 +8,7 @@ from rest_framework import status
 from decimal import Decimal
 from .models import (
     Stable, UserProfile, Trainer, Horse, Lesson, 
-    Payment, NewsPost, ScheduleRequest, Resource
+    Payment, NewsPost, ScheduleRequest, Resource, HorseTrainerRelation
 )
 from .filters import NewsPostFilter, TrainerFilter, HorseFilter
 from django_filters import rest_framework as filters
@@ -429,3 +429,2139 @@ class IntegrationTests(TestCase):
         self.assertEqual(payment.amount, Decimal('2000.00'))
         self.assertEqual(payment.purpose, 'Оплата занятий')
         self.assertEqual(payment.status, 'completed')
+
+
+def app_queries(captured: list[dict[str, Any]]) -> list[str]:
+    """
+    Отбрасывает служебные запросы Silk (запись профиля, EXPLAIN, savepoint'ы).
+    """
+    service_prefixes = ('EXPLAIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+    return [
+        query['sql'] for query in captured
+        if 'silk_' not in query['sql'] and not query['sql'].startswith(service_prefixes)
+    ]
+
+
+def create_lesson_fixtures(count: int, prefix: str = 'fx') -> list[Lesson]:
+    """
+    Создаёт набор занятий с отдельными лошадьми, тренерами и учениками.
+    """
+    lessons = []
+    for i in range(count):
+        user = User.objects.create_user(username=f'{prefix}student{i}', email=f'{prefix}{i}@example.com')
+        student = UserProfile.objects.create(user=user, phone='+7-999-000-00-00')
+        trainer = Trainer.objects.create(
+            first_name='Тренер', last_name='Номер', bio='Тренер', experience_years=i % 50
+        )
+        horse = Horse.objects.create(name=f'Конь {prefix} {i}', gender='male')
+        horse.trainers.add(trainer, through_defaults={'start_date': timezone.now().date()})
+        lesson = Lesson.objects.create(
+            horse=horse,
+            trainer=trainer,
+            student=student,
+            date=timezone.now() + timezone.timedelta(hours=i + 1),
+            price=Decimal('1000.00') + i,
+            status='scheduled',
+        )
+        Payment.objects.create(
+            user=user, lesson=lesson, amount=lesson.price, status='completed', purpose='Оплата занятия'
+        )
+        NewsPost.objects.create(
+            title=f'Новость {i}', content='Текст новости', author=student, published_at=timezone.now()
+        )
+        lessons.append(lesson)
+    return lessons
+
+
+class QueryPlannerTests(APITestCase):
+    """
+    Тесты автоматического планировщика запросов для API.
+    """
+
+    ENDPOINTS = ['/api/news/', '/api/trainers/', '/api/horses/', '/api/lessons/', '/api/payments/']
+
+    def count_queries(self, url: str) -> int:
+        """
+        Возвращает число SQL-запросов, выполненных при GET-запросе.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(app_queries(ctx.captured_queries))
+
+    def test_query_count_does_not_grow_with_page_size(self) -> None:
+        """
+        Число запросов списка не зависит от количества строк на странице.
+        """
+        create_lesson_fixtures(2, prefix='a')
+        small = {url: self.count_queries(url) for url in self.ENDPOINTS}
+        create_lesson_fixtures(8, prefix='b')
+        large = {url: self.count_queries(url) for url in self.ENDPOINTS}
+        self.assertEqual(small, large)
+
+    def test_lesson_list_output(self) -> None:
+        """
+        Оптимизированный QuerySet отдаёт те же данные, что и сериализатор.
+        """
+        lesson = create_lesson_fixtures(1)[0]
+        response = self.client.get('/api/lessons/')
+        item = response.data['results'][0]
+        self.assertEqual(item['horse_name'], lesson.horse.name)
+        self.assertEqual(item['trainer_name'], lesson.trainer.get_full_name())
+        self.assertEqual(item['student_name'], lesson.student.user.username)
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Тесты курсорной пагинации и оценочного количества.
+    """
+
+    def setUp(self) -> None:
+        """
+        Создаёт занятия, часть из которых имеет одинаковую дату.
+        """
+        lessons = create_lesson_fixtures(5)
+        same_date = lessons[0].date
+        Lesson.objects.filter(pk__in=[lessons[1].pk, lessons[2].pk]).update(date=same_date)
+
+    def walk(self, url: str) -> list[int]:
+        """
+        Обходит все страницы по ссылкам next и возвращает id.
+        """
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_cursor_walk_matches_ordering(self) -> None:
+        """
+        Курсорный обход отдаёт все строки ровно один раз в порядке (-date, -id).
+        """
+        expected = list(Lesson.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/lessons/?cursor=&page_size=2'), expected)
+
+    def test_previous_link(self) -> None:
+        """
+        Ссылка previous возвращает к предыдущей странице.
+        """
+        first = self.client.get('/api/lessons/?cursor=&page_size=2')
+        self.assertIsNone(first.data['previous'])
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        back = self.client.get(third.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in second.data['results']],
+        )
+        again = self.client.get(back.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in again.data['results']],
+            [item['id'] for item in first.data['results']],
+        )
+        self.assertIsNone(again.data['previous'])
+
+    def test_nullable_ordering_field(self) -> None:
+        """
+        Новости с пустой датой публикации не теряются при обходе.
+        """
+        NewsPost.objects.filter(pk__in=list(NewsPost.objects.values_list('pk', flat=True)[:2])).update(published_at=None)
+        ids = self.walk('/api/news/?cursor=&page_size=2')
+        self.assertEqual(sorted(ids), sorted(NewsPost.objects.filter(is_active=True).values_list('id', flat=True)))
+
+    def test_invalid_cursor(self) -> None:
+        """
+        Повреждённый курсор приводит к 404.
+        """
+        response = self.client.get('/api/payments/?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tampered_cursor(self) -> None:
+        """
+        Курсор с подменённым значением приводит к 404, а не к ошибке сервера.
+        """
+        import base64
+        import json
+
+        positions = [
+            {'v': 'garbage', 'id': 1}, {'v': [1, 2], 'id': 1}, {'v': {'a': 1}, 'id': 1},
+            {'v': '2025-01-01T10:00:00+00:00', 'id': 'x'}, {'v': '2025-01-01T10:00:00+00:00', 'id': None},
+        ]
+        for position in positions:
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+            response = self.client.get(f'/api/lessons/?cursor={cursor}')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND, position)
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': 'garbage', 'id': 1}).encode()).decode()
+        self.assertEqual(self.client.get(f'/api/payments/?ordering=amount&cursor={cursor}').status_code, 404)
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': '2025-01-01T10:00:00+00:00', 'id': 1}).encode()).decode()
+        self.assertEqual(self.client.get(f'/api/lessons/?cursor={cursor}').status_code, status.HTTP_200_OK)
+
+    def test_estimated_count(self) -> None:
+        """
+        В режиме оценки количество для малых таблиц считается точно.
+        """
+        response = self.client.get('/api/payments/?count=estimated')
+        self.assertEqual(response.data['count'], 5)
+        self.assertFalse(response.data['count_is_estimated'])
+
+
+class PriceStatisticsTests(APITestCase):
+    """
+    Тесты инкрементальной статистики цен занятий.
+    """
+
+    def assert_matches_table(self) -> None:
+        """
+        Проверяет, что статистика совпадает с пересчётом по таблице.
+        """
+        from django.db.models import Count, Sum
+        from .models import PriceStatistics
+
+        totals = Lesson.objects.aggregate(count=Count('id'), total=Sum('price'))
+        stats = PriceStatistics.objects.get(scope='global')
+        self.assertEqual(stats.lessons_count, totals['count'])
+        self.assertEqual(stats.total_price, totals['total'] or 0)
+        for row in Lesson.objects.order_by().values('trainer_id').annotate(count=Count('id'), total=Sum('price')):
+            trainer_stats = PriceStatistics.objects.get(scope='trainer', object_id=row['trainer_id'])
+            self.assertEqual(trainer_stats.lessons_count, row['count'])
+            self.assertEqual(trainer_stats.total_price, row['total'])
+
+    def test_incremental_updates(self) -> None:
+        """
+        Создание, изменение и удаление занятий отражаются в статистике.
+        """
+        from .stats import get_average_price
+
+        lessons = create_lesson_fixtures(3)
+        self.assert_matches_table()
+        self.assertEqual(get_average_price(), Decimal('1001.00'))
+
+        lessons[0].price = Decimal('4000.00')
+        lessons[0].trainer = lessons[1].trainer
+        lessons[0].save()
+        self.assert_matches_table()
+
+        lessons[2].delete()
+        self.assert_matches_table()
+
+    def test_reconcile_fixes_drift(self) -> None:
+        """
+        Сверка исправляет расхождения после массовых обновлений.
+        """
+        from .stats import reconcile_price_statistics
+
+        create_lesson_fixtures(2)
+        Lesson.objects.update(price=Decimal('10.00'))
+        reconcile_price_statistics()
+        self.assert_matches_table()
+
+    def test_lesson_list_skips_full_table_average(self) -> None:
+        """
+        Список занятий не выполняет AVG по всей таблице.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        create_lesson_fixtures(2)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/lessons/')
+        self.assertTrue(response.data['results'][0]['is_expensive'])
+        self.assertFalse(any('AVG(' in sql for sql in app_queries(ctx.captured_queries)))
+
+
+class LeaderboardTests(APITestCase):
+    """
+    Тесты рейтингов тренеров и лошадей.
+    """
+
+    def setUp(self) -> None:
+        """
+        Очищает хранилище рейтингов в памяти.
+        """
+        from . import leaderboards
+
+        leaderboards.get_backend().replace({}, {})
+
+    def test_incremental_matches_rebuild(self) -> None:
+        """
+        Инкрементальные обновления совпадают с пересборкой по базе.
+        """
+        from . import leaderboards
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lessons = create_lesson_fixtures(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            lessons[0].trainer = lessons[1].trainer
+            lessons[0].status = 'completed'
+            lessons[0].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            lessons[2].delete()
+
+        incremental = {
+            (board, metric, window): leaderboards.scores(board, metric, window)
+            for board in leaderboards.BOARDS for metric in leaderboards.METRICS
+            for window in (None,) + leaderboards.WINDOWS
+        }
+        self.assertEqual(incremental[(leaderboards.TRAINERS, leaderboards.LESSONS, None)], {lessons[1].trainer_id: 2})
+        self.assertEqual(incremental[(leaderboards.HORSES, leaderboards.COMPLETED, None)], {lessons[0].horse_id: 1})
+
+        leaderboards.rebuild_leaderboards()
+        for (board, metric, window), expected in incremental.items():
+            self.assertEqual(leaderboards.scores(board, metric, window), expected)
+
+    def test_leaderboard_endpoint(self) -> None:
+        """
+        Эндпоинт рейтинга отдаёт позиции по убыванию количества занятий.
+        """
+        lessons = create_lesson_fixtures(2)
+        Lesson.objects.create(
+            horse=lessons[1].horse, trainer=lessons[1].trainer, student=lessons[0].student,
+            date=timezone.now(), price=Decimal('100.00'), status='scheduled',
+        )
+        from . import leaderboards
+        leaderboards.rebuild_leaderboards()
+
+        response = self.client.get('/api/trainers/leaderboard/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['id'], lessons[1].trainer_id)
+        self.assertEqual(response.data['results'][0]['score'], 2)
+        self.assertEqual(self.client.get('/api/horses/leaderboard/?window=5').status_code, status.HTTP_400_BAD_REQUEST)
+
+        trainers = self.client.get('/api/trainers/').data['results']
+        counts = {trainer['id']: trainer['lessons_count'] for trainer in trainers}
+        self.assertEqual(counts[lessons[1].trainer_id], 2)
+
+    def test_weekly_report_uses_leaderboard(self) -> None:
+        """
+        Еженедельный отчёт берёт популярных лошадей из рейтинга.
+        """
+        from . import leaderboards
+        from .tasks import weekly_reports
+
+        lesson = create_lesson_fixtures(1)[0]
+        Lesson.objects.filter(pk=lesson.pk).update(date=timezone.now() - timezone.timedelta(days=1))
+        leaderboards.rebuild_leaderboards()
+        report = weekly_reports()
+        self.assertEqual(report['popular_horses'], [{'name': lesson.horse.name, 'lesson_count': 1}])
+
+    def test_database_backend(self) -> None:
+        """
+        Без Redis рейтинги считаются по базе данных (одинаково для всех процессов).
+        """
+        from unittest import mock
+        from . import leaderboards
+
+        lessons = create_lesson_fixtures(3)
+        Lesson.objects.filter(pk=lessons[2].pk).update(trainer=lessons[1].trainer)
+        with mock.patch.object(leaderboards, 'get_backend', return_value=leaderboards.DatabaseBackend()):
+            self.assertFalse(leaderboards.leaderboards_ready())
+            self.assertEqual(
+                leaderboards.top(leaderboards.TRAINERS, window=7),
+                [(lessons[1].trainer_id, 2), (lessons[0].trainer_id, 1)],
+            )
+            self.assertEqual(
+                leaderboards.scores(leaderboards.TRAINERS, members=[lessons[0].trainer_id]),
+                {lessons[0].trainer_id: 1},
+            )
+
+    def test_trainer_list_reads_page_scores(self) -> None:
+        """
+        Список тренеров запрашивает количество занятий только для тренеров страницы.
+        """
+        from unittest import mock
+        from . import leaderboards
+
+        create_lesson_fixtures(2)
+        leaderboards.rebuild_leaderboards()
+        with mock.patch.object(leaderboards, 'scores', wraps=leaderboards.scores) as scores:
+            response = self.client.get('/api/trainers/?page=2&fields=id,lessons_count')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        scores.assert_not_called()
+        with mock.patch.object(leaderboards, 'scores', wraps=leaderboards.scores) as scores:
+            response = self.client.get('/api/trainers/?fields=id,lessons_count')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        page_ids = [trainer['id'] for trainer in response.data['results']]
+        scores.assert_called_once_with(leaderboards.TRAINERS, members=page_ids)
+        self.assertEqual([trainer['lessons_count'] for trainer in response.data['results']], [1, 1])
+
+
+class ConditionalGetTests(APITestCase):
+    """
+    Тесты ETag / Last-Modified для API.
+    """
+
+    def test_not_modified_without_queries(self) -> None:
+        """
+        Совпавший ETag даёт 304 без обращений к базе данных.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        create_lesson_fixtures(2)
+        for url in QueryPlannerTests.ENDPOINTS:
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, status.HTTP_200_OK)
+            self.assertIn('ETag', first)
+            with CaptureQueriesContext(connection) as ctx:
+                second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(app_queries(ctx.captured_queries), [])
+
+    def test_change_invalidates_etag(self) -> None:
+        """
+        Изменение модели-зависимости меняет ETag.
+        """
+        lesson = create_lesson_fixtures(1)[0]
+        etag = self.client.get('/api/horses/')['ETag']
+        lesson.horse.trainers.add(lesson.trainer, through_defaults={'start_date': timezone.now().date()})
+        HorseTrainerRelation.objects.filter(horse=lesson.horse).delete()
+        response = self.client.get('/api/horses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since(self) -> None:
+        """
+        If-Modified-Since учитывается при отсутствии If-None-Match.
+        """
+        import time
+        from unittest import mock
+
+        create_lesson_fixtures(1)
+        with mock.patch('core.mixins.time.time', return_value=time.time() + 2):
+            first = self.client.get('/api/payments/')
+            second = self.client.get('/api/payments/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(second.status_code, status.HTTP_304_NOT_MODIFIED)
+            # If-None-Match решает сам по себе, даже если If-Modified-Since совпал
+            third = self.client.get(
+                '/api/payments/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'], HTTP_IF_NONE_MATCH='"stale"'
+            )
+            self.assertEqual(third.status_code, status.HTTP_200_OK)
+
+    def test_no_last_modified_within_current_second(self) -> None:
+        """
+        Last-Modified не выдаётся, пока не закончилась секунда последнего изменения.
+        """
+        from unittest import mock
+        from django.core.cache import cache
+
+        from .caching import version_key
+
+        create_lesson_fixtures(1)
+        versions = self.client.get('/api/payments/')
+        self.assertIn('ETag', versions)
+        current = cache.get(version_key(Payment)) // 1_000_000
+        with mock.patch('core.mixins.time.time', return_value=current + 0.5):
+            response = self.client.get('/api/payments/')
+        self.assertNotIn('Last-Modified', response)
+
+    def test_disabled_without_shared_cache(self) -> None:
+        """
+        Без общего кэша валидаторы не выдаются и 304 не отдаётся.
+        """
+        from django.test.utils import override_settings
+
+        create_lesson_fixtures(1)
+        with override_settings(SHARED_CACHE=False):
+            response = self.client.get('/api/payments/', HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_save_survives_cache_outage(self) -> None:
+        """
+        Недоступный кэш не ломает сохранение модели: ошибка версий только записывается в журнал.
+        """
+        from unittest import mock
+        from django.core.cache import cache
+
+        with mock.patch.object(cache, 'set_many', side_effect=ConnectionError('cache down')), \
+                self.assertLogs('core.caching', level='WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                horse = Horse.objects.create(name='Без кэша', gender='male')
+        self.assertTrue(Horse.objects.filter(pk=horse.pk).exists())
+        self.assertIn('Не удалось обновить версии моделей', logs.output[0])
+
+
+class ResponseCacheTests(APITestCase):
+    """
+    Тесты кэша ответов списков.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        create_lesson_fixtures(2)
+
+    def test_repeated_list_served_from_cache(self) -> None:
+        """
+        Повторный запрос списка отдаётся из кэша без обращений к базе данных.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for url in QueryPlannerTests.ENDPOINTS:
+            first = self.client.get(url)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            with CaptureQueriesContext(connection) as ctx:
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(second['X-Cache'], 'HIT')
+            self.assertEqual(second.content, first.content)
+            self.assertIn('ETag', second)
+            self.assertEqual(app_queries(ctx.captured_queries), [])
+
+    def test_normalized_query_string(self) -> None:
+        """
+        Порядок параметров, пустые фильтры и page=1 не меняют ключ кэша.
+        """
+        self.client.get('/api/horses/?gender=female&ordering=name&search=')
+        response = self.client.get('/api/horses/?ordering=name&page=1&gender=female&name=')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        response = self.client.get('/api/horses/?ordering=-name&gender=female')
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+    def test_change_invalidates_cache(self) -> None:
+        """
+        Сохранение модели-зависимости делает закэшированный ответ неактуальным.
+        """
+        self.client.get('/api/trainers/')
+        trainer = Trainer.objects.first()
+        trainer.first_name = 'Переименованный'
+        trainer.save()
+        response = self.client.get('/api/trainers/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Переименованный')
+
+    def test_browsable_api_not_cached(self) -> None:
+        """
+        HTML-представление API (с CSRF-токенами) не кэшируется.
+        """
+        self.client.get('/api/news/', HTTP_ACCEPT='text/html')
+        response = self.client.get('/api/news/', HTTP_ACCEPT='text/html')
+        self.assertNotIn('X-Cache', response)
+
+    def test_disabled_without_shared_cache(self) -> None:
+        """
+        Без общего кэша ответы не кэшируются (версии в памяти процесса устаревают).
+        """
+        from django.test.utils import override_settings
+
+        with override_settings(SHARED_CACHE=False):
+            self.client.get('/api/trainers/')
+            response = self.client.get('/api/trainers/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Cache', response)
+
+
+class FullTextSearchTests(APITestCase):
+    """
+    Тесты полнотекстового поиска.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        self.horse = Horse.objects.create(
+            name='Звезда', name_en='Star', gender='female',
+            description='Спокойная лошадь для начинающих всадников',
+        )
+        self.trainer = Trainer.objects.create(
+            first_name='Анна', last_name='Петрова', first_name_en='Anna', last_name_en='Petrova',
+            bio='Тренирует лошадей по выездке', experience_years=5,
+        )
+        self.news = NewsPost.objects.create(title='Соревнования по выездке', content='<p>Прошли летние старты</p>')
+
+    def test_backend_introspection_cached(self) -> None:
+        """
+        Наличие таблицы FTS5 проверяется один раз до следующей миграции.
+        """
+        from django.apps import apps
+        from django.db import connection
+        from django.db.models.signals import post_migrate
+        from django.test.utils import CaptureQueriesContext
+
+        from .search import _fts_available, search
+
+        search('лошадь')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertTrue(search('лошадь'))
+        self.assertFalse([q for q in ctx.captured_queries if 'sqlite_master' in q['sql']])
+
+        post_migrate.send(
+            sender=apps.get_app_config('core'), app_config=apps.get_app_config('core'),
+            verbosity=0, interactive=False, using='default', apps=apps, plan=[],
+        )
+        self.assertEqual(_fts_available.cache_info().currsize, 0)
+
+    def test_russian_stemming(self) -> None:
+        """
+        Словоформы приводятся к одной основе.
+        """
+        from .search import query_terms
+
+        self.assertEqual(len(set(query_terms('лошадь лошади лошадей лошадям'))), 1)
+        self.assertEqual(query_terms('Выездка выездке'), query_terms('выездку'))
+
+    def test_postgresql_query_not_stemmed_twice(self) -> None:
+        """
+        В to_tsquery передаются исходные слова: основы строит словарь PostgreSQL.
+        """
+        from .search import PostgreSQLBackend, query_tokens
+
+        words = PostgreSQLBackend.words(query_tokens('Лошадями лошадями по выездке'))
+        self.assertEqual(PostgreSQLBackend.tsquery(words), 'лошадями:* & по:* & выездке:*')
+        self.assertEqual(PostgreSQLBackend.tsquery(words[:1], body_only=True), 'лошадями:*B')
+
+    def test_unified_search_ranked(self) -> None:
+        """
+        Поиск по всем моделям; совпадение в заголовке выше совпадения в тексте.
+        """
+        response = self.client.get('/api/search/', {'q': 'выездка'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['results']
+        self.assertEqual([(r['type'], r['id']) for r in results], [('news', self.news.id), ('trainer', self.trainer.id)])
+        self.assertTrue(results[0]['url'].endswith(f'/api/news/{self.news.id}/'))
+        self.assertNotIn('<p>', results[0]['snippet'])
+
+    def test_english_fields_and_type(self) -> None:
+        """
+        Английские поля индексируются; параметр type ограничивает модели.
+        """
+        response = self.client.get('/api/search/', {'q': 'star'})
+        self.assertEqual([r['id'] for r in response.json()['results']], [self.horse.id])
+        response = self.client.get('/api/search/', {'q': 'petrova', 'type': 'horse'})
+        self.assertEqual(response.json()['results'], [])
+        self.assertEqual(self.client.get('/api/search/').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'lesson'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filters_use_index(self) -> None:
+        """
+        Фильтры по тексту и параметр search используют поисковый индекс.
+        """
+        response = self.client.get('/api/horses/', {'description': 'всадникам'})
+        self.assertEqual([h['id'] for h in response.json()['results']], [self.horse.id])
+        response = self.client.get('/api/trainers/', {'bio': 'лошади'})
+        self.assertEqual([t['id'] for t in response.json()['results']], [self.trainer.id])
+        # Фильтр bio ищет только по биографии, не по имени
+        response = self.client.get('/api/trainers/', {'bio': 'Анна'})
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get('/api/horses/', {'search': 'звезды'})
+        self.assertEqual([h['id'] for h in response.json()['results']], [self.horse.id])
+        response = self.client.get('/api/news/', {'content': 'старт'})
+        self.assertEqual([n['id'] for n in response.json()['results']], [self.news.id])
+
+    def test_index_follows_changes(self) -> None:
+        """
+        Документы обновляются при сохранении и удаляются вместе с объектом.
+        """
+        from .search import rebuild_index, search
+
+        self.horse.description = 'Резвая кобыла'
+        self.horse.save()
+        self.assertEqual(search('спокойная'), [])
+        self.assertEqual([hit.object_id for hit in search('резвую')], [self.horse.id])
+        self.news.is_active = False
+        self.news.save()
+        self.assertEqual([hit.kind for hit in search('выездка')], ['trainer'])
+        self.trainer.delete()
+        self.assertEqual(search('выездка'), [])
+        self.assertEqual(rebuild_index(), 2)
+        self.assertEqual([hit.object_id for hit in search('резвая')], [self.horse.id])
+
+
+class AutocompleteTests(APITestCase):
+    """
+    Тесты автодополнения имён.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        from . import autocomplete
+
+        cache.clear()
+        autocomplete.reset()
+        self.horse = Horse.objects.create(name='Звёздочка', name_en='Starlet', gender='female')
+        self.other = Horse.objects.create(name='Гром', name_en='Thunder', gender='male')
+        self.trainer = Trainer.objects.create(
+            first_name='Анна', last_name='Звягинцева', first_name_en='Anna', last_name_en='Zvyagintseva',
+            bio='Тренер', experience_years=5,
+        )
+
+    def suggest(self, **params: Any) -> dict:
+        response = self.client.get('/api/autocomplete/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_prefix_matches(self) -> None:
+        """
+        Поиск по началу имени, слова имени и английского имени.
+        """
+        data = self.suggest(q='зв')
+        self.assertFalse(data['fuzzy'])
+        self.assertEqual([(r['type'], r['id']) for r in data['results']], [('horse', self.horse.id), ('trainer', self.trainer.id)])
+        self.assertEqual([r['id'] for r in self.suggest(q='thun')['results']], [self.other.id])
+        self.assertEqual([r['id'] for r in self.suggest(q='зв', type='trainer')['results']], [self.trainer.id])
+
+    def test_trigram_fallback(self) -> None:
+        """
+        При опечатке используется нечёткий поиск по триграммам.
+        """
+        data = self.suggest(q='Звездачка')
+        self.assertTrue(data['fuzzy'])
+        self.assertEqual([r['id'] for r in data['results']], [self.horse.id])
+
+    def test_served_from_memory(self) -> None:
+        """
+        Повторные запросы не обращаются к базе данных.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.suggest(q='г')
+        with CaptureQueriesContext(connection) as ctx:
+            self.suggest(q='гр')
+        self.assertEqual(app_queries(ctx.captured_queries), [])
+
+    def test_incremental_updates(self) -> None:
+        """
+        Изменения применяются из журнала без полной пересборки индекса.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from . import autocomplete
+
+        self.suggest(q='а')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.name = 'Ураган'
+            self.other.save()
+            Trainer.objects.create(first_name='Ольга', last_name='Урусова', bio='Тренер', experience_years=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.horse.delete()
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.suggest(q='ур')
+        # Догружаются только изменённые лошади и тренеры
+        self.assertEqual(len([q for q in app_queries(ctx.captured_queries) if q.startswith('SELECT')]), 2)
+        self.assertEqual([r['label'] for r in data['results']], ['Ураган', 'Ольга Урусова'])
+        self.assertEqual(self.suggest(q='звёздочка')['results'], [])
+        self.assertEqual(autocomplete._state.sequence, 3)
+
+    def test_change_in_flight(self) -> None:
+        """
+        Номер изменения без записи (запись ещё идёт) не вызывает пересборку индекса.
+        """
+        from unittest import mock
+        from django.core.cache import cache
+
+        from . import autocomplete
+
+        self.suggest(q='а')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.name = 'Ураган'
+            self.other.save()
+        cache.delete(f"{autocomplete.CHANGE_KEY_PREFIX}:1")
+        with mock.patch.object(autocomplete.AutocompleteState, 'rebuild', wraps=autocomplete._state.rebuild) as rebuild:
+            self.assertEqual(self.suggest(q='ур')['results'], [])
+            rebuild.assert_not_called()
+            cache.set(f"{autocomplete.CHANGE_KEY_PREFIX}:1", (autocomplete.HORSE, self.other.pk))
+            self.assertEqual([r['label'] for r in self.suggest(q='ур')['results']], ['Ураган'])
+            rebuild.assert_not_called()
+
+    def test_lost_change_rebuilds_after_grace(self) -> None:
+        """
+        Запись, не появившаяся за JOURNAL_GAP_GRACE секунд, считается потерянной.
+        """
+        import time
+        from unittest import mock
+        from django.core.cache import cache
+
+        from . import autocomplete
+
+        self.suggest(q='а')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.name = 'Ураган'
+            self.other.save()
+        cache.delete(f"{autocomplete.CHANGE_KEY_PREFIX}:1")
+        self.assertEqual(self.suggest(q='ур')['results'], [])
+        later = time.monotonic() + autocomplete.JOURNAL_GAP_GRACE + 1
+        with mock.patch('core.autocomplete.time.monotonic', return_value=later):
+            self.assertEqual([r['label'] for r in self.suggest(q='ур')['results']], ['Ураган'])
+        self.assertEqual(autocomplete._state.sequence, 1)
+
+    def test_without_shared_cache(self) -> None:
+        """
+        Без общего кэша индекс процесса пересобирается только при изменении версий моделей.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext, override_settings
+
+        with override_settings(SHARED_CACHE=False):
+            self.suggest(q='а')
+            with CaptureQueriesContext(connection) as ctx:
+                self.suggest(q='зв')
+            self.assertEqual(app_queries(ctx.captured_queries), [])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other.name = 'Ураган'
+                self.other.save()
+            self.assertEqual([r['label'] for r in self.suggest(q='ур')['results']], ['Ураган'])
+
+    def test_local_index_expires(self) -> None:
+        """
+        Без общего кэша изменения других процессов видны после LOCAL_INDEX_MAX_AGE.
+        """
+        from django.test.utils import override_settings
+
+        from . import autocomplete
+
+        with override_settings(SHARED_CACHE=False):
+            self.suggest(q='а')
+            Horse.objects.filter(pk=self.other.pk).update(name='Ураган')
+            self.assertEqual(self.suggest(q='ур')['results'], [])
+            autocomplete._state.built_at -= autocomplete.LOCAL_INDEX_MAX_AGE + 1
+            self.assertEqual([r['label'] for r in self.suggest(q='ур')['results']], ['Ураган'])
+
+    def test_save_survives_cache_outage(self) -> None:
+        """
+        Недоступный кэш не ломает сохранение: ошибка журнала только записывается в журнал приложения.
+        """
+        from unittest import mock
+        from django.core.cache import cache
+
+        with mock.patch.object(cache, 'incr', side_effect=ConnectionError('cache down')), \
+                self.assertLogs('core.autocomplete', level='WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other.name = 'Ураган'
+                self.other.save()
+        self.assertIn('Не удалось записать изменение автодополнения', logs.output[0])
+        self.assertEqual(Horse.objects.get(pk=self.other.pk).name, 'Ураган')
+
+
+class SparseFieldsetTests(APITestCase):
+    """
+    Тесты параметров fields/omit.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        create_lesson_fixtures(3)
+
+    def get_with_queries(self, url: str, params: dict) -> tuple[Any, list[str]]:
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), app_queries(ctx.captured_queries)
+
+    def test_fields_trim_output_and_columns(self) -> None:
+        """
+        fields оставляет только запрошенные поля и не загружает лишние столбцы и связи.
+        """
+        data, queries = self.get_with_queries('/api/horses/', {'fields': 'id,name'})
+        self.assertEqual(set(data['results'][0]), {'id', 'name'})
+        self.assertFalse(any('description' in sql for sql in queries))
+        self.assertFalse(any('horsetrainerrelation' in sql for sql in queries))
+
+    def test_omit(self) -> None:
+        """
+        omit исключает поля из полного набора.
+        """
+        data, queries = self.get_with_queries('/api/news/', {'omit': 'content,image,attachment,author_name'})
+        self.assertNotIn('content', data['results'][0])
+        self.assertIn('title', data['results'][0])
+        self.assertFalse(any('"core_newspost"."content"' in sql for sql in queries))
+        self.assertFalse(any('auth_user' in sql for sql in queries))
+
+    def test_relations_skipped(self) -> None:
+        """
+        Неподключённые связи не дают JOIN, а данные контекста не вычисляются.
+        """
+        data, queries = self.get_with_queries('/api/lessons/', {'fields': 'id,horse_name'})
+        self.assertEqual(set(data['results'][0]), {'id', 'horse_name'})
+        self.assertTrue(any('core_horse' in sql for sql in queries))
+        self.assertFalse(any('core_trainer' in sql or 'auth_user' in sql for sql in queries))
+        self.assertFalse(any('core_pricestatistics' in sql for sql in queries))
+
+        full, full_queries = self.get_with_queries('/api/trainers/', {})
+        lean, lean_queries = self.get_with_queries('/api/trainers/', {'fields': 'id,full_name'})
+        self.assertEqual(set(lean['results'][0]), {'id', 'full_name'})
+        self.assertLess(len(lean_queries), len(full_queries))
+
+    def test_unknown_field(self) -> None:
+        """
+        Неизвестное поле даёт ошибку 400.
+        """
+        response = self.client.get('/api/payments/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchAPITests(APITestCase):
+    """
+    Тесты пакетного API.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        create_lesson_fixtures(2)
+
+    def batch(self, requests: Any) -> Any:
+        return self.client.post('/api/batch/', {'requests': requests}, format='json')
+
+    def test_combined_response_matches_individual(self) -> None:
+        """
+        Подзапросы возвращают те же данные, что и отдельные запросы.
+        """
+        paths = ['/api/news/', '/api/trainers/?fields=id,full_name', '/api/horses/?ordering=-name']
+        response = self.batch([{'id': f'r{index}', 'path': path} for index, path in enumerate(paths)])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        items = response.json()['responses']
+        self.assertEqual([item['id'] for item in items], ['r0', 'r1', 'r2'])
+        for path, item in zip(paths, items):
+            self.assertEqual(item['status'], 200)
+            self.assertEqual(item['body'], self.client.get(path).json())
+
+    def test_errors_per_item(self) -> None:
+        """
+        Ошибки подзапросов не прерывают пакет.
+        """
+        items = self.batch([
+            {'path': '/api/missing/'},
+            {'path': '/admin/'},
+            {'path': '/api/horses/999999/'},
+            {'path': '/api/payments/?fields=bogus'},
+            {'path': '/api/batch/'},
+        ]).json()['responses']
+        self.assertEqual([item['status'] for item in items], [404, 400, 404, 400, 400])
+        self.assertEqual(items[0]['id'], 0)
+
+    def test_streaming_and_non_json_rejected_per_item(self) -> None:
+        """
+        Потоковая выгрузка и ответ не в JSON дают ошибку своего подзапроса, а не всего пакета.
+        """
+        from unittest import mock
+
+        from django.http import HttpResponse
+
+        from .views import HorseViewSet
+
+        items = self.batch([{'path': '/api/lessons/export/'}, {'path': '/api/news/'}]).json()['responses']
+        self.assertEqual([item['status'] for item in items], [400, 200])
+
+        with mock.patch.object(HorseViewSet, 'list', lambda *args, **kwargs: HttpResponse('<html></html>')):
+            response = self.batch([{'path': '/api/horses/'}, {'path': '/api/trainers/'}])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in response.json()['responses']], [502, 200])
+
+    def test_validation(self) -> None:
+        """
+        Некорректное тело и слишком большой пакет отклоняются.
+        """
+        self.assertEqual(self.batch([]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch([{'id': 1}]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.batch([{'path': '/api/news/'}] * 11).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(APITestCase):
+    """
+    Тесты потоковой выгрузки занятий и платежей.
+    """
+
+    def setUp(self) -> None:
+        self.lessons = create_lesson_fixtures(5)
+
+    def test_ndjson_export_honours_filters(self) -> None:
+        """
+        NDJSON-выгрузка учитывает фильтры списка.
+        """
+        import json
+
+        response = self.client.get('/api/lessons/export/', {'price_min': 1002})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(row['price'] for row in rows), ['1002.00', '1003.00', '1004.00'])
+        self.assertEqual(rows[0]['horse_name'], Lesson.objects.get(pk=rows[0]['id']).horse.name)
+
+    def test_csv_export(self) -> None:
+        """
+        CSV-выгрузка содержит заголовок и строку на каждый платёж.
+        """
+        import csv
+
+        response = self.client.get('/api/payments/export/', {'export_format': 'csv', 'ordering': 'amount'})
+        self.assertIn('attachment; filename="payment-', response['Content-Disposition'])
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:4], ['id', 'timestamp', 'status', 'amount'])
+        self.assertEqual(len(rows), 6)
+
+    def test_gzip_and_chunks(self) -> None:
+        """
+        Ответ сжимается gzip на лету и отдаётся пачками строк.
+        """
+        import gzip
+        from unittest import mock
+
+        from .views import LessonViewSet
+
+        with mock.patch.object(LessonViewSet, 'export_chunk_size', 2):
+            response = self.client.get('/api/lessons/export/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(len(gzip.decompress(b''.join(chunks)).decode().splitlines()), 5)
+
+    def test_unknown_format(self) -> None:
+        """
+        Неизвестный формат выгрузки даёт ошибку 400.
+        """
+        response = self.client.get('/api/lessons/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RendererTests(APITestCase):
+    """
+    Тесты рендереров orjson и MessagePack.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        create_lesson_fixtures(3)
+
+    def test_orjson_matches_drf_renderer(self) -> None:
+        """
+        orjson выдаёт те же байты, что и стандартный JSONRenderer (Decimal, даты, вложенные объекты).
+        """
+        from rest_framework.renderers import JSONRenderer
+
+        from .management.commands.benchmark_renderers import build_pages
+        from .renderers import ORJSONRenderer
+
+        for page in build_pages(20).values():
+            self.assertEqual(ORJSONRenderer().render(page), JSONRenderer().render(page))
+        response = self.client.get('/api/lessons/')
+        self.assertEqual(response.content, JSONRenderer().render(response.json()))
+
+    def test_msgpack_response(self) -> None:
+        """
+        Ответ в MessagePack совпадает по данным с JSON и тоже кэшируется.
+        """
+        import msgpack
+
+        expected = self.client.get('/api/lessons/').json()
+        first = self.client.get('/api/lessons/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(first['Content-Type'], 'application/msgpack')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(msgpack.unpackb(first.content), expected)
+        second = self.client.get('/api/lessons/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second['Content-Type'], 'application/msgpack')
+        self.assertEqual(second.content, first.content)
+
+
+class ValuesFastPathTests(APITestCase):
+    """
+    Тесты быстрого чтения списков через values().
+    """
+    URLS = [
+        '/api/lessons/',
+        '/api/lessons/?ordering=price&page_size=2&page=2',
+        '/api/lessons/?fields=id,trainer_name,is_expensive',
+        '/api/lessons/?omit=date&cursor=&page_size=2',
+        '/api/lessons/?ordering=-price&price_min=1001',
+        '/api/payments/',
+        '/api/payments/?ordering=amount&cursor=&page_size=2',
+        '/api/payments/?fields=user_name,amount',
+    ]
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        from .stats import reconcile_price_statistics
+
+        cache.clear()
+        self.lessons = create_lesson_fixtures(4)
+        Payment.objects.filter(lesson=self.lessons[0]).update(reference_id='TX-1')
+        reconcile_price_statistics()
+
+    def fetch(self, url: str, fast: bool) -> bytes:
+        from django.core.cache import cache
+        from unittest import mock
+
+        from .mixins import ValuesListMixin
+
+        cache.clear()
+        with mock.patch.object(ValuesListMixin, 'values_fast_path', fast):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        return response.content
+
+    def test_matches_full_serializer(self) -> None:
+        """
+        Ответ быстрого режима побайтно совпадает с ответом полного сериализатора.
+        """
+        for url in self.URLS:
+            self.assertEqual(self.fetch(url, True), self.fetch(url, False), url)
+
+    def test_cursor_pages_match(self) -> None:
+        """
+        Ссылки курсорной пагинации строятся по строкам values() так же, как по объектам.
+        """
+        import json
+
+        url = '/api/lessons/?ordering=price&cursor=&page_size=3'
+        next_url = json.loads(self.fetch(url, True))['next']
+        self.assertEqual(self.fetch(next_url, True), self.fetch(next_url, False))
+        self.assertEqual(len(json.loads(self.fetch(next_url, True))['results']), 1)
+
+    def test_single_query_without_model_objects(self) -> None:
+        """
+        Страница читается одним запросом values(), детальный просмотр — полным сериализатором.
+        """
+        from unittest import mock
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .serializers import LessonSerializer
+
+        with mock.patch.object(LessonSerializer, 'get_horse_name') as get_horse_name, \
+                CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/lessons/?cursor=')
+        get_horse_name.assert_not_called()
+        lesson_queries = [sql for sql in app_queries(ctx.captured_queries) if 'FROM "core_lesson"' in sql]
+        self.assertEqual(len(lesson_queries), 1)
+        response = self.client.get(f'/api/lessons/{self.lessons[0].pk}/')
+        self.assertEqual(response.json()['horse_name'], self.lessons[0].horse.name)
+
+
+class CompressionTests(APITestCase):
+    """
+    Тесты сжатия ответов.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        create_lesson_fixtures(5)
+
+    def test_choose_encoding(self) -> None:
+        """
+        Кодировка выбирается по Accept-Encoding с учётом q-значений.
+        """
+        from .compression import choose_encoding
+
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding(''))
+
+    def test_cached_response_compressed_once(self) -> None:
+        """
+        Сжатый вариант хранится в кэше рядом с ответом и не сжимается повторно.
+        """
+        import brotli
+        import gzip
+        from unittest import mock
+
+        plain = self.client.get('/api/lessons/')
+        self.assertNotIn('Content-Encoding', plain)
+        first = self.client.get('/api/lessons/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(first['X-Cache'], 'HIT')
+        self.assertEqual(first['Content-Encoding'], 'br')
+        self.assertTrue(first['ETag'].startswith('W/'))
+        self.assertIn('Accept-Encoding', first['Vary'])
+        self.assertEqual(brotli.decompress(first.content), plain.content)
+        with mock.patch('core.compression.compress') as compress, \
+                mock.patch('core.middleware.compress') as middleware_compress:
+            second = self.client.get('/api/lessons/', HTTP_ACCEPT_ENCODING='br')
+        compress.assert_not_called()
+        middleware_compress.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        gzipped = self.client.get('/api/lessons/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(gzip.decompress(gzipped.content), plain.content)
+
+    def test_html_and_small_responses(self) -> None:
+        """
+        HTML-страницы сжимаются, короткие ответы отдаются как есть.
+        """
+        import gzip
+
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'<', gzip.decompress(response.content))
+        response = self.client.get('/api/lessons/?page_size=1&fields=id', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_csrf_pages_padded(self) -> None:
+        """
+        Страница с формой и CSRF-токеном сжимается только gzip со случайной длиной (BREACH).
+        """
+        import gzip
+
+        from django.conf import settings
+
+        lengths = set()
+        for _attempt in range(10):
+            response = self.client.get('/admin/login/', HTTP_ACCEPT_ENCODING='br, gzip')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            # Дополнение — случайное имя файла в заголовке gzip (флаг FNAME)
+            self.assertTrue(response.content[3] & gzip.FNAME)
+            self.assertIn(b'csrfmiddlewaretoken', gzip.decompress(response.content))
+            lengths.add(len(response.content))
+        self.assertGreater(len(lengths), 1)
+
+        response = self.client.get('/admin/login/', HTTP_ACCEPT_ENCODING='br')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertIn(b'csrfmiddlewaretoken', response.content)
+
+    def test_streaming_brotli(self) -> None:
+        """
+        Потоковая выгрузка сжимается brotli по фрагментам.
+        """
+        import brotli
+
+        response = self.client.get('/api/lessons/export/', HTTP_ACCEPT_ENCODING='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertNotIn('Content-Length', response)
+        body = brotli.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(body.decode().splitlines()), 5)
+
+
+class AsyncAPITests(APITestCase):
+    """
+    Тесты асинхронных представлений API.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        from .stats import reconcile_price_statistics
+
+        cache.clear()
+        self.lessons = create_lesson_fixtures(5)
+        reconcile_price_statistics()
+
+    def test_lists_match_sync_api(self) -> None:
+        """
+        Асинхронные списки совпадают с синхронным API (фильтры, поля, страницы).
+        """
+        for query in ['', '?page_size=2&page=2', '?page_size=2&page=3', '?ordering=-price&fields=id,is_expensive']:
+            sync = self.client.get(f'/api/lessons/{query}')
+            response = self.client.get(f'/api/async/lessons/{query}')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content.replace(b'/api/async/', b'/api/'), sync.content, query)
+        for resource, query in [('news', ''), ('trainers', '?search=Тренер'), ('horses', '?gender=male&ordering=-name')]:
+            sync = self.client.get(f'/api/{resource}/{query}')
+            response = self.client.get(f'/api/async/{resource}/{query}')
+            self.assertEqual(response.content, sync.content, resource)
+
+    def test_detail_and_errors(self) -> None:
+        """
+        Детальный просмотр, 404 и ошибки параметров.
+        """
+        lesson = self.lessons[0]
+        response = self.client.get(f'/api/async/lessons/{lesson.pk}/')
+        self.assertEqual(response.json(), self.client.get(f'/api/lessons/{lesson.pk}/').json())
+        self.assertEqual(self.client.get('/api/async/horses/999999/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/async/lessons/?page=9').status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.get('/api/async/lessons/?fields=unknown')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.json())
+
+    async def test_async_client(self) -> None:
+        """
+        Представление работает в асинхронном режиме (ASGI).
+        """
+        from django.test import AsyncClient
+
+        response = await AsyncClient().get('/api/async/horses/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 5)
+
+    def test_loadtest_summary(self) -> None:
+        """
+        Сводка нагрузочного замера: перцентили по успешным запросам.
+        """
+        from .loadtest import Result, percentile, summarize
+
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99)], [50.0, 95.0, 99.0])
+        results = [Result(value / 1000, 200) for value in values] + [Result(5.0, error='timeout')]
+        summary = summarize(results, elapsed=2.0)
+        self.assertEqual((summary['requests'], summary['errors'], summary['rps']), (101, 1, 50.0))
+        self.assertEqual(summary['max'], 100.0)
+
+
+class HomeCountersTests(TestCase):
+    """
+    Тесты счётчиков и кэша главной страницы.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lessons = create_lesson_fixtures(3)
+
+    def test_steady_state_without_queries(self) -> None:
+        """
+        Повторный запрос главной страницы не обращается к базе данных.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        first = self.client.get('/')
+        self.assertContains(first, 'Лошадей: 3')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/')
+        self.assertEqual(app_queries(ctx.captured_queries), [])
+        self.assertEqual(second.content, first.content)
+
+    def test_signals_update_counters(self) -> None:
+        """
+        Создание, изменение и удаление объектов меняют счётчики без COUNT(*).
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .counters import get_counters
+
+        self.assertEqual(get_counters(), {'horses': 3, 'trainers': 3, 'news': 3, 'lessons': 3, 'payments': 3})
+        news = NewsPost.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Horse.objects.create(name='Новая', gender='female')
+            news.is_active = False
+            news.save()
+            self.lessons[0].delete()
+        with CaptureQueriesContext(connection) as ctx:
+            values = get_counters()
+        self.assertEqual(app_queries(ctx.captured_queries), [])
+        self.assertEqual(values, {'horses': 4, 'trainers': 3, 'news': 2, 'lessons': 2, 'payments': 2})
+        self.assertContains(self.client.get('/'), 'Новостей: 2')
+
+    def test_reconcile_after_bulk_update(self) -> None:
+        """
+        Сверка исправляет счётчики после изменений в обход сигналов.
+        """
+        from .counters import get_counters, reconcile_counters
+
+        self.assertEqual(get_counters()['news'], 3)
+        NewsPost.objects.update(is_active=False)
+        self.assertEqual(get_counters()['news'], 3)
+        self.assertEqual(reconcile_counters()['news'], 0)
+        self.assertContains(self.client.get('/'), 'Новостей: 0')
+
+    def test_database_without_shared_cache(self) -> None:
+        """
+        Без общего кэша счётчики считаются по базе данных.
+        """
+        from django.test.utils import override_settings
+
+        from .counters import get_counters
+
+        self.assertEqual(get_counters()['news'], 3)
+        NewsPost.objects.update(is_active=False)
+        with override_settings(SHARED_CACHE=False):
+            self.assertEqual(get_counters()['news'], 0)
+            self.assertContains(self.client.get('/'), 'Новостей: 0')
+
+    def test_cache_outage(self) -> None:
+        """
+        При недоступном кэше сохранение проходит, а счётчики считаются по базе данных.
+        """
+        from unittest import mock
+        from django.core.cache import cache
+
+        from .counters import get_counters
+
+        down = ConnectionError('cache down')
+        with mock.patch.object(cache, 'incr', side_effect=down), \
+                self.assertLogs('core.counters', level='WARNING') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                NewsPost.objects.filter(is_active=True).first().delete()
+        self.assertIn('Не удалось изменить счётчик news', logs.output[0])
+        self.assertEqual(NewsPost.objects.filter(is_active=True).count(), 2)
+
+        with mock.patch.object(cache, 'get_many', side_effect=down), \
+                self.assertLogs('core.counters', level='WARNING'):
+            self.assertEqual(get_counters()['news'], 2)
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Тесты планов запросов: запросы API и задач Celery используют индексы.
+    """
+
+    ENDPOINTS = [
+        '/api/news/',
+        '/api/news/?published_after=2020-01-01',
+        '/api/lessons/',
+        '/api/lessons/?status=scheduled',
+        '/api/lessons/?status=completed&date_after=2020-01-01',
+        '/api/lessons/?date_after=2020-01-01&date_before=2030-01-01',
+        '/api/payments/',
+        '/api/payments/?status=completed',
+        '/api/payments/?timestamp_after=2020-01-01',
+    ]
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        self.lessons = create_lesson_fixtures(5)
+        # Завтрашнее занятие и старая неактивная новость для задач очистки и напоминаний
+        Lesson.objects.filter(pk=self.lessons[0].pk).update(date=timezone.now() + timezone.timedelta(days=1))
+        NewsPost.objects.create(
+            title='Старая новость', content='Текст', is_active=False,
+            created_at=timezone.now() - timezone.timedelta(days=400),
+        )
+
+    def assertNoRegressions(self, recorder: Any) -> None:
+        regressions = recorder.regressions()
+        self.assertEqual(regressions, [], '\n\n'.join(str(plan) for plan in regressions))
+
+    def test_viewset_queries_use_indexes(self) -> None:
+        """
+        Списки API не читают таблицы занятий, платежей и новостей целиком.
+        """
+        from .explain import PlanRecorder
+
+        with PlanRecorder() as recorder:
+            for url in self.ENDPOINTS:
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+        self.assertTrue(recorder.plans)
+        self.assertNoRegressions(recorder)
+
+    def test_task_queries_use_indexes(self) -> None:
+        """
+        Запросы периодических задач используют индексы.
+        """
+        from . import tasks
+        from .explain import PlanRecorder
+
+        with PlanRecorder() as recorder:
+            tasks.daily_cleanup()
+            tasks.weekly_reports()
+            tasks.monthly_analytics()
+            tasks.send_lesson_reminders()
+        self.assertTrue(any('"core_payment"' in plan.sql for plan in recorder.plans))
+        self.assertNoRegressions(recorder)
+
+    def test_full_scan_detected(self) -> None:
+        """
+        Фильтр по неиндексированному полю считается регрессией, подсчёт всех строк — нет.
+        """
+        from .explain import PlanRecorder
+
+        with PlanRecorder() as recorder:
+            list(Lesson.objects.filter(price__gt=0))
+            list(Lesson.objects.filter(price__gt=0)[:5])
+            Lesson.objects.count()
+            list(Horse.objects.filter(pk__in=Lesson.objects.filter(price__gt=0).values('horse_id')))
+        regressions = recorder.regressions()
+        self.assertEqual(len(regressions), 2)
+        self.assertEqual(regressions[0].full_scans, ['core_lesson'])
+        self.assertIn('core_lesson', regressions[1].full_scans)
+
+
+class QueryBudgetTests(APITestCase):
+    """
+    Тесты бюджета SQL-запросов и времени ответа на наборах данных разного размера.
+
+    Наборы добавляются друг к другу (small, затем medium, затем large);
+    на каждом размере число запросов не должно превышать бюджет
+    и должно совпадать с остальными размерами.
+    """
+
+    SIZES = {'small': 2, 'medium': 10, 'large': 30}
+    # Предельное время одного запроса API/админки или задачи, с
+    MAX_SECONDS = 2.0
+
+    # Бюджеты включают запросы сессии и пользователя админки
+    ENDPOINT_BUDGETS = {
+        '/api/news/': 4,
+        '/api/trainers/': 5,
+        '/api/horses/': 5,
+        '/api/lessons/': 5,
+        '/api/payments/': 4,
+        '/admin/core/newspost/': 7,
+        '/admin/core/trainer/': 6,
+        '/admin/core/horse/': 6,
+        '/admin/core/lesson/': 9,
+        '/admin/core/payment/': 7,
+        '/admin/core/userprofile/': 5,
+        '/admin/core/schedulerequest/': 7,
+        '/admin/core/horsetrainerrelation/': 7,
+    }
+
+    TASK_BUDGETS = {
+        'daily_cleanup': 2,
+        'weekly_reports': 6,
+        'monthly_analytics': 7,
+        'send_lesson_reminders': 3,
+        'update_horse_statistics': 2,
+        'send_weekly_reports_email': 6,
+        'reconcile_lesson_price_statistics': 6,
+        'reconcile_home_counters': 5,
+        'build_daily_rollups': 7,
+    }
+
+    def setUp(self) -> None:
+        User.objects.create_superuser(username='budget', email='budget@example.com', password='budget123')
+        self.client.login(username='budget', password='budget123')
+
+    def seed(self, size: str) -> None:
+        """
+        Добавляет набор данных: занятия распределяются между прошедшей неделей,
+        окном напоминаний и завтрашним днём, чтобы задачи обрабатывали новые строки.
+        """
+        from . import leaderboards, rollups
+
+        now = timezone.now()
+        offsets = [timezone.timedelta(days=-1), timezone.timedelta(minutes=30), timezone.timedelta(days=1)]
+        for i, lesson in enumerate(create_lesson_fixtures(self.SIZES[size], prefix=size)):
+            date = now + offsets[i % len(offsets)]
+            Lesson.objects.filter(pk=lesson.pk).update(date=date)
+            ScheduleRequest.objects.create(
+                user=lesson.student, preferred_time=date, horse=lesson.horse, trainer=lesson.trainer, status='pending'
+            )
+        # Рейтинги и дневные итоги для отчётов: обновление через update() обходит сигналы
+        leaderboards.rebuild_leaderboards()
+        rollups.refresh_rollups()
+
+    def measure(self, call: Any) -> tuple[int, float]:
+        """
+        Выполняет вызов и возвращает число SQL-запросов и время в секундах.
+        """
+        import time
+
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            call()
+            elapsed = time.perf_counter() - started
+        return len(app_queries(ctx.captured_queries)), elapsed
+
+    def check_budgets(self, budgets: dict[str, int], run: Any) -> None:
+        counts: dict[str, list[int]] = {name: [] for name in budgets}
+        for size in self.SIZES:
+            self.seed(size)
+            for name, budget in budgets.items():
+                queries, elapsed = self.measure(lambda: run(name))
+                with self.subTest(name=name, size=size):
+                    self.assertLessEqual(queries, budget)
+                    self.assertLess(elapsed, self.MAX_SECONDS)
+                counts[name].append(queries)
+        for name, values in counts.items():
+            with self.subTest(name=name):
+                self.assertEqual(len(set(values)), 1, f"Число запросов растёт с данными: {values}")
+
+    def test_endpoint_budgets(self) -> None:
+        """
+        Списки API и админки выполняют фиксированное число запросов.
+        """
+        def run(url: str) -> None:
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK, url)
+
+        self.check_budgets(self.ENDPOINT_BUDGETS, run)
+
+    def test_task_budgets(self) -> None:
+        """
+        Задачи Celery выполняют фиксированное число запросов.
+        """
+        from . import tasks
+
+        self.check_budgets(self.TASK_BUDGETS, lambda name: getattr(tasks, name)())
+
+
+class DataGeneratorTests(TestCase):
+    """
+    Тесты генератора синтетических данных.
+    """
+
+    def test_generate_valid_dataset(self) -> None:
+        """
+        Генератор создаёт заданное количество объектов, проходящих валидацию моделей.
+        """
+        from .datagen import DatasetConfig, DatasetGenerator
+
+        config = DatasetConfig(
+            stables=2, trainers=4, horses=6, students=10, lessons=120, news=15, batch_size=50, seed=1
+        )
+        created = DatasetGenerator(config).run(refresh=False)
+        self.assertEqual(Lesson.objects.count(), created['lessons'])
+        self.assertEqual(created['lessons'], 120)
+        self.assertEqual(Payment.objects.count(), created['payments'])
+        self.assertEqual(HorseTrainerRelation.objects.count(), 12)
+        self.assertEqual(UserProfile.objects.count(), 10)
+        self.assertFalse(Lesson.objects.filter(date__gt=timezone.now(), status='completed').exists())
+        for model in (Stable, Trainer, Horse, HorseTrainerRelation, UserProfile, Lesson, Payment, NewsPost):
+            for obj in model.objects.all():
+                obj.full_clean(validate_unique=False)
+        # Тренер занятия — один из тренеров лошади
+        relations = set(HorseTrainerRelation.objects.values_list('horse_id', 'trainer_id'))
+        self.assertTrue(set(Lesson.objects.values_list('horse_id', 'trainer_id')) <= relations)
+
+    def test_command_refreshes_derived_data(self) -> None:
+        """
+        Команда generate_data пересчитывает статистику, счётчики и поисковый индекс.
+        """
+        from io import StringIO
+
+        from django.core.cache import cache
+        from django.core.management import call_command
+
+        from .counters import get_counters
+        from .models import SearchDocument
+        from .stats import get_average_price
+
+        cache.clear()
+        call_command(
+            'generate_data', stables=1, trainers=2, horses=3, students=5, lessons=40, news=5, seed=2,
+            stdout=StringIO(),
+        )
+        self.assertEqual(get_counters()['lessons'], 40)
+        self.assertEqual(get_counters()['news'], NewsPost.objects.filter(is_active=True).count())
+        average = sum(lesson.price for lesson in Lesson.objects.all()) / 40
+        self.assertEqual(get_average_price(), average)
+        self.assertEqual(SearchDocument.objects.count(), 2 + 3 + 5)
+
+
+class LoadTestSuiteTests(APITestCase):
+    """
+    Тесты сценариев нагрузочного замера и сравнения отчётов.
+    """
+
+    def test_scenario_paths_respond(self) -> None:
+        """
+        Все адреса сценариев (API и админка) отвечают без ошибок.
+        """
+        from django.core.cache import cache
+
+        from .datagen import DatasetConfig, DatasetGenerator
+        from .management.commands.loadtest import admin_session, build_scenarios
+
+        cache.clear()
+        # Достаточно строк для второй и третьей страниц списков
+        DatasetGenerator(DatasetConfig(
+            stables=2, trainers=5, horses=25, students=10, lessons=80, news=45, inactive_news_ratio=0.0, seed=3
+        )).run()
+        User.objects.create_superuser(username='loadtest', email='loadtest@example.com', password='loadtest123')
+        cookie, session = admin_session(None)
+        scenarios = build_scenarios(cookie)
+        self.assertIn('admin-changelist', [scenario.name for scenario in scenarios])
+        self.client.cookies.load(cookie)
+        for scenario in scenarios:
+            for path in scenario.paths[:3] + scenario.paths[-1:]:
+                response = self.client.generic(
+                    scenario.method, path, scenario.body or b'', content_type='application/json'
+                )
+                self.assertLess(response.status_code, 400, f"{scenario.name}: {path}")
+        session.delete()
+
+    def test_compare_reports(self) -> None:
+        """
+        Сравнение с эталоном находит рост задержек, ошибок и падение RPS, но не шум.
+        """
+        from .loadtest import compare_reports
+
+        def summary(requests: int, errors: int, rps: float, p95: float) -> dict[str, float]:
+            return {'requests': requests, 'errors': errors, 'rps': rps, 'p50': 10.0, 'p95': p95, 'p99': p95}
+
+        baseline = {
+            'total': summary(1000, 0, 100.0, 50.0),
+            'scenarios': {'news-list': summary(600, 0, 60.0, 40.0), 'batch': summary(10, 0, 1.0, 40.0)},
+        }
+        self.assertEqual(compare_reports(baseline, baseline), [])
+        current = {
+            'total': summary(1000, 30, 70.0, 52.0),
+            'scenarios': {'news-list': summary(600, 0, 42.0, 80.0), 'batch': summary(10, 0, 1.0, 400.0)},
+        }
+        regressions = compare_reports(current, baseline)
+        self.assertIn('news-list: p95 40.0 -> 80.0 мс', regressions)
+        self.assertIn('total: доля ошибок 0.0% -> 3.0%', regressions)
+        self.assertIn('total: rps 100.0 -> 70.0', regressions)
+        # Небольшие сценарии и рост в пределах допуска не считаются регрессией
+        self.assertFalse([line for line in regressions if line.startswith('batch') or 'p95 50.0' in line])
+
+
+class RecordingEmailBackend:
+    """
+    Почтовый бэкенд для тестов: считает открытия соединений и отклоняет адреса с "fail".
+    """
+    opened = 0
+    outbox: list[Any] = []
+
+    def __init__(self, fail_silently: bool = False, **kwargs: Any) -> None:
+        self.fail_silently = fail_silently
+
+    def open(self) -> None:
+        RecordingEmailBackend.opened += 1
+
+    def close(self) -> None:
+        pass
+
+    def send_messages(self, messages: list[Any]) -> int:
+        for message in messages:
+            if any('fail' in address for address in message.to):
+                raise ConnectionError('Recipient refused')
+            RecordingEmailBackend.outbox.append(message)
+        return len(messages)
+
+
+class LessonReminderTests(TestCase):
+    """
+    Тесты пакетной отправки напоминаний о занятиях.
+    """
+
+    def setUp(self) -> None:
+        RecordingEmailBackend.opened = 0
+        RecordingEmailBackend.outbox = []
+
+    def test_reminders_share_connection(self) -> None:
+        """
+        Письма отправляются пакетами через одно соединение на пакет, окно загружается одним запросом.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext, override_settings
+
+        from .notifications import reminder_lessons, send_reminders
+
+        create_lesson_fixtures(5, prefix='rem')
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            with CaptureQueriesContext(connection) as captured:
+                report = send_reminders(reminder_lessons(Lesson.objects.all()), chunk_size=2)
+        self.assertEqual(len(app_queries(captured.captured_queries)), 1)
+        self.assertEqual((report.total, report.sent, report.skipped, report.failed), (5, 5, 0, []))
+        # 5 писем пакетами по 2: три соединения
+        self.assertEqual(RecordingEmailBackend.opened, 3)
+        self.assertEqual(len(RecordingEmailBackend.outbox), 5)
+        self.assertEqual(
+            {message.to[0] for message in RecordingEmailBackend.outbox}, {f'rem{i}@example.com' for i in range(5)}
+        )
+        self.assertTrue(any('Лошадь: Конь rem 0' in message.body for message in RecordingEmailBackend.outbox))
+
+    def test_failures_counted_per_message(self) -> None:
+        """
+        Ошибка одного письма не прерывает пакет; ученики без email пропускаются.
+        """
+        from django.test.utils import override_settings
+
+        from .notifications import reminder_lessons, send_reminders
+        from .tasks import send_lesson_reminders
+
+        lessons = create_lesson_fixtures(4, prefix='bad')
+        User.objects.filter(pk=lessons[0].student.user_id).update(email='fail@example.com')
+        User.objects.filter(pk=lessons[1].student.user_id).update(email='')
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            result = send_lesson_reminders()
+        # Напоминание за 2 часа: наступило для занятий через 1 и 2 часа (отклонённый адрес и без email)
+        self.assertIn('отправлены для 0 из 2', result)
+        self.assertIn('без email: 1, ошибок: 1', result)
+        # Захват письма с ошибкой снят: оно уйдёт при следующем запуске
+        sent_at = dict(Lesson.objects.filter(pk__in=[lessons[0].pk, lessons[1].pk]).values_list('pk', 'reminder_sent_at'))
+        self.assertIsNone(sent_at[lessons[0].pk])
+        self.assertIsNotNone(sent_at[lessons[1].pk])
+
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            report = send_reminders(reminder_lessons(Lesson.objects.all()))
+        self.assertEqual(report.failed, [lessons[0].pk])
+        self.assertEqual((report.sent, report.skipped), (2, 1))
+
+    def test_reminder_replanned_on_change(self) -> None:
+        """
+        Время напоминания пересчитывается при переносе и смене статуса занятия.
+        """
+        from .notifications import REMINDER_LEAD
+
+        lesson = create_lesson_fixtures(1, prefix='plan')[0]
+        self.assertEqual(lesson.reminder_due_at, lesson.date - REMINDER_LEAD)
+        Lesson.objects.filter(pk=lesson.pk).update(reminder_sent_at=timezone.now())
+
+        # Изменение цены не влияет на напоминание
+        lesson.refresh_from_db()
+        lesson.price = Decimal('1500.00')
+        lesson.save()
+        lesson.refresh_from_db()
+        self.assertIsNotNone(lesson.reminder_sent_at)
+
+        # Перенос: новое время, отметка об отправке сбрасывается (в том числе при save(update_fields=...))
+        lesson.date += timezone.timedelta(days=1)
+        lesson.save(update_fields=['date'])
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.reminder_due_at, lesson.date - REMINDER_LEAD)
+        self.assertIsNone(lesson.reminder_sent_at)
+
+        # Флаг пересчёта от прошлого сохранения не сбрасывает отметку при следующем
+        Lesson.objects.filter(pk=lesson.pk).update(reminder_sent_at=timezone.now())
+        lesson.refresh_from_db()
+        lesson.price = Decimal('1600.00')
+        lesson.save(update_fields=['price'])
+        lesson.refresh_from_db()
+        self.assertIsNotNone(lesson.reminder_sent_at)
+
+        lesson.status = 'completed'
+        lesson.save()
+        lesson.refresh_from_db()
+        self.assertIsNone(lesson.reminder_due_at)
+
+    def test_claimed_reminders_skipped(self) -> None:
+        """
+        Напоминание, захваченное параллельным запуском, не отправляется повторно.
+        """
+        from django.test.utils import override_settings
+
+        from .notifications import claim_reminders, send_due_reminders
+
+        first, second = create_lesson_fixtures(2, prefix='claim')
+        now = timezone.now()
+        other_run = now - timezone.timedelta(seconds=1)
+        Lesson.objects.filter(pk=first.pk).update(reminder_sent_at=other_run)
+        self.assertEqual(claim_reminders([first.pk, second.pk], now), {second.pk})
+        self.assertEqual(Lesson.objects.get(pk=first.pk).reminder_sent_at, other_run)
+
+        Lesson.objects.filter(pk=second.pk).update(reminder_sent_at=None)
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            report = send_due_reminders(now)
+        self.assertEqual(report.sent, 1)
+        self.assertEqual([message.to for message in RecordingEmailBackend.outbox], [['claim1@example.com']])
+
+    def test_due_reminders_sent_once(self) -> None:
+        """
+        Отправляются только наступившие напоминания, каждое — один раз; просроченные снимаются.
+        """
+        from django.test.utils import override_settings
+
+        from .notifications import send_due_reminders
+
+        soon, later = create_lesson_fixtures(2, prefix='due')
+        later.date = timezone.now() + timezone.timedelta(days=2)
+        later.save()
+        missed = create_lesson_fixtures(1, prefix='missed')[0]
+        Lesson.objects.filter(pk=missed.pk).update(date=timezone.now() - timezone.timedelta(minutes=5))
+
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            first = send_due_reminders()
+            second = send_due_reminders()
+        self.assertEqual((first.total, first.sent), (1, 1))
+        self.assertEqual(second.total, 0)
+        self.assertEqual([message.to for message in RecordingEmailBackend.outbox], [['due0@example.com']])
+        soon.refresh_from_db()
+        missed.refresh_from_db()
+        self.assertIsNotNone(soon.reminder_sent_at)
+        self.assertIsNone(missed.reminder_due_at)
+
+        # Занятие через 2 дня получает напоминание, когда наступает его время
+        with override_settings(EMAIL_BACKEND='core.tests.RecordingEmailBackend'):
+            report = send_due_reminders(now=later.date - timezone.timedelta(hours=1))
+        self.assertEqual(report.sent, 1)
+        self.assertEqual(RecordingEmailBackend.outbox[-1].to, ['due1@example.com'])
+
+
+class HorseStatisticsTests(APITestCase):
+    """
+    Тесты предрассчитанной статистики лошадей.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+
+    def test_refresh_single_pass(self) -> None:
+        """
+        Статистика всех лошадей считается одним запросом и перезаписывается upsert'ом.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .models import HorseStatistics
+        from .stats import refresh_horse_statistics
+
+        lesson = create_lesson_fixtures(1, prefix='hs')[0]
+        now = timezone.now()
+        for days, price in ((3, '1000.00'), (20, '2000.00'), (200, '3000.00')):
+            Lesson.objects.create(
+                horse=lesson.horse, trainer=lesson.trainer, student=lesson.student,
+                date=now - timezone.timedelta(days=days), price=Decimal(price), status='completed',
+            )
+        create_lesson_fixtures(5, prefix='other')
+        idle = Horse.objects.create(name='Без занятий', gender='female')
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(refresh_horse_statistics(now=now), 7)
+        self.assertEqual(len(app_queries(captured.captured_queries)), 2)
+
+        stats = HorseStatistics.objects.get(horse=lesson.horse)
+        self.assertEqual((stats.lessons_7d, stats.lessons_30d, stats.lessons_365d, stats.lessons_total), (1, 2, 3, 4))
+        self.assertEqual(stats.total_price, Decimal('7000.00'))
+        self.assertEqual(stats.average_price, Decimal('1750.00'))
+        self.assertEqual(stats.last_lesson_date, now - timezone.timedelta(days=3))
+        self.assertEqual(HorseStatistics.objects.get(horse=idle).lessons_total, 0)
+
+        Lesson.objects.filter(horse=lesson.horse, date__lt=now).delete()
+        refresh_horse_statistics(now=now)
+        stats.refresh_from_db()
+        self.assertEqual((stats.lessons_365d, stats.lessons_total, stats.last_lesson_date), (0, 1, None))
+        self.assertEqual(HorseStatistics.objects.count(), 7)
+
+    def test_api_exposes_statistics(self) -> None:
+        """
+        Статистика отдаётся в ответе по лошадям без дополнительных запросов.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from .stats import refresh_horse_statistics
+
+        create_lesson_fixtures(3, prefix='api')
+        Horse.objects.create(name='Новая лошадь', gender='male')
+        refresh_horse_statistics()
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/horses/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(app_queries(captured.captured_queries)), 3)
+        horses = {horse['name']: horse for horse in response.data['results']}
+        self.assertEqual(horses['Конь api 1']['statistics']['lessons_total'], 1)
+        self.assertEqual(horses['Конь api 1']['statistics']['average_price'], '1001.00')
+
+        # Лошадь без строки статистики (до пересчёта) отдаётся с null
+        Horse.objects.create(name='Ещё новая', gender='male')
+        horses = {horse['name']: horse for horse in self.client.get('/api/horses/').data['results']}
+        self.assertIsNone(horses['Ещё новая']['statistics'])
+
+
+class DailyRollupTests(TestCase):
+    """
+    Тесты дневных итогов и отчётов по ним.
+    """
+
+    def setUp(self) -> None:
+        from django.core.cache import cache
+
+        cache.clear()
+        self.lessons = create_lesson_fixtures(3, prefix='roll')
+        now = timezone.now()
+        # Занятия и платежи за 40 прошедших дней и сегодня
+        for i, lesson in enumerate(self.lessons):
+            for days in (0, 1, 5, 12, 40):
+                past = Lesson.objects.create(
+                    horse=lesson.horse, trainer=lesson.trainer, student=lesson.student,
+                    date=now - timezone.timedelta(days=days, seconds=i), price=Decimal('500.00') + days,
+                    status='completed',
+                )
+                Payment.objects.create(
+                    user=lesson.student.user, lesson=past, amount=past.price, status='completed',
+                    purpose='Оплата занятия', timestamp=past.date,
+                )
+
+    def raw_totals(self, days: int) -> tuple[Decimal, int]:
+        """
+        Доход и количество занятий за окно отчёта по исходным таблицам.
+        """
+        from django.db.models import Sum
+
+        from .rollups import day_start
+
+        lower = day_start(timezone.localdate() - timezone.timedelta(days=days - 1))
+        upper = day_start(timezone.localdate() + timezone.timedelta(days=1))
+        income = Payment.objects.filter(
+            timestamp__gte=lower, timestamp__lt=upper, status='completed'
+        ).aggregate(total=Sum('amount'))['total']
+        return income, Lesson.objects.filter(date__gte=lower, date__lt=upper).count()
+
+    def test_reports_use_rollups(self) -> None:
+        """
+        Отчёты по итогам совпадают с расчётом по исходным таблицам; поздние данные исправляются ночным пересчётом.
+        """
+        from .models import DailyIncome, DailyLessons
+        from .rollups import built_through, refresh_rollups
+        from .tasks import monthly_analytics, weekly_reports
+
+        income, lessons = self.raw_totals(7)
+        # Без итогов отчёт читает исходные таблицы
+        self.assertEqual(weekly_reports()['weekly_lessons'], lessons)
+
+        refresh_rollups()
+        self.assertEqual(built_through(), timezone.localdate() - timezone.timedelta(days=1))
+        report = weekly_reports()
+        self.assertEqual((Decimal(str(report['weekly_income'])), report['weekly_lessons']), (income, lessons))
+        monthly = monthly_analytics()
+        self.assertEqual(monthly['total_lessons'], self.raw_totals(30)[1])
+        self.assertEqual({horse['lesson_count'] for horse in monthly['horse_stats']}, {5})
+
+        # Платёж задним числом (2 дня назад) попадает в отчёт после ночного пересчёта
+        Payment.objects.create(
+            user=self.lessons[0].student.user, amount=Decimal('100.00'), status='completed',
+            purpose='Доплата', timestamp=timezone.now() - timezone.timedelta(days=2),
+        )
+        self.assertEqual(Decimal(str(weekly_reports()['weekly_income'])), income)
+        rows = DailyIncome.objects.count() + DailyLessons.objects.count()
+        refresh_rollups()
+        self.assertEqual(Decimal(str(weekly_reports()['weekly_income'])), income + 100)
+        self.assertEqual(DailyIncome.objects.count() + DailyLessons.objects.count(), rows)
+
+    def test_backfill_command(self) -> None:
+        """
+        Команда build_rollups --all строит итоги с первого дня данных.
+        """
+        from io import StringIO
+
+        from django.core.management import call_command
+        from django.db.models import Sum
+
+        from .models import DailyIncome, DailyLessons
+
+        call_command('build_rollups', all=True, stdout=StringIO())
+        yesterday = timezone.localdate() - timezone.timedelta(days=1)
+        self.assertEqual(DailyLessons.objects.aggregate(total=Sum('lessons_count'))['total'], 12)
+        self.assertEqual(
+            DailyIncome.objects.filter(status='completed').aggregate(total=Sum('payments_count'))['total'], 12
+        )
+        self.assertEqual(DailyIncome.objects.order_by('day').last().day, yesterday)
+
+    def test_command_rejects_unfinished_days(self) -> None:
+        """
+        Итоги не строятся за текущий и будущие дни.
+        """
+        from io import StringIO
+
+        from django.core.management import CommandError, call_command
+
+        from .models import DailyIncome
+
+        today = timezone.localdate()
+        for options in ({'end': today}, {'start': today}, {'start': today, 'end': today + timezone.timedelta(days=3)}):
+            with self.assertRaises(CommandError):
+                call_command('build_rollups', stdout=StringIO(), **options)
+        self.assertFalse(DailyIncome.objects.exists())
+
+    def test_window_covers_exact_days(self) -> None:
+        """
+        Окно last_days(7) — ровно семь календарных дней, включая текущий.
+        """
+        from .rollups import ReportWindow
+
+        today = timezone.localdate()
+        window = ReportWindow.last_days(7, today)
+        self.assertEqual((window.start, window.end), (today - timezone.timedelta(days=6), today))
+
+
+class CleanupTests(TestCase):
+    """
+    Тесты пакетной очистки и удаления медиафайлов без ссылок.
+    """
+
+    def test_delete_in_batches(self) -> None:
+        """
+        Строки удаляются пакетами по первичному ключу, прогресс сообщается после каждого пакета.
+        """
+        from .cleanup import delete_in_batches
+
+        NewsPost.objects.bulk_create([
+            NewsPost(title=f'Старая {i}', content='Текст', is_active=i % 3 != 0) for i in range(12)
+        ])
+        progress = []
+        deleted = delete_in_batches(
+            NewsPost.objects.filter(is_active=True), batch_size=3, pause=0, progress=progress.append
+        )
+        self.assertEqual(deleted, 8)
+        self.assertEqual(progress, [3, 6, 8])
+        self.assertEqual(NewsPost.objects.count(), 4)
+        self.assertFalse(NewsPost.objects.filter(is_active=True).exists())
+
+    def test_sweep_orphaned_media(self) -> None:
+        """
+        Удаляются только старые файлы без ссылок; файлы вне каталогов загрузок не трогаются.
+        """
+        import os
+        import tempfile
+        import time
+
+        from django.test.utils import override_settings
+
+        from .cleanup import sweep_orphaned_media
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            def create(name: str, age: float = 7200) -> str:
+                path = os.path.join(media_root, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(b'data')
+                os.utime(path, (time.time() - age, time.time() - age))
+                return path
+
+            kept = [create('news/used.jpg'), create('horses/2024/used.png'), create('other/file.txt')]
+            fresh = create('trainers/fresh.jpg', age=60)
+            orphans = [create('news/orphan.jpg'), create('news_attachments/old.pdf'), create('horses/2024/old.png')]
+            NewsPost.objects.create(title='С картинкой', content='Текст', image='news/used.jpg')
+            Horse.objects.create(name='С фото', gender='male', photo='horses/2024/used.png')
+
+            report = sweep_orphaned_media(dry_run=True)
+            self.assertEqual((report.scanned, report.removed, report.removed_bytes), (6, 3, 12))
+            self.assertTrue(all(os.path.exists(path) for path in orphans))
+
+            with self.assertLogs('core.cleanup', level='INFO') as logs:
+                report = sweep_orphaned_media()
+            self.assertEqual(report.removed, 3)
+            self.assertEqual(len([line for line in logs.output if 'Удалён файл без ссылок' in line]), 3)
+            self.assertFalse(any(os.path.exists(path) for path in orphans))
+            self.assertTrue(all(os.path.exists(path) for path in kept + [fresh]))
+
+    def test_sweep_keeps_listed_files(self) -> None:
+        """
+        Файлы из MEDIA_SWEEP_KEEP не удаляются, даже если на них нет ссылок.
+        """
+        import os
+        import tempfile
+        import time
+
+        from django.test.utils import override_settings
+
+        from .cleanup import sweep_orphaned_media
+
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, MEDIA_SWEEP_KEEP=['*/.gitkeep', 'horses/banners/*'],
+        ):
+            paths = {}
+            for name in ('horses/.gitkeep', 'horses/banners/hero.png', 'horses/orphan.png'):
+                path = paths[name] = os.path.join(media_root, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as file:
+                    file.write(b'data')
+                os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+            report = sweep_orphaned_media()
+            self.assertEqual((report.scanned, report.removed), (3, 1))
+            self.assertFalse(os.path.exists(paths['horses/orphan.png']))
+            self.assertTrue(os.path.exists(paths['horses/.gitkeep']))
+            self.assertTrue(os.path.exists(paths['horses/banners/hero.png']))
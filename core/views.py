@@ -1,10 +1,11 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.db.models import Count, Avg, Max
+from django.db.models import Count, Avg, Max, QuerySet
 from django.utils import timezone
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, DeleteView, DetailView
-from .models import Lesson, Trainer, NewsPost, Payment, UserProfile, Horse, Resource
-from django.http import HttpResponse, HttpRequest, JsonResponse
+from .models import Lesson, Trainer, NewsPost, Payment, UserProfile, Horse, Resource, HorseTrainerRelation, HorseStatistics, SearchDocument
+from django.http import HttpResponse, HttpRequest, JsonResponse, QueryDict
+from django.urls import Resolver404, resolve
 from django.contrib.admin.views.decorators import staff_member_required
 from django.template.loader import render_to_string
 from .serializers import NewsPostSerializer, TrainerSerializer, HorseSerializer, LessonSerializer, PaymentSerializer
@@ -12,49 +13,56 @@ import tempfile
 from rest_framework import viewsets, permissions
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from django_filters.rest_framework import DjangoFilterBackend
-from .filters import NewsPostFilter, TrainerFilter, HorseFilter, LessonFilter, PaymentFilter
+from .filters import NewsPostFilter, TrainerFilter, HorseFilter, LessonFilter, PaymentFilter, FullTextSearchFilter
+from .mixins import ConditionalGetMixin, ExportMixin, QueryPlannerMixin, ResponseCacheMixin, ValuesListMixin
+from .pagination import KeysetPagination
+from .stats import get_average_price
+from . import autocomplete, counters, leaderboards, search
+from .compression import CompressedVariants
 from typing import Any
 from silk.profiling.profiler import silk_profile
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.core.mail import send_mail
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+import json
+import logging
+from asgiref.sync import sync_to_async
+from urllib.parse import urlsplit
 
+logger = logging.getLogger(__name__)
 
-def home_view(request: HttpRequest) -> HttpResponse:
+
+# Время жизни отрендеренной главной страницы (ключ меняется вместе со счётчиками)
+HOME_PAGE_TIMEOUT = 24 * 60 * 60
+
+
+def render_stats(values: dict[str, int]) -> str:
     """
-    Главная страница приложения с информацией о доступных API endpoints.
-    
-    Args:
-        request: HTTP запрос
-        
-    Returns:
-        HttpResponse: Главная страница с информацией об API
+    Рендерит блок статистики по значениям счётчиков (см. core.counters).
     """
-    
-    stats_html = ""
-    try:
-        horses_count = Horse.objects.count()
-        trainers_count = Trainer.objects.count()
-        news_count = NewsPost.objects.filter(is_active=True).count()
-        lessons_count = Lesson.objects.count()
-        payments_count = Payment.objects.count()
-        
-        stats_html = f"""
+    return f"""
         <h2>📊 Статистика базы данных:</h2>
         <ul>
-            <li>Лошадей: {horses_count}</li>
-            <li>Тренеров: {trainers_count}</li>
-            <li>Новостей: {news_count}</li>
-            <li>Занятий: {lessons_count}</li>
-            <li>Платежей: {payments_count}</li>
+            <li>Лошадей: {values['horses']}</li>
+            <li>Тренеров: {values['trainers']}</li>
+            <li>Новостей: {values['news']}</li>
+            <li>Занятий: {values['lessons']}</li>
+            <li>Платежей: {values['payments']}</li>
         </ul>
         """
-    except Exception as e:
-        stats_html = f"<h2>📊 Статистика базы данных:</h2><p>Ошибка при получении статистики: {e}</p>"
 
+
+def render_home_page(stats_html: str) -> str:
+    """
+    Рендерит главную страницу с блоком статистики.
+    """
     html_content = f"""
     <!DOCTYPE html>
     <html lang="ru">
@@ -110,33 +118,93 @@ def home_view(request: HttpRequest) -> HttpResponse:
     </body>
     </html>
     """
+
+    return html_content
+
+
+def home_view(request: HttpRequest) -> HttpResponse:
+    """
+    Главная страница приложения с информацией о доступных API endpoints.
+
+    Счётчики объектов читаются из кэша (core.counters), а страница
+    кэшируется по их значениям и рендерится заново только после изменения
+    счётчика, поэтому в обычном режиме запросов к БД нет.
     
-    return HttpResponse(html_content)
+    Args:
+        request: HTTP запрос
+        
+    Returns:
+        HttpResponse: Главная страница с информацией об API
+    """
+    try:
+        values = counters.get_counters()
+    except Exception as e:
+        stats_html = f"<h2>📊 Статистика базы данных:</h2><p>Ошибка при получении статистики: {e}</p>"
+        return HttpResponse(render_home_page(stats_html))
+
+    key = 'home-page:' + ':'.join(str(values[name]) for name in sorted(values))
+    cached = cache.get(key)
+    if cached is None:
+        content = render_home_page(render_stats(values)).encode()
+        cached = {'content': content, 'content_type': 'text/html; charset=utf-8', 'encoded': {}}
+        cache.set(key, cached, HOME_PAGE_TIMEOUT)
+    response = HttpResponse(cached['content'], content_type=cached['content_type'])
+    # Сжатые варианты страницы хранятся в той же записи кэша
+    response.compressed_variants = CompressedVariants(key, cached, HOME_PAGE_TIMEOUT)
+    return response
+
+
+def leaderboard_response(request: HttpRequest, board: str, model: Any, label: Any) -> Response:
+    """
+    Формирует ответ с рейтингом.
+
+    Параметры запроса: ``metric`` (lessons | completed), ``window``
+    (all | 7 | 30 дней) и ``limit`` (до 100).
+    """
+    metric = request.query_params.get('metric', leaderboards.LESSONS)
+    window = request.query_params.get('window', 'all')
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 100)
+        window = None if window == 'all' else int(window)
+    except ValueError:
+        raise ValidationError({'detail': 'Параметры window и limit должны быть числами.'})
+    if metric not in leaderboards.METRICS or (window is not None and window not in leaderboards.WINDOWS):
+        raise ValidationError({'detail': 'Неизвестная метрика или окно рейтинга.'})
+
+    ranking = leaderboards.top(board, metric, window, limit)
+    objects = model.objects.in_bulk([object_id for object_id, _ in ranking])
+    results = [
+        {'rank': rank, 'id': object_id, 'name': label(objects[object_id]), 'score': score}
+        for rank, (object_id, score) in enumerate(ranking, start=1)
+        if object_id in objects
+    ]
+    return Response({'metric': metric, 'window': window, 'results': results})
 
 
 # API ViewSets
-class NewsPostViewSet(viewsets.ModelViewSet):
+class NewsPostViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlannerMixin, viewsets.ModelViewSet):
     """
     API ViewSet для новостей с поддержкой фильтрации, поиска и сортировки.
     """
     queryset = NewsPost.objects.filter(is_active=True)
+    version_models = (NewsPost, UserProfile, User)
     serializer_class = NewsPostSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = NewsPostFilter
     search_fields = ['title', 'content']
     ordering_fields = ['created_at', 'published_at', 'title']
     ordering = ['-published_at']
+    pagination_class = KeysetPagination
 
 
-class TrainerViewSet(viewsets.ReadOnlyModelViewSet):
+class TrainerViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     """
     API ViewSet для просмотра тренеров с поддержкой фильтрации, поиска и сортировки.
     """
-    queryset = Trainer.objects.all().annotate(
-        lessons_count=Count('lessons')
-    )
+    queryset = Trainer.objects.all()
+    version_models = (Trainer, Lesson)
     serializer_class = TrainerSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = TrainerFilter
     search_fields = ['first_name', 'last_name', 'bio']
     ordering_fields = ['experience_years', 'first_name', 'last_name']
@@ -144,60 +212,267 @@ class TrainerViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_serializer_context(self) -> dict[str, Any]:
         """
-        Добавляет в контекст сериализатора ID "топовых" тренеров.
+        Добавляет в контекст сериализатора ID "топовых" тренеров (только если это поле запрошено).
         """
         context = super().get_serializer_context()
-        top_trainers = Trainer.objects.order_by('-experience_years')[:5].values_list('id', flat=True)
-        context['top_trainer_ids'] = list(top_trainers)
+        if TrainerSerializer.wants_field(self.request, 'is_top_trainer'):
+            top_trainers = Trainer.objects.order_by('-experience_years')[:5].values_list('id', flat=True)
+            context['top_trainer_ids'] = list(top_trainers)
         return context
 
+    def get_serializer(self, *args, **kwargs) -> Any:
+        """
+        Добавляет в контекст количество занятий из рейтинга только для тренеров
+        сериализуемой страницы (если поле ``lessons_count`` запрошено).
+        """
+        serializer = super().get_serializer(*args, **kwargs)
+        if args and TrainerSerializer.wants_field(self.request, 'lessons_count'):
+            instance = args[0]
+            trainers = instance if isinstance(instance, (list, tuple, QuerySet)) else [instance]
+            serializer.context['lessons_counts'] = leaderboards.scores(
+                leaderboards.TRAINERS, members=[trainer.pk for trainer in trainers]
+            )
+        return serializer
 
-class HorseViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False)
+    def leaderboard(self, request: HttpRequest) -> Response:
+        """
+        Рейтинг тренеров по количеству занятий.
+        """
+        return leaderboard_response(request, leaderboards.TRAINERS, Trainer, lambda trainer: trainer.get_full_name())
+
+
+class HorseViewSet(ConditionalGetMixin, ResponseCacheMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet):
     """
     API ViewSet для просмотра лошадей с поддержкой фильтрации, поиска и сортировки.
     """
     queryset = Horse.objects.all()
+    version_models = (Horse, Trainer, HorseTrainerRelation, HorseStatistics)
     serializer_class = HorseSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = HorseFilter
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'birth_date', 'gender']
     ordering = ['name']
 
+    @action(detail=False)
+    def leaderboard(self, request: HttpRequest) -> Response:
+        """
+        Рейтинг лошадей по количеству занятий.
+        """
+        return leaderboard_response(request, leaderboards.HORSES, Horse, lambda horse: horse.name)
+
 
-class LessonViewSet(viewsets.ReadOnlyModelViewSet):
+class LessonViewSet(
+    ConditionalGetMixin, ResponseCacheMixin, ExportMixin, ValuesListMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     API ViewSet для просмотра занятий с поддержкой фильтрации, поиска и сортировки.
     """
     queryset = Lesson.objects.all()
+    version_models = (Lesson, Horse, Trainer, UserProfile, User)
     serializer_class = LessonSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = LessonFilter
     search_fields = ['horse__name', 'trainer__first_name', 'trainer__last_name', 'student__user__username']
     ordering_fields = ['date', 'price', 'status']
     ordering = ['-date']
+    pagination_class = KeysetPagination
+    export_fields = (
+        ('id', 'id'),
+        ('date', 'date'),
+        ('status', 'status'),
+        ('price', 'price'),
+        ('horse_id', 'horse_id'),
+        ('horse_name', 'horse__name'),
+        ('trainer_id', 'trainer_id'),
+        ('trainer_first_name', 'trainer__first_name'),
+        ('trainer_last_name', 'trainer__last_name'),
+        ('student_id', 'student_id'),
+        ('student_name', 'student__user__username'),
+    )
 
     def get_serializer_context(self) -> dict[str, Any]:
         """
-        Добавляет в контекст сериализатора среднюю цену за урок.
+        Добавляет в контекст сериализатора среднюю цену за урок
+        из инкрементально поддерживаемой статистики (если запрошено is_expensive).
         """
         context = super().get_serializer_context()
-        avg_price_data = Lesson.objects.aggregate(avg_price=Avg('price'))
-        context['average_price'] = avg_price_data['avg_price'] or 0
+        if LessonSerializer.wants_field(self.request, 'is_expensive'):
+            context['average_price'] = get_average_price()
         return context
 
 
-class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
+class PaymentViewSet(
+    ConditionalGetMixin, ResponseCacheMixin, ExportMixin, ValuesListMixin, QueryPlannerMixin, viewsets.ReadOnlyModelViewSet
+):
     """
     API ViewSet для просмотра платежей с поддержкой фильтрации, поиска и сортировки.
     """
     queryset = Payment.objects.all()
+    version_models = (Payment, User)
     serializer_class = PaymentSerializer
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
     filterset_class = PaymentFilter
     search_fields = ['user__username', 'purpose']
     ordering_fields = ['timestamp', 'amount', 'status']
     ordering = ['-timestamp']
+    pagination_class = KeysetPagination
+    export_fields = (
+        ('id', 'id'),
+        ('timestamp', 'timestamp'),
+        ('status', 'status'),
+        ('amount', 'amount'),
+        ('purpose', 'purpose'),
+        ('reference_id', 'reference_id'),
+        ('user_id', 'user_id'),
+        ('user_name', 'user__username'),
+        ('lesson_id', 'lesson_id'),
+    )
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Единый полнотекстовый поиск по новостям, тренерам и лошадям.
+
+    Параметры запроса: ``q`` (строка поиска), ``type`` (news, trainer, horse
+    через запятую) и ``limit`` (до 100).
+    """
+    DETAIL_ROUTES = {
+        SearchDocument.KIND_NEWS: 'newspost-detail',
+        SearchDocument.KIND_TRAINER: 'trainer-detail',
+        SearchDocument.KIND_HORSE: 'horse-detail',
+    }
+
+    def list(self, request: HttpRequest) -> Response:
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'Укажите строку поиска.'})
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        if any(kind not in SearchDocument.KINDS for kind in kinds):
+            raise ValidationError({'type': f"Допустимые значения: {', '.join(SearchDocument.KINDS)}."})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'Параметр limit должен быть числом.'})
+
+        hits = search.search(query, kinds or None, limit)
+        results = [
+            {
+                'type': hit.kind,
+                'id': hit.object_id,
+                'title': hit.title,
+                'title_en': hit.title_en,
+                'snippet': hit.snippet,
+                'rank': hit.rank,
+                'url': reverse(self.DETAIL_ROUTES[hit.kind], args=[hit.object_id], request=request),
+            }
+            for hit in hits
+        ]
+        return Response({'query': query, 'results': results})
+
+
+class AutocompleteViewSet(viewsets.ViewSet):
+    """
+    Подсказки имён лошадей и тренеров по мере ввода.
+
+    Параметры запроса: ``q`` (начало имени), ``type`` (horse, trainer
+    через запятую) и ``limit`` (до 20). Ответ строится по индексу в памяти
+    процесса без обращений к базе данных.
+    """
+
+    def list(self, request: HttpRequest) -> Response:
+        query = request.query_params.get('q', '')
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        if any(kind not in autocomplete.KINDS for kind in kinds):
+            raise ValidationError({'type': f"Допустимые значения: {', '.join(autocomplete.KINDS)}."})
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 20)
+        except ValueError:
+            raise ValidationError({'limit': 'Параметр limit должен быть числом.'})
+
+        entries, fuzzy = autocomplete.suggest(query, kinds or None, limit)
+        results = [
+            {'type': entry.kind, 'id': entry.object_id, 'label': entry.label, 'label_en': entry.label_en}
+            for entry in entries
+        ]
+        return Response({'query': query, 'fuzzy': fuzzy, 'results': results})
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """
+    Пакетное выполнение GET-запросов к API за один HTTP-запрос.
+
+    Тело запроса: ``{"requests": [{"id": "news", "path": "/api/news/?page_size=5"}, ...]}``.
+    Подзапросы выполняются в том же процессе с тем же пользователем,
+    сессией и подключением к БД, минуя повторный проход middleware.
+    """
+    max_requests = 10
+
+    def create(self, request: HttpRequest) -> Response:
+        items = request.data.get('requests') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'requests': 'Передайте непустой список подзапросов.'})
+        if len(items) > self.max_requests:
+            raise ValidationError({'requests': f"Не более {self.max_requests} подзапросов за раз."})
+        if not all(isinstance(item, dict) and isinstance(item.get('path'), str) for item in items):
+            raise ValidationError({'requests': 'Каждый подзапрос должен содержать строку path.'})
+
+        responses = [
+            {'id': item.get('id', index), **self.execute(request, item['path'])}
+            for index, item in enumerate(items)
+        ]
+        return Response({'responses': responses})
+
+    def execute(self, request: HttpRequest, path: str) -> dict[str, Any]:
+        """
+        Выполняет подзапрос и возвращает его статус и тело.
+        """
+        url = urlsplit(path)
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {'status': 404, 'body': {'detail': 'Страница не найдена.'}}
+        view_class = getattr(match.func, 'cls', None)
+        if not url.path.startswith('/api/') or view_class is None or view_class is type(self):
+            return {'status': 400, 'body': {'detail': 'Подзапрос должен обращаться к API.'}}
+        view_action = (getattr(match.func, 'actions', None) or {}).get('get')
+        if view_action in getattr(view_class, 'streaming_actions', ()):
+            return {'status': 400, 'body': {'detail': 'Потоковые ответы не поддерживаются в пакете.'}}
+
+        sub_request = HttpRequest()
+        sub_request.method = 'GET'
+        sub_request.path = sub_request.path_info = url.path
+        sub_request.GET = QueryDict(url.query)
+        sub_request.META = {**request.META, 'REQUEST_METHOD': 'GET', 'QUERY_STRING': url.query, 'PATH_INFO': url.path, 'HTTP_ACCEPT': 'application/json'}
+        sub_request.META.pop('HTTP_IF_NONE_MATCH', None)
+        sub_request.META.pop('HTTP_IF_MODIFIED_SINCE', None)
+        # Тело подответа разбирается здесь же, поэтому сжатие не нужно
+        sub_request.META.pop('HTTP_ACCEPT_ENCODING', None)
+        sub_request.user = request.user
+        sub_request.session = getattr(request._request, 'session', None)
+        sub_request._dont_enforce_csrf_checks = True
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception as e:
+            logger.exception(f"Ошибка подзапроса {path}: {e}")
+            return {'status': 500, 'body': {'detail': 'Внутренняя ошибка сервера.'}}
+        if response.streaming:
+            # Поток не читаем: закрываем, чтобы освободить курсор выгрузки
+            response.close()
+            return {'status': 400, 'body': {'detail': 'Потоковые ответы не поддерживаются в пакете.'}}
+        if isinstance(response, Response) and response.data is not None:
+            body = response.data
+        else:
+            try:
+                if hasattr(response, 'render'):
+                    response.render()
+                body = json.loads(response.content) if response.content else None
+            except (AttributeError, ValueError) as e:
+                logger.warning(f"Подзапрос {path} вернул ответ не в формате JSON: {e}")
+                return {'status': 502, 'body': {'detail': 'Подзапрос вернул ответ не в формате JSON.'}}
+        return {'status': response.status_code, 'body': body}
 
 
 # Sentry Test Views
@@ -373,9 +648,12 @@ def test_silk_database_queries(request: HttpRequest) -> HttpResponse:
     )
 
 
-def test_email_sending(request: HttpRequest) -> HttpResponse:
+async def test_email_sending(request: HttpRequest) -> HttpResponse:
     """
     Тестовое представление для проверки отправки email через Mailhog
+
+    Асинхронное: под ASGI ожидание SMTP-сервера не занимает воркер
+    (отправка выполняется в отдельном потоке).
     
     Args:
         request: HTTP запрос
@@ -385,7 +663,7 @@ def test_email_sending(request: HttpRequest) -> HttpResponse:
     """
     try:
         # Имитация отправки email
-        send_mail(
+        await sync_to_async(send_mail, thread_sensitive=False)(
             'Тестовое сообщение',
             'Это тестовое сообщение, отправленное через Mailhog',
             'noreply@example.com',
@@ -10,7 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import importlib.util
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -59,6 +61,9 @@ if SENTRY_DSN:
         debug=os.getenv('DEBUG', 'True').lower() == 'true',
     )
 
+# Запуск тестов (manage.py test): внешние сервисы заменяются локальными
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
 
@@ -95,6 +100,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Сжатие ответов (первым, чтобы остальные middleware видели несжатое тело)
+    'core.middleware.CompressionMiddleware',
     'silk.middleware.SilkyMiddleware',  # Django Silk middleware
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -188,6 +195,11 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Файлы каталогов загрузок, которые не удаляет очистка медиафайлов без ссылок
+# (шаблоны fnmatch относительно MEDIA_ROOT, '*' совпадает и с '/').
+# Статические картинки интерфейса хранятся не в MEDIA_ROOT, а во фронтенде (public/).
+MEDIA_SWEEP_KEEP = ['*/.gitkeep']
+
 STATIC_ROOT = BASE_DIR / 'static'
 
 CORS_ALLOWED_ORIGINS = [
@@ -196,6 +208,12 @@ CORS_ALLOWED_ORIGINS = [
 
 # Django Filter settings
 REST_FRAMEWORK = {
+    # orjson и MessagePack (Accept: application/msgpack), если пакеты установлены
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        *(['core.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
         'rest_framework.filters.SearchFilter',
@@ -236,6 +254,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'core.tasks.daily_cleanup',
         'schedule': 86400.0,  # 24 часа
     },
+    'media-sweep': {
+        'task': 'core.tasks.sweep_orphaned_media',
+        'schedule': 86400.0,  # 24 часа
+    },
     'weekly-reports': {
         'task': 'core.tasks.weekly_reports',
         'schedule': 604800.0,  # 7 дней
@@ -250,10 +272,68 @@ CELERY_BEAT_SCHEDULE = {
     },
     'lesson-reminders': {
         'task': 'core.tasks.send_lesson_reminders',
+        'schedule': 60.0,  # 1 минута (отправляются только наступившие напоминания)
+    },
+    'horse-statistics': {
+        'task': 'core.tasks.update_horse_statistics',
+        'schedule': 86400.0,  # 24 часа
+    },
+    'daily-rollups': {
+        'task': 'core.tasks.build_daily_rollups',
+        'schedule': 86400.0,  # 24 часа (итоги строятся по вчерашний день)
+    },
+    'price-statistics-reconcile': {
+        'task': 'core.tasks.reconcile_lesson_price_statistics',
+        'schedule': 86400.0,  # 24 часа
+    },
+    'home-counters-reconcile': {
+        'task': 'core.tasks.reconcile_home_counters',
         'schedule': 3600.0,  # 1 час
     },
+    'leaderboards-seed': {
+        'task': 'core.tasks.rebuild_leaderboards',
+        'schedule': 300.0,  # 5 минут (только если рейтингов нет в Redis)
+        'kwargs': {'force': False},
+    },
+    'leaderboards-rebuild': {
+        'task': 'core.tasks.rebuild_leaderboards',
+        'schedule': 86400.0,  # 24 часа (сверка с таблицей занятий)
+    },
 }
 
+# Redis для производных данных (рейтинги и т.п.)
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+# Рейтинги тренеров и лошадей: 'redis' (sorted sets), 'database' (расчёт по таблице
+# занятий, без Redis) или 'memory' (в памяти процесса, только для тестов)
+if TESTING:
+    LEADERBOARD_BACKEND = 'memory'
+else:
+    LEADERBOARD_BACKEND = 'redis' if REDIS_URL else 'database'
+
+# Кэш: Redis в продакшене, локальная память в тестах и без REDIS_URL
+if REDIS_URL and not TESTING:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Кэш общий для всех процессов. Версии моделей, кэш ответов, журнал подсказок
+# и счётчики держатся только в общем кэше: с локальной памятью у каждого
+# процесса были бы свои значения. В тестах процесс один, локальная память подходит.
+SHARED_CACHE = bool(REDIS_URL) or TESTING
+
+# Время жизни закэшированных ответов API (инвалидация — через версии моделей)
+API_RESPONSE_CACHE_TIMEOUT = 600
+
 # Email Configuration для Mailhog
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'localhost'
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.urls import path, include
-from core import views
+from core import async_views, views
 from rest_framework import routers
-from core.views import NewsPostViewSet, TrainerViewSet, HorseViewSet, LessonViewSet, PaymentViewSet
+from core.views import NewsPostViewSet, TrainerViewSet, HorseViewSet, LessonViewSet, PaymentViewSet, SearchViewSet, AutocompleteViewSet, BatchViewSet
 from django.conf import settings
 from django.conf.urls.static import static
 
@@ -12,6 +12,9 @@ router.register(r'trainers', TrainerViewSet)
 router.register(r'horses', HorseViewSet)
 router.register(r'lessons', LessonViewSet)
 router.register(r'payments', PaymentViewSet)
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'autocomplete', AutocompleteViewSet, basename='autocomplete')
+router.register(r'batch', BatchViewSet, basename='batch')
 
 urlpatterns = [
     path('', views.home_view, name='home'),
@@ -24,6 +27,16 @@ urlpatterns = [
     path('api/horses/', views.HorseViewSet.as_view({'get': 'list'}), name='api_horses_list'),
     path('api/lessons/', views.LessonViewSet.as_view({'get': 'list'}), name='api_lessons_list'),
     path('api/payments/', views.PaymentViewSet.as_view({'get': 'list'}), name='api_payments_list'),
+
+    # Асинхронные API только для чтения (для ASGI-сервера)
+    path('api/async/news/', async_views.NewsPostAsyncView.as_view(), name='async_news_list'),
+    path('api/async/news/<int:pk>/', async_views.NewsPostAsyncView.as_view(), name='async_news_detail'),
+    path('api/async/trainers/', async_views.TrainerAsyncView.as_view(), name='async_trainers_list'),
+    path('api/async/trainers/<int:pk>/', async_views.TrainerAsyncView.as_view(), name='async_trainers_detail'),
+    path('api/async/horses/', async_views.HorseAsyncView.as_view(), name='async_horses_list'),
+    path('api/async/horses/<int:pk>/', async_views.HorseAsyncView.as_view(), name='async_horses_detail'),
+    path('api/async/lessons/', async_views.LessonAsyncView.as_view(), name='async_lessons_list'),
+    path('api/async/lessons/<int:pk>/', async_views.LessonAsyncView.as_view(), name='async_lessons_detail'),
     
     # Django Allauth URLs
     path('accounts/', include('allauth.urls')),